@@ -0,0 +1,98 @@
+"""
+Smart Meter Netz Burgenland - Browser-Benchmark
+Vergleicht das Standard- und das schlanke Chrome-Startprofil: Startzeit,
+Zeit bis die Seite bedienbar ist und maximaler Speicherverbrauch (RSS)
+aller Browser-Prozesse.
+
+Aufruf:
+    python benchmark_chrome.py --runs 5
+    python benchmark_chrome.py --url https://example.org --visible
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from smartmeter_selenium import SmartMeterSeleniumDownloader, psutil, tree_rss
+
+DEFAULT_URL = "https://smartmeter.netzburgenland.at/enview/enView.Portal/"
+
+
+class PeakSampler:
+    """Misst im Hintergrund den höchsten RSS-Wert eines Prozessbaums"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss(self.pid))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def measure(url, lean, headless):
+    """Ein Lauf: Browser starten, Seite laden, messen, beenden"""
+    with tempfile.TemporaryDirectory() as download_dir:
+        downloader = SmartMeterSeleniumDownloader(
+            "benchmark", "", headless=headless, download_dir=download_dir,
+            screenshots="off", lean=lean, block_hosts=lean
+        )
+        started = time.monotonic()
+        if not downloader._setup_driver():
+            raise RuntimeError("Browser konnte nicht gestartet werden")
+        startup = time.monotonic() - started
+
+        try:
+            with PeakSampler(downloader.driver.service.process.pid) as sampler:
+                started = time.monotonic()
+                downloader.driver.get(url)
+                WebDriverWait(downloader.driver, 30, poll_frequency=0.05).until(
+                    lambda d: d.execute_script("return document.readyState") != "loading"
+                )
+                page_ready = time.monotonic() - started
+                time.sleep(0.5)  # Nachladen (Skripte, XHR) in den Spitzenwert einbeziehen
+            return startup, page_ready, sampler.peak
+        finally:
+            downloader.close()
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description="Chrome-Startprofile vergleichen")
+    parser.add_argument("--runs", type=int, default=3, help="Läufe je Profil")
+    parser.add_argument("--url", default=DEFAULT_URL, help="Zu ladende Seite")
+    parser.add_argument("--visible", action="store_true", help="Browser sichtbar statt headless")
+    args = parser.parse_args()
+
+    print(f"Seite: {args.url}  |  Läufe je Profil: {args.runs}")
+    if not psutil and not os.path.isdir("/proc"):
+        print("Hinweis: RSS-Messung benötigt psutil (pip install psutil)")
+
+    print(f"\n{'Profil':<10}{'Start (s)':>12}{'Seite (s)':>12}{'RSS max (MB)':>15}")
+    for name, lean in (("standard", False), ("lean", True)):
+        results = [measure(args.url, lean, not args.visible) for _ in range(args.runs)]
+        startup, page_ready, peak = zip(*results)
+        print(f"{name:<10}{statistics.median(startup):>12.2f}{statistics.median(page_ready):>12.2f}"
+              f"{max(peak) / 1024 / 1024:>15.0f}")
+    print("\nMedian über alle Läufe, RSS = Maximum aller Browser-Prozesse")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Smart Meter Netz Burgenland - Ablauf-Benchmark
+Misst Login und Export der Downloader gegen den lokalen Portal-Nachbau
+(smartmeter_standin.py) oder einen anderen Server, aufgeteilt in einzelne Schritte.
+
+Aufruf:
+    python benchmark_portal.py --runs 5
+    python benchmark_portal.py --engine selenium --latency 0.3 --fail-rate 0.1
+    python benchmark_portal.py --base-url http://127.0.0.1:8765 --engine hybrid
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import json
+import logging
+import statistics
+import tempfile
+import time
+
+from smartmeter_backends import percentile
+from smartmeter_downloader import SmartMeterDownloader
+from smartmeter_playwright import SmartMeterPlaywrightDownloader
+from smartmeter_selenium import SmartMeterSeleniumDownloader
+from smartmeter_standin import PortalStandin
+
+ENGINES = ('selenium', 'playwright', 'hybrid', 'http')
+
+# Schritte des Browser-Ablaufs in der Reihenfolge, in der sie auftreten
+BROWSER_STEPS = ('startup', 'login_form', 'login_result', 'chart_page', 'export_dialog', 'download')
+
+
+def run_selenium(base_url, username, password, headless, days_back):
+    """Ein Lauf mit SmartMeterSeleniumDownloader: Browser, Login, Export"""
+    phases = {}
+    with tempfile.TemporaryDirectory() as download_dir:
+        downloader = SmartMeterSeleniumDownloader(
+            username, password, headless=headless, base_url=base_url,
+            download_dir=download_dir, screenshots="off", lean=True
+        )
+        try:
+            started = time.monotonic()
+            ok = downloader.login()
+            phases['login'] = time.monotonic() - started
+            if ok:
+                started = time.monotonic()
+                ok = bool(downloader.download_csv(days_back=days_back))
+                phases['export'] = time.monotonic() - started
+            phases.update({step: downloader.step_times[step] for step in BROWSER_STEPS
+                           if step in downloader.step_times})
+        finally:
+            downloader.close()
+    return ok, phases
+
+
+def run_playwright(base_url, username, password, headless, days_back):
+    """Ein Lauf mit SmartMeterPlaywrightDownloader: Kontext, Login, Export"""
+    phases = {}
+    with tempfile.TemporaryDirectory() as download_dir:
+        with SmartMeterPlaywrightDownloader(username, password, headless=headless, base_url=base_url,
+                                            download_dir=download_dir) as downloader:
+            started = time.monotonic()
+            ok = downloader.login()
+            phases['login'] = time.monotonic() - started
+            if ok:
+                started = time.monotonic()
+                ok = bool(downloader.download_csv(days_back=days_back))
+                phases['export'] = time.monotonic() - started
+            phases.update({step: downloader.step_times[step] for step in BROWSER_STEPS
+                           if step in downloader.step_times})
+    return ok, phases
+
+
+def run_downloader(base_url, username, password, headless, days_back, browser_login):
+    """Ein Lauf mit SmartMeterDownloader (HTTP, optional mit Browser-Login)"""
+    phases = {}
+    with tempfile.TemporaryDirectory() as download_dir:
+        downloader = SmartMeterDownloader(
+            username, password, browser_login=browser_login, headless=headless,
+            base_url=base_url, download_dir=download_dir
+        )
+        started = time.monotonic()
+        ok = downloader.login()
+        phases['login'] = time.monotonic() - started
+        if ok:
+            end = datetime.now()
+            started = time.monotonic()
+            ok = bool(downloader.download_csv(end - timedelta(days=days_back), end))
+            phases['export'] = time.monotonic() - started
+    return ok, phases
+
+
+def summarize(runs):
+    """{phase: {'median', 'p95', 'n'}} über alle Läufe"""
+    collected = {}
+    for _, phases in runs:
+        for phase, seconds in phases.items():
+            collected.setdefault(phase, []).append(seconds)
+    return {
+        phase: {'median': statistics.median(values), 'p95': percentile(values, 0.95), 'n': len(values)}
+        for phase, values in collected.items()
+    }
+
+
+def main():
+    """Hauptfunktion"""
+    parser = argparse.ArgumentParser(description="Login und Export schrittweise messen")
+    parser.add_argument("--runs", type=int, default=3, help="Läufe je Verfahren")
+    parser.add_argument("--engine", choices=ENGINES + ('all',), default='all')
+    parser.add_argument("--base-url", help="Vorhandenen Server verwenden statt den Nachbau zu starten")
+    parser.add_argument("--username", default="demo@example.org")
+    parser.add_argument("--password", default="demo")
+    parser.add_argument("--days-back", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.0, help="Nachbau: Antwortzeit je Anfrage (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Nachbau: Abweichung der Antwortzeit (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Nachbau: Anteil zufälliger 503-Antworten")
+    parser.add_argument("--seed", type=int, default=None, help="Nachbau: Startwert für Fehler")
+    parser.add_argument("--visible", action="store_true", help="Browser sichtbar statt headless")
+    parser.add_argument("--json", help="Rohdaten aller Läufe in diese Datei schreiben")
+    parser.add_argument("--verbose", action="store_true", help="Log der Downloader anzeigen")
+    args = parser.parse_args()
+
+    # Die Downloader-Module setzen beim Import INFO - hier wieder einschränken
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    standin = None
+    base_url = args.base_url
+    if not base_url:
+        standin = PortalStandin(
+            username=args.username, password=args.password, latency=args.latency,
+            jitter=args.jitter, fail_rate=args.fail_rate, seed=args.seed
+        ).start()
+        base_url = standin.base_url
+
+    engines = ENGINES if args.engine == 'all' else (args.engine,)
+    headless = not args.visible
+    results = {}
+    try:
+        print(f"Server: {base_url}  |  Läufe je Verfahren: {args.runs}")
+        for engine in engines:
+            runs = []
+            for _ in range(args.runs):
+                started = time.monotonic()
+                try:
+                    if engine == 'selenium':
+                        ok, phases = run_selenium(base_url, args.username, args.password, headless, args.days_back)
+                    elif engine == 'playwright':
+                        ok, phases = run_playwright(base_url, args.username, args.password, headless, args.days_back)
+                    else:
+                        ok, phases = run_downloader(base_url, args.username, args.password, headless,
+                                                    args.days_back, browser_login=(engine == 'hybrid'))
+                except Exception as e:
+                    print(f"  {engine}: Lauf abgebrochen ({str(e)[:80]})")
+                    ok, phases = False, {}
+                phases['total'] = time.monotonic() - started
+                runs.append((ok, phases))
+            results[engine] = runs
+
+            succeeded = sum(1 for ok, _ in runs if ok)
+            print(f"\n{engine}: {succeeded}/{len(runs)} erfolgreich")
+            print(f"  {'Schritt':<15}{'Median (s)':>12}{'p95 (s)':>10}{'n':>5}")
+            summary = summarize(runs)
+            order = BROWSER_STEPS + ('login', 'export', 'total')
+            for phase in sorted(summary, key=lambda p: order.index(p) if p in order else len(order)):
+                stats = summary[phase]
+                print(f"  {phase:<15}{stats['median']:>12.2f}{stats['p95']:>10.2f}{stats['n']:>5}")
+    finally:
+        if standin:
+            print(f"\nAnfragen an den Nachbau: {standin.requests}  |  simulierte Fehler: {standin.failures}")
+            standin.stop()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({engine: [{'ok': ok, 'phases': phases} for ok, phases in runs]
+                       for engine, runs in results.items()}, f, indent=2)
+        print(f"Rohdaten: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
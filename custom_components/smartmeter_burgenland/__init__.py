@@ -10,7 +10,7 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from .const import DOMAIN
-from .smartmeter_client import SmartMeterClient
+from .smartmeter_worker import SmartMeterWorkerClient
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,17 +23,24 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Smart Meter Burgenland from a config entry."""
     hass.data.setdefault(DOMAIN, {})
 
-    client = SmartMeterClient(
+    # Browser, pandas und Prognose laufen in einem eigenen Prozess
+    client = SmartMeterWorkerClient(
         username=entry.data["username"],
         password=entry.data["password"],
         headless=entry.data.get("headless", True),
-        price_per_kwh=entry.data.get("price_per_kwh", 0.15)
+        # Schlankes Browserprofil nur auf Wunsch (keine Bilder/Schriften)
+        lean=entry.data.get("lean", False),
+        price_per_kwh=entry.data.get("price_per_kwh", 0.15),
+        # Portal-Sitzung überlebt Neustarts von Home Assistant
+        profile_dir=hass.config.path(DOMAIN, "chrome_profile"),
+        # Fester Pfad statt relativ zum Arbeitsverzeichnis von Home Assistant
+        download_dir=hass.config.path("downloads")
     )
 
     async def async_update_data():
         """Fetch data from Smart Meter Portal."""
         try:
-            return await hass.async_add_executor_job(client.get_consumption_data)
+            return await client.async_get_consumption_data()
         except Exception as err:
             raise UpdateFailed(f"Error communicating with Smart Meter Portal: {err}")
 
@@ -60,6 +67,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        data = hass.data[DOMAIN].pop(entry.entry_id)
+        # Warm gehaltenen Browser und Worker beenden
+        await data["client"].async_close()
 
     return unload_ok
@@ -12,8 +12,8 @@ from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 
-from .const import CONF_HEADLESS, CONF_PRICE_PER_KWH, DEFAULT_PRICE_PER_KWH, DOMAIN
-from .smartmeter_client import SmartMeterClient
+from .const import CONF_HEADLESS, CONF_LEAN, CONF_PRICE_PER_KWH, DEFAULT_PRICE_PER_KWH, DOMAIN
+from .smartmeter_worker import SmartMeterWorkerClient
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,13 +23,14 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
         vol.Required(CONF_PASSWORD): str,
         vol.Optional(CONF_PRICE_PER_KWH, default=DEFAULT_PRICE_PER_KWH): vol.Coerce(float),
         vol.Optional(CONF_HEADLESS, default=True): bool,
+        vol.Optional(CONF_LEAN, default=False): bool,
     }
 )
 
 
 async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
     """Validate the user input allows us to connect."""
-    client = SmartMeterClient(
+    client = SmartMeterWorkerClient(
         username=data[CONF_USERNAME],
         password=data[CONF_PASSWORD],
         headless=data.get(CONF_HEADLESS, True),
@@ -38,14 +39,14 @@ async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str,
 
     # Test the connection
     try:
-        result = await hass.async_add_executor_job(client.test_connection)
+        result = await client.async_test_connection()
         if not result:
             raise InvalidAuth
     except Exception as err:
         _LOGGER.error("Error testing connection: %s", err)
         raise CannotConnect from err
     finally:
-        await hass.async_add_executor_job(client.close)
+        await client.async_close()
 
     return {"title": f"Smart Meter ({data[CONF_USERNAME]})"}
 
@@ -142,6 +143,10 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_HEADLESS,
                     default=self.config_entry.data.get(CONF_HEADLESS, True)
                 ): bool,
+                vol.Optional(
+                    CONF_LEAN,
+                    default=self.config_entry.data.get(CONF_LEAN, False)
+                ): bool,
             }
         )
 
@@ -5,6 +5,11 @@ DOMAIN = "smartmeter_burgenland"
 DEFAULT_NAME = "Smart Meter Burgenland"
 DEFAULT_PRICE_PER_KWH = 0.15
 DEFAULT_SCAN_INTERVAL = 60  # minutes
+DEFAULT_DRIVER_MAX_AGE = 6 * 3600  # seconds, browser is restarted afterwards
+DEFAULT_RUN_TIMEOUT = 10 * 60  # seconds per refresh, browser is killed afterwards
+DEFAULT_MAX_RSS_MB = 1536  # all chrome/chromedriver processes together
+DEFAULT_WORKER_TIMEOUT = DEFAULT_RUN_TIMEOUT + 2 * 60  # seconds per request, worker is killed afterwards
 
 CONF_PRICE_PER_KWH = "price_per_kwh"
 CONF_HEADLESS = "headless"
+CONF_LEAN = "lean"
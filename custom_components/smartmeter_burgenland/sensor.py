@@ -10,7 +10,7 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfEnergy, CURRENCY_EURO
+from homeassistant.const import UnitOfEnergy, UnitOfPower, CURRENCY_EURO
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import (
@@ -22,6 +22,23 @@ from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
+# Zusätzliche Register aus dem Export: (Register, Name, Einheit, Device Class, Icon)
+REGISTER_SENSORS = [
+    ("feed_in", "Einspeisung", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, "mdi:solar-power"),
+    ("net", "Saldo", UnitOfEnergy.KILO_WATT_HOUR, SensorDeviceClass.ENERGY, "mdi:scale-balance"),
+    ("reactive_consumption", "Blindenergie Bezug", "kvarh", None, "mdi:sine-wave"),
+    ("reactive_feed_in", "Blindenergie Lieferung", "kvarh", None, "mdi:sine-wave"),
+    ("reactive", "Blindenergie", "kvarh", None, "mdi:sine-wave"),
+]
+
+# Zeitraum-Suffix -> Name
+REGISTER_PERIODS = [
+    ("today", "Heute"),
+    ("yesterday", "Gestern"),
+    ("month", "Dieser Monat"),
+    ("last_month", "Letzter Monat"),
+]
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -132,8 +149,87 @@ async def async_setup_entry(
             SensorStateClass.MEASUREMENT,
             "mdi:gauge",
         ),
+        SmartMeterSensor(
+            coordinator,
+            entry,
+            "forecast_month",
+            "Prognose Monatsende",
+            UnitOfEnergy.KILO_WATT_HOUR,
+            SensorDeviceClass.ENERGY,
+            None,
+            "mdi:chart-timeline-variant",
+        ),
+        SmartMeterSensor(
+            coordinator,
+            entry,
+            "forecast_year",
+            "Prognose Jahresende",
+            UnitOfEnergy.KILO_WATT_HOUR,
+            SensorDeviceClass.ENERGY,
+            None,
+            "mdi:chart-timeline-variant",
+        ),
+        SmartMeterSensor(
+            coordinator,
+            entry,
+            "forecast_cost_month",
+            "Prognose Kosten Monatsende",
+            CURRENCY_EURO,
+            SensorDeviceClass.MONETARY,
+            None,
+            "mdi:cash-clock",
+        ),
+        SmartMeterSensor(
+            coordinator,
+            entry,
+            "forecast_cost_year",
+            "Prognose Kosten Jahresende",
+            CURRENCY_EURO,
+            SensorDeviceClass.MONETARY,
+            None,
+            "mdi:cash-clock",
+        ),
+        SmartMeterSensor(
+            coordinator,
+            entry,
+            "peak_demand_month",
+            "Leistungsspitze Dieser Monat",
+            UnitOfPower.KILO_WATT,
+            SensorDeviceClass.POWER,
+            SensorStateClass.MEASUREMENT,
+            "mdi:chart-bell-curve-cumulative",
+        ),
+        SmartMeterSensor(
+            coordinator,
+            entry,
+            "peak_demand_last_month",
+            "Leistungsspitze Letzter Monat",
+            UnitOfPower.KILO_WATT,
+            SensorDeviceClass.POWER,
+            SensorStateClass.MEASUREMENT,
+            "mdi:chart-bell-curve-cumulative",
+        ),
     ]
 
+    # Sensoren für weitere Register (z.B. PV-Einspeisung), nur wenn im Export vorhanden
+    registers = (coordinator.data or {}).get("registers", [])
+    for register, label, unit, device_class, icon in REGISTER_SENSORS:
+        if register not in registers:
+            continue
+        for period, period_label in REGISTER_PERIODS:
+            sensors.append(
+                SmartMeterSensor(
+                    coordinator,
+                    entry,
+                    f"{register}_{period}",
+                    f"{label} {period_label}",
+                    unit,
+                    device_class,
+                    SensorStateClass.TOTAL,
+                    icon,
+                )
+            )
+
     async_add_entities(sensors)
 
 
@@ -187,6 +283,20 @@ class SmartMeterSensor(CoordinatorEntity, SensorEntity):
         if self._sensor_type == "last_reading" and "last_reading_time" in self.coordinator.data:
             attrs["last_reading_time"] = self.coordinator.data["last_reading_time"]
         
+        # Füge Konfidenzband zu Prognosesensoren hinzu
+        if self._sensor_type.startswith("forecast_"):
+            attrs["lower"] = self.coordinator.data.get(f"{self._sensor_type}_lower")
+            attrs["upper"] = self.coordinator.data.get(f"{self._sensor_type}_upper")
+            attrs["days_fitted"] = self.coordinator.data.get("forecast_days_fitted")
+            period = "year" if self._sensor_type.endswith("_year") else "month"
+            attrs.update(self.coordinator.data.get(f"forecast_{period}_days") or {})
+        
+        # Füge Zeitpunkt und Top-N-Liste zu Leistungsspitzen hinzu
+        if self._sensor_type.startswith("peak_demand_"):
+            top = self.coordinator.data.get(f"{self._sensor_type}_top") or []
+            attrs["timestamp"] = top[0]["timestamp"] if top else None
+            attrs["top"] = top
+        
         # Füge Preis pro kWh zu Verbrauchssensoren hinzu
         if "consumption" in self._sensor_type:
             attrs["price_per_kwh"] = self.coordinator.data.get("price_per_kwh", 0.15)
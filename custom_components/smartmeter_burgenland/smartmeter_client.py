@@ -8,11 +8,28 @@ from pathlib import Path
 
 import pandas as pd
 
-# Importiere den Selenium Downloader aus dem gleichen Modul
-from .smartmeter_selenium import SmartMeterSeleniumDownloader
+# Relativ in Home Assistant, absolut im Worker-Prozess (smartmeter_worker.py)
+if __package__:
+    from .const import DEFAULT_DRIVER_MAX_AGE, DEFAULT_MAX_RSS_MB, DEFAULT_RUN_TIMEOUT
+    from .smartmeter_data import SeriesStore, load_registers
+    from .smartmeter_gaps import GapRefetcher
+    from .smartmeter_forecast import ConsumptionForecaster
+    from .smartmeter_peaks import PeakDemandTracker
+    # Importiere den Selenium Downloader aus dem gleichen Modul
+    from .smartmeter_selenium import SmartMeterSeleniumDownloader
+else:
+    from const import DEFAULT_DRIVER_MAX_AGE, DEFAULT_MAX_RSS_MB, DEFAULT_RUN_TIMEOUT
+    from smartmeter_data import SeriesStore, load_registers
+    from smartmeter_gaps import GapRefetcher
+    from smartmeter_forecast import ConsumptionForecaster
+    from smartmeter_peaks import PeakDemandTracker
+    from smartmeter_selenium import SmartMeterSeleniumDownloader
 
 _LOGGER = logging.getLogger(__name__)
 
+# Werden als Attribute der Prognosesensoren angezeigt
+FORECAST_DAY_KEYS = ("days_observed", "days_predicted", "days_unobserved")
+
 
 class SmartMeterClient:
     """Client to communicate with Smart Meter Burgenland Portal."""
@@ -22,14 +39,30 @@ class SmartMeterClient:
         username: str,
         password: str,
         headless: bool = True,
-        price_per_kwh: float = 0.15
+        price_per_kwh: float = 0.15,
+        profile_dir: str | None = None,
+        download_dir: str = "downloads",
+        lean: bool = False
     ) -> None:
         """Initialize the client."""
         self.username = username
         self.password = password
         self.headless = headless
+        self.lean = lean
         self.price_per_kwh = price_per_kwh
+        self.profile_dir = profile_dir
+        self.download_dir = download_dir
         self._downloader = None
+        # Bleibt über alle Coordinator-Refreshes bestehen und lernt inkrementell
+        self._forecaster = ConsumptionForecaster()
+        self._peaks = PeakDemandTracker()
+        # Gesamtreihe aller Downloads, Lücken werden gezielt nachgeladen
+        self._store = SeriesStore(Path(download_dir) / "smartmeter_series.csv")
+        self._gaps = GapRefetcher(
+            self._store,
+            self._fetch_window,
+            state_file=Path(download_dir) / "smartmeter_gaps.json"
+        )
 
     def _get_downloader(self):
         """Get or create downloader instance."""
@@ -37,10 +70,20 @@ class SmartMeterClient:
             self._downloader = SmartMeterSeleniumDownloader(
                 self.username,
                 self.password,
-                headless=self.headless
+                headless=self.headless,
+                max_driver_age=DEFAULT_DRIVER_MAX_AGE,
+                max_run_seconds=DEFAULT_RUN_TIMEOUT,
+                max_rss_mb=DEFAULT_MAX_RSS_MB,
+                profile_dir=self.profile_dir,
+                download_dir=self.download_dir,
+                lean=self.lean
             )
         return self._downloader
 
+    def _fetch_window(self, start_date, end_date):
+        """Fetch a single gap window with the warm browser."""
+        return self._get_downloader().download_csv(start_date=start_date, end_date=end_date)
+
     def test_connection(self) -> bool:
         """Test if we can authenticate with the host."""
         try:
@@ -67,21 +110,34 @@ class SmartMeterClient:
         try:
             downloader = self._get_downloader()
             
-            # Login
-            if not downloader.login():
-                raise Exception("Login failed")
-            
-            # Download CSV
-            csv_path = downloader.download_csv(days_back=30)
-            
-            # Close browser
-            downloader.close()
-            self._downloader = None
-            
+            # Watchdog: Laufzeit- und Speichergrenze, Browser wird sonst beendet
+            with downloader.watchdog.run("refresh") as usage:
+                # Browser bleibt zwischen den Refreshes offen und angemeldet,
+                # Login nur wenn die Sitzung fehlt oder abgelaufen ist
+                if not downloader.ensure_session():
+                    raise Exception("Login failed")
+                
+                # Download CSV
+                end_date = datetime.now()
+                start_date = end_date - timedelta(days=30)
+                csv_path = downloader.download_csv(start_date=start_date, end_date=end_date)
+                
+                # In die Gesamtreihe übernehmen und fällige Lücken nachladen
+                if csv_path and os.path.exists(csv_path):
+                    try:
+                        self._store.merge(csv_path)
+                        self._gaps.check(start_date, end_date)
+                        self._gaps.run_due()
+                        csv_path = str(self._store.path)
+                    except Exception as err:
+                        _LOGGER.warning("Gap check failed: %s", err)
+            
+            if usage["killed"]:
+                raise Exception(f"Browser stopped by watchdog: {usage['killed']}")
             if not csv_path or not os.path.exists(csv_path):
                 raise Exception("CSV download failed")
             
-            # Parse CSV
+            # Parse CSV (Gesamtreihe, damit nachgeladene Lücken in die Sensoren eingehen)
             return self._parse_csv(csv_path)
             
         except Exception as err:
@@ -90,96 +146,99 @@ class SmartMeterClient:
             raise
 
     def _parse_csv(self, csv_path: str) -> dict:
-        """Parse CSV file and extract consumption data."""
+        """Parse CSV file and extract data for every register in one pass."""
         try:
-            # Lese CSV mit verschiedenen Encodings
-            for encoding in ['utf-8', 'latin-1', 'iso-8859-1']:
-                try:
-                    df = pd.read_csv(csv_path, encoding=encoding, sep=None, engine='python')
-                    break
-                except:
-                    continue
-            
-            _LOGGER.debug(f"CSV Spalten: {df.columns.tolist()}")
-            _LOGGER.debug(f"CSV Shape: {df.shape}")
-            
-            # Finde Datums- und Verbrauchsspalten
-            date_col = None
-            consumption_col = None
-            
-            for col in df.columns:
-                col_lower = str(col).lower()
-                if 'datum' in col_lower or 'date' in col_lower or 'zeit' in col_lower:
-                    date_col = col
-                if 'verbrauch' in col_lower or 'consumption' in col_lower or 'kwh' in col_lower or 'wert' in col_lower:
-                    consumption_col = col
-            
-            if not date_col or not consumption_col:
-                _LOGGER.error(f"Konnte Spalten nicht finden. Verfügbar: {df.columns.tolist()}")
-                # Fallback: Nimm erste Spalte als Datum, zweite als Verbrauch
-                if len(df.columns) >= 2:
-                    date_col = df.columns[0]
-                    consumption_col = df.columns[1]
-                else:
-                    raise Exception("CSV Format nicht erkannt")
-            
-            _LOGGER.info(f"Verwende Datumsspalte: {date_col}, Verbrauchsspalte: {consumption_col}")
-            
-            # Konvertiere zu datetime
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df = df.dropna(subset=[date_col])
-            
-            # Konvertiere Verbrauch zu numeric
-            df[consumption_col] = pd.to_numeric(df[consumption_col], errors='coerce')
-            df = df.dropna(subset=[consumption_col])
-            
-            # Sortiere nach Datum
-            df = df.sort_values(date_col)
-            
-            # Berechne Statistiken
+            # Alle Register (Bezug, Einspeisung, Blindenergie) + Saldo
+            frame = load_registers(csv_path).dropna(how="all")
+            if frame.empty or "consumption" not in frame:
+                raise Exception("CSV Format nicht erkannt")
+            
+            _LOGGER.debug(f"Register: {frame.columns.tolist()}, Shape: {frame.shape}")
+            
+            # Tages- und Monatssummen aller Register in einem Schritt
+            daily = frame.resample("D").sum(min_count=1)
+            daily.index = daily.index.date
+            monthly = frame.resample("MS").sum(min_count=1)
+            monthly.index = monthly.index.date
+            
             today = datetime.now().date()
             yesterday = today - timedelta(days=1)
+            month_start = today.replace(day=1)
+            last_month_start = (month_start - timedelta(days=1)).replace(day=1)
+            
+            def _pick(table, key):
+                if key in table.index:
+                    return table.loc[key].fillna(0.0)
+                return pd.Series(0.0, index=frame.columns)
+            
+            periods = {
+                "today": _pick(daily, today),
+                "yesterday": _pick(daily, yesterday),
+                "month": _pick(monthly, month_start),
+                "last_month": _pick(monthly, last_month_start),
+            }
             
-            # Heute
-            today_data = df[df[date_col].dt.date == today]
-            consumption_today = float(today_data[consumption_col].sum()) if not today_data.empty else 0.0
+            data = {}
+            for register in frame.columns:
+                for period, values in periods.items():
+                    data[f"{register}_{period}"] = round(float(values[register]), 2)
             
-            # Gestern
-            yesterday_data = df[df[date_col].dt.date == yesterday]
-            consumption_yesterday = float(yesterday_data[consumption_col].sum()) if not yesterday_data.empty else 0.0
+            # Kosten nur für den Bezug
+            for period in periods:
+                data[f"cost_{period}"] = round(data[f"consumption_{period}"] * self.price_per_kwh, 2)
             
-            # Dieser Monat
-            this_month_data = df[df[date_col].dt.to_period('M') == pd.Period(today, freq='M')]
-            consumption_month = float(this_month_data[consumption_col].sum()) if not this_month_data.empty else 0.0
+            # Durchschnitt pro Tag (letzten 30 Tage, nur abgeschlossene Tage)
+            recent = daily.loc[[d for d in daily.index if today - timedelta(days=30) <= d < today], "consumption"]
+            avg_daily = float(recent.mean()) if recent.notna().any() else 0.0
             
-            # Letzter Monat
-            last_month = today.replace(day=1) - timedelta(days=1)
-            last_month_data = df[df[date_col].dt.to_period('M') == pd.Period(last_month, freq='M')]
-            consumption_last_month = float(last_month_data[consumption_col].sum()) if not last_month_data.empty else 0.0
+            # Letzter Messwert
+            readings = frame["consumption"].dropna()
+            last_reading = float(readings.iloc[-1]) if not readings.empty else 0.0
+            last_reading_time = readings.index[-1].isoformat() if not readings.empty else None
+            
+            # Prognose bis Monats- und Jahresende aus den Tagessummen
+            self._forecaster.update(daily["consumption"].dropna(), today)
+            forecast = self._forecaster.forecast(
+                today,
+                price_per_kwh=self.price_per_kwh,
+                partial_today=data["consumption_today"]
+            )
+            month_fc = forecast["month"]
+            year_fc = forecast["year"]
             
-            # Durchschnitt pro Tag (letzten 30 Tage)
-            days_30_ago = today - timedelta(days=30)
-            recent_data = df[df[date_col].dt.date >= days_30_ago]
-            avg_daily = float(recent_data[consumption_col].mean()) if not recent_data.empty else 0.0
+            # Leistungsspitzen - nur aus 15-Minuten-Werten (kWh x 4 = kW)
+            if len(readings) > 1 and readings.index.to_series().diff().median() == pd.Timedelta(minutes=15):
+                self._peaks.update(readings)
+            peaks_month = self._peaks.peaks(month_start)
+            peaks_last_month = self._peaks.peaks(last_month_start)
             
-            # Letzter Messwert
-            last_reading = float(df[consumption_col].iloc[-1]) if not df.empty else 0.0
-            last_reading_time = df[date_col].iloc[-1].isoformat() if not df.empty else None
-            
-            return {
-                "consumption_today": round(consumption_today, 2),
-                "consumption_yesterday": round(consumption_yesterday, 2),
-                "consumption_month": round(consumption_month, 2),
-                "consumption_last_month": round(consumption_last_month, 2),
+            data.update({
                 "avg_daily": round(avg_daily, 2),
-                "cost_today": round(consumption_today * self.price_per_kwh, 2),
-                "cost_yesterday": round(consumption_yesterday * self.price_per_kwh, 2),
-                "cost_month": round(consumption_month * self.price_per_kwh, 2),
-                "cost_last_month": round(consumption_last_month * self.price_per_kwh, 2),
                 "last_reading": round(last_reading, 2),
                 "last_reading_time": last_reading_time,
+                "forecast_month": month_fc["projected"],
+                "forecast_month_lower": month_fc["lower"],
+                "forecast_month_upper": month_fc["upper"],
+                "forecast_year": year_fc["projected"],
+                "forecast_year_lower": year_fc["lower"],
+                "forecast_year_upper": year_fc["upper"],
+                "forecast_cost_month": month_fc["cost"],
+                "forecast_cost_month_lower": month_fc["cost_lower"],
+                "forecast_cost_month_upper": month_fc["cost_upper"],
+                "forecast_cost_year": year_fc["cost"],
+                "forecast_cost_year_lower": year_fc["cost_lower"],
+                "forecast_cost_year_upper": year_fc["cost_upper"],
+                "forecast_days_fitted": self._forecaster.days_fitted,
+                "forecast_month_days": {key: month_fc[key] for key in FORECAST_DAY_KEYS},
+                "forecast_year_days": {key: year_fc[key] for key in FORECAST_DAY_KEYS},
+                "peak_demand_month": peaks_month[0]["kw"] if peaks_month else None,
+                "peak_demand_month_top": peaks_month,
+                "peak_demand_last_month": peaks_last_month[0]["kw"] if peaks_last_month else None,
+                "peak_demand_last_month_top": peaks_last_month,
+                "registers": frame.columns.tolist(),
                 "price_per_kwh": self.price_per_kwh
-            }
+            })
+            return data
             
         except Exception as err:
             _LOGGER.error(f"Error parsing CSV: {err}")
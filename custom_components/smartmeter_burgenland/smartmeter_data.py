@@ -0,0 +1,403 @@
+"""
+Smart Meter Netz Burgenland - Datenaufbereitung
+Liest 15-Minuten-Exporte ein und leitet gröbere Auflösungen lokal ab
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TIMEZONE = "Europe/Vienna"
+
+# Auflösung -> pandas Resample-Regel (15min ist die Rohauflösung des Portals)
+RESOLUTIONS = {
+    '15min': None,
+    'hourly': 'h',
+    'daily': 'D',
+    'monthly': 'MS',
+}
+
+DATE_KEYWORDS = ('datum', 'date', 'zeit', 'time')
+
+# Spaltenname -> Register. Reihenfolge ist wichtig: "Einspeisung (kWh)" enthält
+# auch "kwh", Blindenergie-Spalten auch "bezug"/"einspeisung".
+NET_KEYWORDS = ('saldo', 'netto', 'net balance')
+REACTIVE_KEYWORDS = ('blind', 'reactive', 'kvarh', '3.8.0', '4.8.0')
+FEED_IN_KEYWORDS = ('einspeis', 'lieferung', 'feed', 'export', 'erzeugung', '2.8.0')
+CONSUMPTION_KEYWORDS = ('bezug', 'verbrauch', 'consumption', 'import', '1.8.0', 'kwh', 'wert')
+
+# Register -> Spaltenname beim Schreiben
+REGISTER_LABELS = {
+    'consumption': 'Verbrauch (kWh)',
+    'feed_in': 'Einspeisung (kWh)',
+    'reactive_consumption': 'Blindenergie Bezug (kvarh)',
+    'reactive_feed_in': 'Blindenergie Lieferung (kvarh)',
+    'reactive': 'Blindenergie (kvarh)',
+    'net': 'Saldo (kWh)',
+}
+
+
+def read_export(filepath):
+    """
+    Liest eine CSV-Datei des Portals mit passendem Trennzeichen und Encoding ein
+
+    Args:
+        filepath: Pfad zur CSV-Datei
+
+    Returns:
+        DataFrame: Rohdaten wie in der Datei
+    """
+    last_error = None
+    for encoding in ['utf-8', 'latin-1']:
+        try:
+            df = pd.read_csv(filepath, sep=';', decimal=',', encoding=encoding)
+            if len(df.columns) < 2:
+                df = pd.read_csv(filepath, sep=',', encoding=encoding)
+            return df
+        except UnicodeDecodeError as e:
+            last_error = e
+            continue
+    raise last_error
+
+
+def parse_timestamps(column):
+    """Parst Zeitstempel im deutschen (TT.MM.JJJJ) oder ISO-Format"""
+    sample = column.dropna().astype(str).head(1)
+    dayfirst = not (len(sample) and sample.iloc[0][:4].isdigit())
+    return pd.to_datetime(column, dayfirst=dayfirst, errors='coerce')
+
+
+def localize_index(timestamps):
+    """
+    Ordnet lokale Zeitstempel korrekt der Zeitzone Europe/Vienna zu
+
+    Bei der Zeitumstellung im Oktober kommen 02:00-02:45 doppelt vor: das erste
+    Auftreten ist Sommerzeit, das zweite Winterzeit. Nicht existierende Zeiten
+    im März werden nach vorne verschoben.
+    """
+    index = pd.DatetimeIndex(timestamps)
+    if index.tz is not None:
+        return index.tz_convert(TIMEZONE)
+    ambiguous = ~index.duplicated(keep='first')
+    return index.tz_localize(TIMEZONE, ambiguous=ambiguous, nonexistent='shift_forward')
+
+
+def _register_for(column):
+    """Ordnet einen Spaltennamen einem Register zu (oder None)"""
+    name = str(column).lower()
+    if any(k in name for k in NET_KEYWORDS):
+        return None  # Saldo wird immer selbst berechnet
+    if any(k in name for k in REACTIVE_KEYWORDS):
+        if any(k in name for k in ('bezug', 'import', '3.8.0')):
+            return 'reactive_consumption'
+        if any(k in name for k in FEED_IN_KEYWORDS + ('4.8.0',)):
+            return 'reactive_feed_in'
+        return 'reactive'
+    if any(k in name for k in FEED_IN_KEYWORDS):
+        return 'feed_in'
+    if any(k in name for k in CONSUMPTION_KEYWORDS):
+        return 'consumption'
+    return None
+
+
+def detect_columns(columns):
+    """
+    Erkennt Zeitspalte und alle Register (Bezug, Einspeisung, Blindenergie)
+
+    Pro Register gewinnt die erste passende Spalte. Wird gar kein Register
+    erkannt, gilt die erste Nicht-Zeitspalte als Verbrauch.
+
+    Args:
+        columns: Spaltennamen der CSV
+
+    Returns:
+        tuple: (date_col, {register: spaltenname})
+    """
+    columns = list(columns)
+    date_col = next((c for c in columns if any(k in str(c).lower() for k in DATE_KEYWORDS)), columns[0])
+
+    registers = {}
+    for col in columns:
+        if col == date_col:
+            continue
+        register = _register_for(col)
+        if register and register not in registers:
+            registers[register] = col
+
+    if not registers:
+        fallback = next((c for c in columns if c != date_col), None)
+        if fallback is None:
+            raise ValueError("CSV Format nicht erkannt")
+        registers['consumption'] = fallback
+
+    return date_col, registers
+
+
+def load_registers(filepath):
+    """
+    Lädt einen Export mit allen Registern in einem Durchgang
+
+    Args:
+        filepath: Pfad zur CSV-Datei
+
+    Returns:
+        DataFrame: siehe registers_from_frame()
+    """
+    return registers_from_frame(read_export(filepath))
+
+
+def registers_from_frame(df):
+    """
+    Wandelt eingelesene Rohdaten in eine typisierte Register-Zeitreihe um
+
+    Args:
+        df: Rohdaten aus read_export()
+
+    Returns:
+        DataFrame: Index in Europe/Vienna, float-Spalten je Register
+                   ('consumption', optional 'feed_in', 'reactive_*') und
+                   'net' = Bezug - Einspeisung, falls eingespeist wird
+    """
+    date_col, registers = detect_columns(df.columns)
+
+    raw = df[list(registers.values())]
+    text = raw.select_dtypes(include='object').columns
+    if len(text):
+        raw = raw.copy()
+        raw[text] = raw[text].apply(lambda col: col.str.replace(',', '.', regex=False))
+    values = raw.apply(pd.to_numeric, errors='coerce').astype('float64')
+    values.columns = list(registers.keys())
+
+    timestamps = parse_timestamps(df[date_col])
+    valid = timestamps.notna().to_numpy()
+    frame = values[valid].set_axis(localize_index(timestamps[valid]), axis=0)
+    frame.index.name = 'timestamp'
+
+    if 'consumption' in frame and 'feed_in' in frame:
+        frame['net'] = frame['consumption'] - frame['feed_in']
+
+    return frame.sort_index(kind='stable')
+
+
+def aggregate_registers(frame):
+    """
+    Summe, Mittelwert, Maximum und Minimum aller Register in einem Schritt
+
+    Returns:
+        dict: {register: {'total', 'average', 'max', 'min'}}
+    """
+    stats = frame.agg(['sum', 'mean', 'max', 'min'])
+    stats.index = ['total', 'average', 'max', 'min']
+    return {
+        register: {key: float(value) for key, value in stats[register].items()}
+        for register in stats.columns
+    }
+
+
+def resample_registers(series, data_type):
+    """
+    Leitet eine gröbere Auflösung aus der 15-Minuten-Zeitreihe ab
+
+    Die Intervalle richten sich nach lokaler Zeit, Tage mit Zeitumstellung
+    haben daher 23 bzw. 25 Stunden. Perioden ganz ohne Messwerte bleiben leer
+    (NaN) statt 0 kWh.
+
+    Args:
+        series: Ergebnis von load_registers()
+        data_type: '15min', 'hourly', 'daily' oder 'monthly'
+
+    Returns:
+        DataFrame: Summen pro Periode
+    """
+    if data_type not in RESOLUTIONS:
+        raise ValueError(f"Unbekannte Auflösung: {data_type}")
+
+    rule = RESOLUTIONS[data_type]
+    if rule is None:
+        return series
+    return series.resample(rule).sum(min_count=1)
+
+
+def write_export(series, filepath):
+    """
+    Schreibt eine Zeitreihe im CSV-Format des Portals (Semikolon, Dezimalkomma)
+
+    Zeitstempel werden wie beim Portal als lokale Uhrzeit ohne Offset geschrieben,
+    load_registers() ordnet doppelte Stunden beim Einlesen wieder richtig zu.
+    """
+    out = series.rename(columns=REGISTER_LABELS)
+    out.index = out.index.tz_localize(None).strftime('%Y-%m-%d %H:%M:%S')
+    out.index.name = 'Datum'
+    out.to_csv(filepath, sep=';', decimal=',')
+    return str(filepath)
+
+
+def fit_to_range(filepath, start, end):
+    """
+    Gleicht einen Export mit dem angeforderten Zeitraum ab
+
+    Werte außerhalb des Zeitraums werden abgeschnitten und die Datei neu
+    geschrieben, fehlende Tage am Anfang oder Ende als Warnung gemeldet.
+
+    Args:
+        filepath: Pfad zur heruntergeladenen CSV
+        start, end: Angeforderter Zeitraum (date/datetime, beide Tage inklusive)
+
+    Returns:
+        dict: {'requested', 'first', 'last', 'trimmed', 'complete'} oder None
+    """
+    try:
+        frame = load_registers(filepath)
+    except Exception as e:
+        logger.warning(f"Zeitraum des Exports nicht prüfbar: {e}")
+        return None
+
+    lower = pd.Timestamp(start.strftime('%Y-%m-%d')).tz_localize(TIMEZONE)
+    upper = (pd.Timestamp(end.strftime('%Y-%m-%d')) + pd.Timedelta(days=1)).tz_localize(TIMEZONE)
+
+    # Stempelt das Portal Intervall-Enden (00:15 ... 00:00), gehört 00:00 zum Vortag
+    step = pd.Timedelta(minutes=15)
+    if lower not in frame.index and (lower + step) in frame.index:
+        inside = (frame.index > lower) & (frame.index <= upper)
+    else:
+        inside = (frame.index >= lower) & (frame.index < upper)
+
+    trimmed = int((~inside).sum())
+    if trimmed:
+        logger.debug(f"✂️ {trimmed} Werte außerhalb von {start:%d.%m.%Y} - {end:%d.%m.%Y} entfernt")
+        frame = frame[inside]
+        write_export(frame, filepath)
+
+    report = {
+        'requested': (f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"),
+        'first': frame.index.min().isoformat() if len(frame) else None,
+        'last': frame.index.max().isoformat() if len(frame) else None,
+        'trimmed': trimmed,
+        'complete': False,
+    }
+    if frame.empty:
+        logger.warning(f"⚠️ Export enthält keine Werte für {start:%d.%m.%Y} - {end:%d.%m.%Y}")
+        return report
+
+    # Das Portal veröffentlicht Werte mit etwa einem Tag Verzögerung
+    published = pd.Timestamp.now(tz=TIMEZONE).normalize() - pd.Timedelta(days=1)
+    expected_last = min(upper, published) - 2 * step
+    missing_start = frame.index.min() > lower + step
+    missing_end = frame.index.max() < expected_last
+    if missing_start or missing_end:
+        logger.warning(f"⚠️ Export unvollständig: {frame.index.min():%d.%m.%Y %H:%M} - "
+                       f"{frame.index.max():%d.%m.%Y %H:%M} "
+                       f"(angefordert {start:%d.%m.%Y} - {end:%d.%m.%Y})")
+    else:
+        report['complete'] = True
+    return report
+
+
+class ResolutionCache:
+    """
+    Zwischenspeicher für lokal abgeleitete Auflösungen
+
+    Pro 15-Minuten-Datei wird die Rohzeitreihe einmal eingelesen, jede
+    Auflösung einmal berechnet. Ändert sich die Datei, wird neu eingelesen.
+    """
+
+    def __init__(self, max_files=4):
+        self.max_files = max_files
+        self._entries = OrderedDict()
+
+    def get(self, filepath, data_type='15min'):
+        """
+        Liefert die Zeitreihe in der gewünschten Auflösung
+
+        Args:
+            filepath: Pfad zur 15-Minuten-CSV
+            data_type: '15min', 'hourly', 'daily' oder 'monthly'
+
+        Returns:
+            DataFrame: Zeitreihe mit einer Spalte je Register
+        """
+        path = Path(filepath).resolve()
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._entries.get(path)
+        if entry is None or entry[0] != stamp:
+            entry = (stamp, {'15min': load_registers(path)})
+            self._entries[path] = entry
+        self._entries.move_to_end(path)
+        while len(self._entries) > self.max_files:
+            self._entries.popitem(last=False)
+
+        frames = entry[1]
+        if data_type not in frames:
+            frames[data_type] = resample_registers(frames['15min'], data_type)
+        return frames[data_type]
+
+    def export(self, filepath, data_type):
+        """
+        Speichert die abgeleitete Auflösung neben der Rohdatei
+
+        Returns:
+            str: Pfad zur CSV in der gewünschten Auflösung (Rohdatei bei '15min')
+        """
+        if data_type == '15min':
+            return str(filepath)
+
+        path = Path(filepath)
+        target = path.with_name(f"{path.stem}_{data_type}{path.suffix}")
+        stat = path.stat()
+        if target.exists() and target.stat().st_mtime_ns >= stat.st_mtime_ns:
+            return str(target)
+
+        write_export(self.get(path, data_type), target)
+        logger.info(f"✓ Auflösung '{data_type}' lokal abgeleitet: {target}")
+        return str(target)
+
+
+def empty_series():
+    """Leere Zeitreihe im Format von load_registers()"""
+    index = pd.DatetimeIndex([], tz=TIMEZONE, name='timestamp')
+    return pd.DataFrame({'consumption': pd.Series(dtype=float)}, index=index)
+
+
+class SeriesStore:
+    """
+    Gesammelte 15-Minuten-Zeitreihe über alle Downloads
+
+    Jeder Download wird in die Gesamtreihe eingearbeitet, neuere Werte
+    überschreiben ältere. Die Reihe liegt als CSV im Download-Ordner.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._series = None
+
+    @property
+    def series(self):
+        if self._series is None:
+            self._series = load_registers(self.path) if self.path.exists() else empty_series()
+        return self._series
+
+    def merge(self, filepath):
+        """
+        Arbeitet einen 15-Minuten-Export (alle Register) in die Gesamtreihe ein
+
+        Returns:
+            int: Anzahl übernommener Messwerte
+        """
+        new = load_registers(filepath).dropna(how='all')
+        new = new[~new.index.duplicated(keep='last')]
+        current = self.series
+        kept = current[~current.index.isin(new.index)]
+        self._series = pd.concat([kept, new]).sort_index(kind='stable')
+        self.save()
+        return len(new)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_export(self.series, self.path)
+
@@ -0,0 +1,279 @@
+"""Smart Meter Burgenland worker process.
+
+Selenium, Chrome, pandas and the forecast state live in a separate, long-lived
+Python process. Home Assistant talks to it over stdin/stdout, one JSON object
+per line, and only receives the finished result dict.
+
+Protocol:
+    -> {"id": 1, "cmd": "configure" | "fetch" | "test" | "shutdown", "args": {...}}
+    <- {"id": 1, "ok": true, "result": ...}  or  {"id": 1, "ok": false, "error": "..."}
+    <- {"log": 20, "name": "smartmeter_selenium", "message": "..."}  (any time)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+
+# Relativ in Home Assistant, absolut wenn als Skript gestartet
+if __package__:
+    from .const import DEFAULT_WORKER_TIMEOUT
+else:
+    from const import DEFAULT_WORKER_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.realpath(__file__)
+
+# Antworten enthalten nur das Ergebnis-Dict, Zeilen bleiben klein
+STREAM_LIMIT = 4 * 1024 * 1024
+SHUTDOWN_TIMEOUT = 30  # seconds, worker is killed afterwards
+CONFIGURE_TIMEOUT = 60  # seconds, includes importing selenium and pandas
+
+
+def _jsonable(value):
+    """Fallback for numpy scalars and timestamps in the result dict."""
+    if hasattr(value, "item"):
+        return value.item()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class SmartMeterWorkerClient:
+    """Home Assistant side of the worker: same calls as SmartMeterClient, but async."""
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        headless: bool = True,
+        price_per_kwh: float = 0.15,
+        profile_dir: str | None = None,
+        download_dir: str = "downloads",
+        lean: bool = False,
+        timeout: float = DEFAULT_WORKER_TIMEOUT
+    ) -> None:
+        """Initialize the client; the worker is started on the first request."""
+        self._config = {
+            "username": username,
+            "password": password,
+            "headless": headless,
+            "price_per_kwh": price_per_kwh,
+            "profile_dir": profile_dir,
+            "download_dir": download_dir,
+            "lean": lean,
+        }
+        self.timeout = timeout
+        self.restarts = 0
+        self._process: asyncio.subprocess.Process | None = None
+        self._next_id = 0
+        # Der Worker bearbeitet eine Anfrage nach der anderen
+        self._lock = asyncio.Lock()
+
+    @property
+    def pid(self) -> int | None:
+        """PID of the running worker or None."""
+        if self._process is None or self._process.returncode is not None:
+            return None
+        return self._process.pid
+
+    async def _start(self) -> asyncio.subprocess.Process:
+        """Start the worker and hand over the configuration."""
+        if self._process is not None:
+            # Abgestürzt oder beendet - Chrome-Reste räumt der neue Worker beim Start auf
+            _LOGGER.warning("Worker exited with code %s, restarting", self._process.returncode)
+            self.restarts += 1
+
+        # Eigene Prozessgruppe: beim Abbruch werden Chrome und chromedriver mit beendet
+        self._process = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT,
+            start_new_session=True,
+        )
+        _LOGGER.debug("Worker started (pid %s)", self._process.pid)
+
+        # Zugangsdaten über stdin, nicht in der Kommandozeile
+        args = dict(self._config, log_level=logging.getLogger(__package__ or __name__).getEffectiveLevel())
+        try:
+            await self._call("configure", args, CONFIGURE_TIMEOUT)
+        except Exception:
+            # Ein unkonfigurierter Worker darf nicht weiterlaufen
+            await self._kill()
+            raise
+        return self._process
+
+    async def _call(self, cmd: str, args: dict, timeout: float):
+        """Send one request and wait for its reply, forwarding log lines meanwhile."""
+        process = self._process
+        self._next_id += 1
+        request_id = self._next_id
+        line = json.dumps({"id": request_id, "cmd": cmd, "args": args}) + "\n"
+        try:
+            process.stdin.write(line.encode())
+            await process.stdin.drain()
+            return await asyncio.wait_for(self._reply(process, request_id), timeout)
+        except asyncio.TimeoutError:
+            await self._kill()
+            raise Exception(f"Worker did not answer '{cmd}' within {timeout:.0f}s")
+        except (BrokenPipeError, ConnectionResetError):
+            await process.wait()
+            raise Exception(f"Worker exited with code {process.returncode}")
+
+    async def _reply(self, process: asyncio.subprocess.Process, request_id: int):
+        """Read lines until the reply to request_id arrives."""
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                await process.wait()
+                raise Exception(f"Worker exited with code {process.returncode}")
+            try:
+                message = json.loads(line)
+            except ValueError:
+                _LOGGER.debug("Worker: %s", line.decode(errors="replace").rstrip())
+                continue
+
+            if "log" in message:
+                # Unter dem Namen der Integration loggen, damit die HA-Logger-Konfiguration greift
+                name = message.get("name") or "worker"
+                logger = logging.getLogger(f"{__package__}.{name}" if __package__ else name)
+                logger.log(message["log"], "%s", message.get("message", ""))
+                continue
+            if message.get("id") != request_id:
+                continue
+            if message.get("ok"):
+                return message.get("result")
+            raise Exception(message.get("error") or "Worker error")
+
+    async def _request(self, cmd: str, timeout: float | None = None, **args):
+        """Run one command in the worker, starting it if necessary."""
+        async with self._lock:
+            if self.pid is None:
+                await self._start()
+            return await self._call(cmd, args, timeout or self.timeout)
+
+    async def _kill(self) -> None:
+        """Kill the worker together with its browser processes."""
+        process = self._process
+        if process is None or process.returncode is not None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, AttributeError):
+            process.kill()
+        await process.wait()
+        _LOGGER.warning("Worker killed (pid %s)", process.pid)
+
+    async def async_get_consumption_data(self) -> dict:
+        """Download and parse consumption data in the worker."""
+        return await self._request("fetch")
+
+    async def async_test_connection(self) -> bool:
+        """Test if we can authenticate with the host."""
+        return bool(await self._request("test"))
+
+    async def async_close(self) -> None:
+        """Close the browser and stop the worker."""
+        async with self._lock:
+            if self.pid is None:
+                return
+            try:
+                await self._call("shutdown", {}, SHUTDOWN_TIMEOUT)
+                await asyncio.wait_for(self._process.wait(), SHUTDOWN_TIMEOUT)
+            except Exception as err:
+                _LOGGER.debug("Worker shutdown: %s", err)
+                await self._kill()
+            self._process = None
+
+
+class _ProtocolHandler(logging.Handler):
+    """Sends log records of the worker as JSON lines to Home Assistant."""
+
+    def __init__(self, send):
+        super().__init__()
+        self._send = send
+
+    def emit(self, record):
+        try:
+            name = "smartmeter_worker" if record.name == "__main__" else record.name
+            self._send({"log": record.levelno, "name": name, "message": self.format(record)})
+        except Exception:
+            self.handleError(record)
+
+
+def serve(stdin, stdout) -> None:
+    """Worker loop: read requests from stdin, write replies to stdout."""
+    lock = threading.Lock()
+
+    def send(message):
+        # Auch der Watchdog-Thread loggt - Zeilen dürfen sich nicht mischen
+        with lock:
+            stdout.write(json.dumps(message, default=_jsonable) + "\n")
+            stdout.flush()
+
+    # Erst nach dem Import, smartmeter_selenium richtet beim Import selbst Logging ein
+    if __package__:
+        from .smartmeter_client import SmartMeterClient
+    else:
+        from smartmeter_client import SmartMeterClient
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_ProtocolHandler(send))
+    for noisy in ("selenium", "urllib3"):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+
+    client = None
+    try:
+        for line in stdin:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            cmd = request.get("cmd")
+            args = request.get("args") or {}
+            try:
+                if cmd == "configure":
+                    root.setLevel(args.pop("log_level", logging.INFO))
+                    if client:
+                        client.close()
+                    client = SmartMeterClient(**args)
+                    result = os.getpid()
+                elif client is None:
+                    raise Exception("Worker not configured")
+                elif cmd == "fetch":
+                    result = client.get_consumption_data()
+                elif cmd == "test":
+                    result = client.test_connection()
+                elif cmd == "shutdown":
+                    client.close()
+                    result = True
+                else:
+                    raise Exception(f"Unknown command: {cmd}")
+                send({"id": request.get("id"), "ok": True, "result": result})
+            except Exception as err:
+                send({"id": request.get("id"), "ok": False, "error": str(err) or type(err).__name__})
+            if cmd == "shutdown":
+                break
+    finally:
+        # stdin geschlossen (Home Assistant beendet) - Browser nicht zurücklassen
+        if client:
+            client.close()
+
+
+def main() -> None:
+    """Entry point when started by SmartMeterWorkerClient."""
+    # stdout gehört dem Protokoll; print() und Ausgaben von Kindprozessen landen auf stderr
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    serve(sys.stdin, protocol)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Smart Meter Netz Burgenland - Formular-Login per HTTP
+Liest Anmeldeformulare (Ziel, versteckte CSRF-/State-Felder, Feldnamen) aus
+dem HTML und findet Fehlermeldungen und Bearer-Tokens in den Antworten
+"""
+
+from urllib.parse import unquote, urljoin
+import re
+
+from bs4 import BeautifulSoup
+
+# Eingabefelder, die der Browser nicht als Formularwert mitschickt
+IGNORED_INPUTS = ('submit', 'button', 'image', 'reset', 'file')
+USERNAME_HINTS = ('user', 'mail', 'login', 'kunde')
+CSRF_META = ('csrf-token', '_csrf', 'csrf_token', 'xsrf-token')
+ERROR_SELECTORS = "[role='alert'], .alert, .error, .alert-error, mat-error, #input-error, .kc-feedback-text"
+# Merkmale der angemeldeten Seite (wie DASHBOARD_SELECTORS im Selenium-Downloader)
+LOGGED_IN_SELECTORS = "a[href*='logout' i], [class*='dashboard' i], [id*='dashboard' i]"
+LOGOUT_TEXTS = ('abmelden', 'logout', 'log out')
+
+# Token in Weiterleitungs-Adressen (OAuth implicit flow) und in Skripten der Seite.
+# Der Schlüssel muss für sich stehen, csrf_token o.ä. zählt nicht.
+URL_TOKEN = re.compile(r'[#?&](?:access_token|id_token)=([^&#]+)')
+SCRIPT_TOKEN = re.compile(
+    r'(?<![\w-])["\']?(?:access_token|accessToken|authToken|id_token|bearerToken)["\']?\s*[:=]\s*'
+    r'["\']([\w\-.~+/]{16,}=*)["\']'
+)
+
+
+def _soup(html):
+    return BeautifulSoup(html or '', 'html.parser')
+
+
+def find_login_form(html, page_url):
+    """
+    Sucht das Anmeldeformular (Formular mit Passwortfeld)
+
+    Versteckte Felder (CSRF-Token, State, Redirect-Ziel) werden mit ihren
+    Werten übernommen, damit der POST genau dem des Browsers entspricht.
+
+    Args:
+        html: Inhalt der Login-Seite
+        page_url: Adresse der Seite (nach Weiterleitungen) für relative Formularziele
+
+    Returns:
+        dict: {'action', 'method', 'fields', 'username_field', 'password_field',
+               'headers'} oder None wenn die Seite kein Anmeldeformular enthält
+    """
+    soup = _soup(html)
+    for form in soup.find_all('form'):
+        password = form.find('input', attrs={'type': re.compile('^password$', re.I)})
+        if password is None or not password.get('name'):
+            continue
+
+        fields = {}
+        candidates = []
+        submit = None
+        for field in form.find_all(['input', 'button', 'select', 'textarea']):
+            name = field.get('name')
+            if not name or field is password:
+                continue
+            if field.name == 'select':
+                option = field.find('option', selected=True) or field.find('option')
+                fields[name] = option.get('value', option.text) if option else ''
+                continue
+            if field.name == 'textarea':
+                fields[name] = field.text
+                continue
+            kind = (field.get('type') or ('submit' if field.name == 'button' else 'text')).lower()
+            if kind in IGNORED_INPUTS:
+                # Der Browser schickt den geklickten (ersten) Button mit
+                if submit is None and kind == 'submit':
+                    submit = (name, field.get('value', ''))
+                continue
+            if kind in ('checkbox', 'radio') and not field.has_attr('checked'):
+                continue
+            if kind in ('text', 'email', 'tel') and not field.get('value'):
+                candidates.append(name)
+                continue
+            fields[name] = field.get('value', '')
+
+        if not candidates:
+            continue
+        username = next((c for c in candidates if any(h in c.lower() for h in USERNAME_HINTS)), candidates[0])
+        for other in candidates:
+            if other != username:
+                fields[other] = ''
+        if submit:
+            fields.setdefault(*submit)
+
+        headers = {}
+        meta = soup.find('meta', attrs={'name': lambda n: n and n.lower() in CSRF_META})
+        if meta and meta.get('content'):
+            headers['X-CSRF-Token'] = meta['content']
+
+        return {
+            'action': urljoin(page_url, form.get('action') or page_url),
+            'method': (form.get('method') or 'post').upper(),
+            'fields': fields,
+            'username_field': username,
+            'password_field': password['name'],
+            'headers': headers,
+        }
+    return None
+
+
+def has_password_field(html):
+    """True wenn die Seite (noch) ein Passwortfeld zeigt"""
+    return _soup(html).find('input', attrs={'type': re.compile('^password$', re.I)}) is not None
+
+
+def login_error(html):
+    """Text der ersten Fehlermeldung auf der Seite oder None"""
+    for element in _soup(html).select(ERROR_SELECTORS):
+        text = element.get_text(" ", strip=True)
+        if text:
+            return text
+    return None
+
+
+def is_logged_in_page(html):
+    """True wenn die Seite erkennbar zum angemeldeten Bereich gehört (Logout-Link, Dashboard)"""
+    soup = _soup(html)
+    if soup.select_one(LOGGED_IN_SELECTORS):
+        return True
+    return any(
+        element.get_text(" ", strip=True).lower() in LOGOUT_TEXTS
+        for element in soup.find_all(['a', 'button'])
+    )
+
+
+def find_bearer_token(html, urls=()):
+    """
+    Sucht ein Bearer-Token in Weiterleitungs-Adressen und im HTML der Zielseite
+
+    Args:
+        html: Inhalt der Seite nach dem Login
+        urls: Adressen der Weiterleitungskette (Location-Header, End-URL)
+
+    Returns:
+        str: Token oder None
+    """
+    for url in urls:
+        match = URL_TOKEN.search(url or '')
+        if match:
+            return unquote(match.group(1))
+    match = SCRIPT_TOKEN.search(html or '')
+    return match.group(1) if match else None
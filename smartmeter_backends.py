@@ -0,0 +1,453 @@
+"""
+Smart Meter Netz Burgenland - Download-Verfahren mit automatischer Auswahl
+Alle Verfahren (API, Hybrid, Selenium, Playwright, Datei-Import) stehen hinter
+derselben Schnittstelle. SmartMeterAutoDownloader misst je Verfahren Erfolgsquote
+und Dauer und probiert sie in der Reihenfolge der erwarteten Kosten durch.
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import json
+import logging
+import os
+import shutil
+import statistics
+import time
+
+from smartmeter_data import fit_to_range
+
+try:
+    from smartmeter_downloader import SmartMeterDownloader
+except ImportError:
+    SmartMeterDownloader = None
+
+try:
+    from smartmeter_selenium import SmartMeterSeleniumDownloader
+except ImportError:
+    SmartMeterSeleniumDownloader = None
+
+try:
+    import smartmeter_playwright
+except ImportError:
+    smartmeter_playwright = None
+
+logger = logging.getLogger(__name__)
+
+# Nur die letzten Versuche zählen, damit sich die Reihenfolge an Änderungen am Portal anpasst
+STATS_WINDOW = 20
+
+BACKENDS = {}
+
+
+def register_backend(cls):
+    """Nimmt ein Verfahren in BACKENDS auf (als Klassen-Dekorator verwendbar)"""
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+def percentile(values, share):
+    """Perzentil mit linearer Interpolation (auch für wenige Werte)"""
+    values = sorted(values)
+    if len(values) == 1:
+        return values[0]
+    position = (len(values) - 1) * share
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class FetchBackend:
+    """
+    Gemeinsame Schnittstelle aller Download-Verfahren
+
+    fetch() liefert den Pfad einer 15-Minuten-CSV für den Zeitraum oder None.
+    Unterklassen setzen name, label und default_cost (geschätzte Sekunden je
+    Abruf, gilt bis echte Messwerte vorliegen).
+    """
+
+    name = None
+    label = None
+    default_cost = 60.0
+    # False für Verfahren ohne Portal-Zugang (Login wird übersprungen)
+    uses_portal = True
+
+    def __init__(self, username, password, download_dir="downloads", headless=True, base_url=None, lean=False):
+        self.username = username
+        self.password = password
+        self.download_dir = Path(download_dir)
+        self.headless = headless
+        self.base_url = base_url
+        self.lean = lean
+
+    @classmethod
+    def available(cls):
+        """True wenn die benötigten Pakete installiert sind"""
+        return True
+
+    def ready(self):
+        """False wenn ein Versuch sicher nichts liefert (wird dann nicht gezählt)"""
+        return True
+
+    def login(self):
+        """Meldet sich am Portal an, True bei Erfolg"""
+        return True
+
+    def fetch(self, start, end):
+        """Lädt den Zeitraum start - end (beide Tage inklusive), Pfad oder None"""
+        raise NotImplementedError
+
+    def close(self):
+        """Gibt Browser bzw. Sitzung frei"""
+
+
+@register_backend
+class ApiBackend(FetchBackend):
+    """Export direkt per HTTP (SmartMeterDownloader)"""
+
+    name = "api"
+    label = "API"
+    default_cost = 5.0
+    browser_login = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.downloader = None
+
+    @classmethod
+    def available(cls):
+        return SmartMeterDownloader is not None
+
+    def _get(self):
+        if self.downloader is None:
+            self.downloader = SmartMeterDownloader(
+                self.username, self.password, browser_login=self.browser_login,
+                headless=self.headless, base_url=self.base_url, download_dir=self.download_dir
+            )
+        return self.downloader
+
+    def login(self):
+        return self._get().login()
+
+    def fetch(self, start, end):
+        downloader = self._get()
+        if not downloader.download_csv(start, end, '15min'):
+            return None
+        # Wie beim Browser-Export nur den angeforderten Zeitraum behalten. Eine HTML-
+        # oder Fehlerseite mit Status 200 ist nicht lesbar bzw. leer und zählt als Fehlschlag.
+        report = fit_to_range(downloader.last_raw_file, start, end)
+        if not report or not report['first']:
+            logger.warning(f"Antwort enthält keine Messwerte: {downloader.last_raw_file}")
+            return None
+        return downloader.last_raw_file
+
+    def close(self):
+        if self.downloader:
+            self.downloader.session.close()
+            self.downloader = None
+
+
+@register_backend
+class HybridBackend(ApiBackend):
+    """Login im Browser, Export per HTTP"""
+
+    name = "hybrid"
+    label = "Hybrid"
+    default_cost = 25.0
+    browser_login = True
+
+    @classmethod
+    def available(cls):
+        return SmartMeterDownloader is not None and SmartMeterSeleniumDownloader is not None
+
+
+@register_backend
+class SeleniumBackend(FetchBackend):
+    """Export über die Portal-Seite in Chrome (SmartMeterSeleniumDownloader)"""
+
+    name = "selenium"
+    label = "Selenium"
+    default_cost = 45.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.downloader = None
+
+    @classmethod
+    def available(cls):
+        return SmartMeterSeleniumDownloader is not None
+
+    def _create(self):
+        return SmartMeterSeleniumDownloader(
+            self.username, self.password, headless=self.headless,
+            download_dir=self.download_dir, base_url=self.base_url, lean=self.lean
+        )
+
+    def login(self):
+        if self.downloader is None:
+            self.downloader = self._create()
+        return self.downloader.ensure_session()
+
+    def fetch(self, start, end):
+        # Browser bleibt zwischen den Abrufen angemeldet
+        if not self.login():
+            return None
+        return self.downloader.download_csv(start_date=start, end_date=end)
+
+    def close(self):
+        if self.downloader:
+            self.downloader.close()
+            self.downloader = None
+
+
+@register_backend
+class PlaywrightBackend(SeleniumBackend):
+    """Export über einen Playwright-Kontext (SmartMeterPlaywrightDownloader)"""
+
+    name = "playwright"
+    label = "Playwright"
+    default_cost = 30.0
+
+    @classmethod
+    def available(cls):
+        return smartmeter_playwright is not None and smartmeter_playwright.sync_playwright is not None
+
+    def _create(self):
+        return smartmeter_playwright.SmartMeterPlaywrightDownloader(
+            self.username, self.password, headless=self.headless,
+            download_dir=self.download_dir, base_url=self.base_url
+        )
+
+
+@register_backend
+class FileImportBackend(FetchBackend):
+    """
+    Übernimmt eine vom Portal manuell exportierte CSV aus download_dir/import/
+
+    Gilt nur als erfolgreich, wenn die Datei den Zeitraum vollständig abdeckt -
+    sonst geht es mit dem nächsten Verfahren weiter. Die Originaldatei bleibt
+    unverändert, gekürzt wird eine Kopie.
+    """
+
+    name = "file"
+    label = "Datei-Import"
+    default_cost = 1.0
+    uses_portal = False
+
+    @property
+    def import_dir(self):
+        return self.download_dir / "import"
+
+    def ready(self):
+        return self.import_dir.is_dir() and any(self.import_dir.glob("*.csv"))
+
+    def fetch(self, start, end):
+        files = sorted(self.import_dir.glob("*.csv"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for path in files:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            target = self.download_dir / f"import_{path.stem}_{timestamp}.csv"
+            shutil.copy2(path, target)
+            report = fit_to_range(target, start, end)
+            if report and report['complete']:
+                logger.info(f"📂 Importiert: {path.name}")
+                return str(target)
+            target.unlink()
+        return None
+
+
+class BackendStats:
+    """
+    Erfolgsquote und Dauer der letzten Versuche je Verfahren
+
+    Gespeichert in download_dir/backend_stats.json, damit die Reihenfolge
+    Neustarts überlebt.
+    """
+
+    def __init__(self, path, window=STATS_WINDOW):
+        self.path = Path(path)
+        self.window = window
+        self._attempts = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._attempts = json.load(f)
+            except Exception as e:
+                logger.warning(f"Statistik der Download-Verfahren konnte nicht geladen werden: {e}")
+
+    def record(self, name, seconds, ok, error=None):
+        """Hält einen Versuch fest und speichert die Datei"""
+        attempts = self._attempts.setdefault(name, [])
+        attempts.append({
+            'seconds': round(seconds, 3),
+            'ok': bool(ok),
+            'error': error,
+            'at': datetime.now().isoformat(timespec='seconds'),
+        })
+        del attempts[:-self.window]
+        self._save()
+
+    def summary(self, name):
+        """
+        Kennzahlen eines Verfahrens
+
+        Returns:
+            dict: {'attempts', 'success_rate', 'p50', 'p95'} - p50/p95 über
+                  erfolgreiche Versuche (None solange keiner gelungen ist)
+        """
+        attempts = self._attempts.get(name, [])
+        durations = [a['seconds'] for a in attempts if a['ok']]
+        return {
+            'attempts': len(attempts),
+            'success_rate': len(durations) / len(attempts) if attempts else None,
+            'p50': percentile(durations, 0.5) if durations else None,
+            'p95': percentile(durations, 0.95) if durations else None,
+        }
+
+    def cost(self, name, default):
+        """
+        Erwartete Sekunden bis zu einem erfolgreichen Abruf
+
+        Mittlere Dauer eines Versuchs (auch fehlgeschlagener) geteilt durch die
+        geglättete Erfolgsquote: ein schnelles, aber oft scheiterndes Verfahren
+        kostet die Zeit seiner Fehlversuche mit. Ohne Messwerte gilt default.
+        """
+        attempts = self._attempts.get(name, [])
+        if not attempts:
+            return default
+        succeeded = sum(1 for a in attempts if a['ok'])
+        rate = (succeeded + 1) / (len(attempts) + 2)
+        return statistics.median(a['seconds'] for a in attempts) / rate
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self._attempts, f, indent=2)
+        os.replace(temp, self.path)
+
+
+class SmartMeterAutoDownloader:
+    """Wählt automatisch das schnellste funktionierende Download-Verfahren"""
+
+    def __init__(self, username, password, headless=True, download_dir="downloads", base_url=None,
+                 backends=None, lean=False):
+        """
+        Initialisiert den Downloader
+
+        Args:
+            username: Benutzername (E-Mail)
+            password: Passwort
+            headless: Browser im Hintergrund ausführen
+            download_dir: Ordner für CSV-Dateien, Import-Ordner und Statistik
+            base_url: Anderer Server statt des Portals (z.B. smartmeter_standin.py)
+            backends: Namen der erlaubten Verfahren (None = alle aus BACKENDS)
+            lean: Schlankes Startprofil für den Browser (siehe SmartMeterSeleniumDownloader)
+        """
+        self.username = username
+        self.password = password
+        self.headless = headless
+        self.lean = lean
+        self.download_dir = Path(download_dir)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url
+        self.names = [name for name in (backends or BACKENDS) if name in BACKENDS]
+        self.stats = BackendStats(self.download_dir / "backend_stats.json")
+        self.last_backend = None
+        # Verfahren bleiben zwischen den Abrufen erhalten (angemeldeter Browser)
+        self._instances = {}
+
+    def ranked(self):
+        """Verfügbare Verfahren, günstigstes zuerst"""
+        names = [name for name in self.names if BACKENDS[name].available()]
+        return sorted(names, key=lambda name: self.stats.cost(name, BACKENDS[name].default_cost))
+
+    def _backend(self, name):
+        if name not in self._instances:
+            self._instances[name] = BACKENDS[name](
+                self.username, self.password, download_dir=self.download_dir,
+                headless=self.headless, base_url=self.base_url, lean=self.lean
+            )
+        return self._instances[name]
+
+    def _release(self, name):
+        backend = self._instances.pop(name, None)
+        if backend:
+            try:
+                backend.close()
+            except Exception:
+                pass
+
+    def login(self):
+        """
+        Meldet sich mit dem günstigsten Verfahren an, das einen Portal-Zugang hat
+
+        Returns:
+            bool: True bei Erfolg (Verfahren in last_backend)
+        """
+        for name in self.ranked():
+            if not BACKENDS[name].uses_portal:
+                continue
+            try:
+                if self._backend(name).login():
+                    self.last_backend = name
+                    logger.info(f"✓ Login mit {BACKENDS[name].label}")
+                    return True
+            except Exception as e:
+                logger.warning(f"Login mit {BACKENDS[name].label} fehlgeschlagen: {str(e)[:100]}")
+            self._release(name)
+        return False
+
+    def download_csv(self, days_back=7, start_date=None, end_date=None):
+        """
+        Lädt die CSV mit dem günstigsten Verfahren, bei Fehlern mit dem nächsten
+
+        Args:
+            days_back: Anzahl Tage zurück (wenn start_date fehlt)
+            start_date: Startdatum (date/datetime) - Standard: end_date - days_back
+            end_date: Enddatum (date/datetime) - Standard: heute
+
+        Returns:
+            str: Pfad zur 15-Minuten-CSV oder None
+        """
+        end = end_date or datetime.now()
+        start = start_date or end - timedelta(days=days_back)
+
+        order = self.ranked()
+        logger.info("🔢 Reihenfolge: " + ", ".join(
+            f"{BACKENDS[name].label} (≈{self.stats.cost(name, BACKENDS[name].default_cost):.1f} s)" for name in order
+        ))
+
+        for name in order:
+            label = BACKENDS[name].label
+            backend = self._backend(name)
+            if not backend.ready():
+                continue
+            started = time.monotonic()
+            error = None
+            try:
+                path = backend.fetch(start, end)
+            except Exception as e:
+                path, error = None, str(e)[:200]
+            seconds = time.monotonic() - started
+            self.stats.record(name, seconds, bool(path), error)
+
+            if path:
+                self.last_backend = name
+                logger.info(f"✓ {label}: {seconds:.1f} s")
+                return path
+            logger.warning(f"⚠️ {label} fehlgeschlagen nach {seconds:.1f} s" + (f": {error}" if error else "")
+                           + " - nächstes Verfahren")
+            # Browser des gescheiterten Verfahrens nicht offen halten
+            self._release(name)
+
+        logger.error("✗ Kein Download-Verfahren war erfolgreich")
+        return None
+
+    def report(self):
+        """{name: summary} aller Verfahren mit Messwerten"""
+        summaries = {name: self.stats.summary(name) for name in self.names}
+        return {name: summary for name, summary in summaries.items() if summary['attempts']}
+
+    def close(self):
+        """Beendet alle offenen Verfahren"""
+        for name in list(self._instances):
+            self._release(name)
@@ -0,0 +1,272 @@
+"""
+Smart Meter Netz Burgenland - Export-API-Erkennung
+Wählt aus mitgeschnittenen Browser-Anfragen den echten Datenexport aus und
+speichert ihn als wiederverwendbare Anfrage-Vorlage für direkte HTTP-Downloads
+"""
+
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import json
+import logging
+import re
+
+import pandas as pd
+
+from smartmeter_data import TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+# Header, die für die Wiedergabe gebraucht werden. Auth-Header werden nur mit
+# Namen gespeichert - die Werte kommen bei jedem Lauf aus der aktuellen Sitzung.
+REPLAY_HEADERS = ('accept', 'content-type', 'x-requested-with')
+AUTH_HEADERS = ('authorization', 'x-auth-token', 'x-xsrf-token', 'x-csrf-token')
+
+SKIP_MIME = ('text/html', 'javascript', 'text/css', 'image/', 'font/', 'woff')
+
+# Datumsangaben in URL und Body -> Platzhalter {{start:FORMAT}} / {{end:FORMAT}}
+DATE_PATTERNS = [
+    (re.compile(r'(?<!\d)\d{4}-\d{2}-\d{2}(?!\d)'), '%Y-%m-%d'),
+    (re.compile(r'(?<!\d)\d{2}\.\d{2}\.\d{4}(?!\d)'), '%d.%m.%Y'),
+    (re.compile(r'(?<!\d)1\d{12}(?!\d)'), 'ms'),
+]
+PLACEHOLDER = re.compile(r'\{\{(start|end):([^}]+)\}\}')
+
+
+def parse_performance_log(entries):
+    """
+    Fasst Chrome-Performance-Logeinträge zu Anfrage/Antwort-Paaren zusammen
+
+    Args:
+        entries: Ergebnis von driver.get_log('performance')
+
+    Returns:
+        list: [{'url', 'method', 'headers', 'post_data', 'type', 'status',
+                'mime_type', 'response_headers'}, ...] in Reihenfolge der Anfragen
+    """
+    exchanges = {}
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        params = message.get('params', {})
+        request_id = params.get('requestId')
+        if not request_id:
+            continue
+
+        if message.get('method') == 'Network.requestWillBeSent':
+            request = params.get('request', {})
+            exchanges[request_id] = {
+                'url': request.get('url', ''),
+                'method': request.get('method', 'GET'),
+                'headers': request.get('headers', {}),
+                'post_data': request.get('postData'),
+                'type': params.get('type', ''),
+                'status': None,
+                'mime_type': '',
+                'response_headers': {},
+            }
+        elif message.get('method') == 'Network.responseReceived' and request_id in exchanges:
+            response = params.get('response', {})
+            exchanges[request_id].update({
+                'status': response.get('status'),
+                'mime_type': response.get('mimeType', '').lower(),
+                'response_headers': {k.lower(): v for k, v in response.get('headers', {}).items()},
+            })
+
+    return list(exchanges.values())
+
+
+def _score(exchange):
+    """Wie wahrscheinlich liefert diese Anfrage die Verbrauchsdaten?"""
+    if exchange['status'] != 200 or not exchange['url'].startswith('http'):
+        return None
+    mime = exchange['mime_type']
+    if any(skip in mime for skip in SKIP_MIME):
+        return None
+
+    score = 0
+    if exchange['type'] in ('XHR', 'Fetch', 'Other'):
+        score += 1
+    if 'csv' in mime:
+        score += 4
+    elif 'octet-stream' in mime or 'excel' in mime or 'spreadsheet' in mime:
+        score += 3
+    elif 'json' in mime:
+        score += 1
+    if 'attachment' in exchange['response_headers'].get('content-disposition', ''):
+        score += 3
+
+    url = exchange['url'].lower()
+    if any(k in url for k in ('export', 'download', 'csv')):
+        score += 2
+    if any(k in url for k in ('consumption', 'metering', 'meterdata', 'profile', 'values')):
+        score += 1
+    if any(_find_dates(exchange['url'] + (exchange['post_data'] or ''))):
+        score += 1
+    return score
+
+
+def pick_export_request(exchanges):
+    """
+    Wählt die Anfrage aus, die tatsächlich die Daten geliefert hat
+
+    Returns:
+        dict: Anfrage aus parse_performance_log() oder None
+    """
+    best = None
+    for position, exchange in enumerate(exchanges):
+        score = _score(exchange)
+        if score is None or score < 3:
+            continue
+        # Bei Gleichstand gewinnt die spätere Anfrage (näher am Export-Klick)
+        if best is None or (score, position) >= best[0]:
+            best = ((score, position), exchange)
+    return best[1] if best else None
+
+
+def _find_dates(text):
+    """Alle Datumsangaben in einem Text: [(match, format, datetime), ...]"""
+    found = []
+    for pattern, fmt in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            try:
+                if fmt == 'ms':
+                    moment = pd.Timestamp(int(match.group()), unit='ms', tz='UTC').tz_convert(TIMEZONE)
+                    moment = moment.tz_localize(None).to_pydatetime()
+                else:
+                    moment = datetime.strptime(match.group(), fmt)
+            except ValueError:
+                continue
+            found.append((match, fmt, moment))
+    return found
+
+
+def _templatize(text, start, end):
+    """Ersetzt Start- und Enddatum in einem Text durch Platzhalter"""
+    def replace(match_text, fmt, moment):
+        role = 'start' if moment.date() == start else 'end' if moment.date() == end else None
+        if role is None:
+            return match_text
+        if fmt == 'ms':
+            # Uhrzeit innerhalb des Tages bleibt erhalten (z.B. 23:59:59.999 beim Ende)
+            offset = int((moment - datetime.combine(moment.date(), datetime.min.time())).total_seconds() * 1000)
+            return f'{{{{{role}:ms+{offset}}}}}'
+        return f'{{{{{role}:{fmt}}}}}'
+
+    result, last = [], 0
+    for match, fmt, moment in sorted(_find_dates(text), key=lambda f: f[0].start()):
+        if match.start() < last:
+            continue
+        result.append(text[last:match.start()])
+        result.append(replace(match.group(), fmt, moment))
+        last = match.end()
+    result.append(text[last:])
+    return ''.join(result)
+
+
+def build_template(exchange):
+    """
+    Erstellt aus der mitgeschnittenen Export-Anfrage eine Vorlage
+
+    Das früheste gefundene Datum wird zum Platzhalter für den Start, das
+    späteste für das Ende. Werte von Auth-Headern werden nicht gespeichert.
+
+    Returns:
+        dict: Vorlage für render_template()
+    """
+    text = exchange['url'] + (exchange['post_data'] or '')
+    dates = sorted({moment.date() for _, _, moment in _find_dates(text)})
+    if not dates:
+        logger.warning("Keine Datumsangaben in der Export-Anfrage gefunden - Zeitraum ist fest")
+        start = end = None
+    else:
+        start, end = dates[0], dates[-1]
+
+    parts = urlsplit(exchange['url'])
+    params = [(key, _templatize(value, start, end)) for key, value in parse_qsl(parts.query, keep_blank_values=True)]
+    headers = {k.lower(): v for k, v in exchange['headers'].items()}
+
+    body = exchange['post_data']
+    if body:
+        body = _templatize(body, start, end)
+
+    return {
+        'url': urlunsplit(parts._replace(query='')),
+        'method': exchange['method'],
+        'params': params,
+        'headers': {k: v for k, v in headers.items() if k in REPLAY_HEADERS},
+        'auth_headers': sorted(k for k in headers if k in AUTH_HEADERS),
+        'body': body,
+        'mime_type': exchange['mime_type'],
+        'captured_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def _render_text(text, start_date, end_date):
+    def replace(match):
+        day = (start_date if match.group(1) == 'start' else end_date).date()
+        fmt = match.group(2)
+        if fmt.startswith('ms+'):
+            midnight = pd.Timestamp(day).tz_localize(TIMEZONE)
+            return str(int(midnight.timestamp() * 1000) + int(fmt[3:]))
+        return day.strftime(fmt)
+    return PLACEHOLDER.sub(replace, text)
+
+
+def render_template(template, start_date, end_date):
+    """
+    Setzt den gewünschten Zeitraum in die Vorlage ein
+
+    Returns:
+        dict: Argumente für requests.Session.request()
+    """
+    params = [(key, _render_text(value, start_date, end_date)) for key, value in template['params']]
+    request = {
+        'method': template['method'],
+        'url': f"{template['url']}?{urlencode(params)}" if params else template['url'],
+        'headers': dict(template['headers']),
+    }
+    if template.get('body'):
+        request['data'] = _render_text(template['body'], start_date, end_date).encode('utf-8')
+    return request
+
+
+def json_to_frame(payload):
+    """
+    Wandelt eine JSON-Antwort (Liste von Messwerten) in einen DataFrame um
+
+    Akzeptiert eine Liste von Objekten oder ein Objekt, das genau eine solche
+    Liste enthält (z.B. {"values": [...]}).
+
+    Returns:
+        DataFrame oder None wenn die Struktur nicht erkannt wird
+    """
+    if isinstance(payload, dict):
+        lists = [v for v in payload.values() if isinstance(v, list) and v and isinstance(v[0], dict)]
+        payload = lists[0] if len(lists) == 1 else None
+    if not isinstance(payload, list) or not payload or not isinstance(payload[0], dict):
+        return None
+    return pd.json_normalize(payload)
+
+
+def save_template(template, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(template, f, indent=2, ensure_ascii=False)
+    logger.info(f"✓ Export-Vorlage gespeichert: {path}")
+
+
+def load_template(path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Export-Vorlage konnte nicht geladen werden: {e}")
+        return None
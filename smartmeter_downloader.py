@@ -13,6 +13,19 @@ from pathlib import Path
 import logging
 import json
 
+from smartmeter_auth import find_bearer_token, find_login_form, has_password_field, is_logged_in_page, login_error
+from smartmeter_data import (
+    REGISTER_LABELS, ResolutionCache, SeriesStore, aggregate_registers, detect_columns,
+    read_export, registers_from_frame
+)
+from smartmeter_discovery import (
+    build_template, json_to_frame, load_template, parse_performance_log, pick_export_request,
+    render_template, save_template
+)
+from smartmeter_forecast import ConsumptionForecaster
+from smartmeter_gaps import GapRefetcher, coalesce_windows, count_missing, find_gaps
+from smartmeter_peaks import PeakDemandTracker
+
 # Logging konfigurieren
 logging.basicConfig(
     level=logging.INFO,
@@ -20,21 +33,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_BASE_URL = "https://smartmeter.netzburgenland.at"
+
 
 class SmartMeterDownloader:
     """Klasse zum Herunterladen und Auswerten von Smart Meter Daten von Netz Burgenland"""
     
-    def __init__(self, username, password):
+    def __init__(self, username, password, browser_login=False, headless=True, profile_dir=None,
+                 base_url=None, download_dir="downloads"):
         """
         Initialisiert den Downloader
         
         Args:
             username: Benutzername (E-Mail oder Kundennummer)
             password: Passwort
+            browser_login: Login über Chrome (Selenium), Export danach per HTTP (Hybrid-Modus)
+            headless: Browser beim Hybrid-Login im Hintergrund ausführen
+            profile_dir: Dauerhaftes Chrome-Profil für den Hybrid-Login (optional)
+            base_url: Anderer Server statt des Portals, z.B. der lokale Nachbau
+                      aus smartmeter_standin.py (None = Netz Burgenland)
+            download_dir: Ordner für CSV-Dateien, Vorlage und Gesamtreihe
         """
-        self.base_url = "https://smartmeter.netzburgenland.at"
-        self.portal_url = "https://smartmeter.netzburgenland.at/enview/enView.Portal"
-        self.api_url = "https://smartmeter.netzburgenland.at/enview/enView.Portal/api"
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip('/')
+        self.portal_url = f"{self.base_url}/enview/enView.Portal"
+        self.api_url = f"{self.portal_url}/api"
         self.username = username
         self.password = password
         self.session = requests.Session()
@@ -42,12 +64,26 @@ class SmartMeterDownloader:
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'de-DE,de;q=0.9,en;q=0.8',
-            'Referer': 'https://smartmeter.netzburgenland.at/enview/enView.Portal/',
-            'Origin': 'https://smartmeter.netzburgenland.at'
+            'Referer': f"{self.portal_url}/",
+            'Origin': self.base_url
         })
-        self.download_dir = Path("downloads")
-        self.download_dir.mkdir(exist_ok=True)
+        self.download_dir = Path(download_dir)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
         self.logged_in = False
+        self.browser_login = browser_login
+        self.headless = headless
+        self.profile_dir = profile_dir
+        self.resolution_cache = ResolutionCache()
+        self.last_raw_file = None
+        # Vom Browser mitgeschnittene Export-Anfrage (siehe discover_export_api)
+        self.template_path = self.download_dir / "export_template.json"
+        # Gesamtreihe aller Downloads und gezieltes Nachladen von Lücken
+        self.store = SeriesStore(self.download_dir / "smartmeter_series.csv")
+        self.gap_refetcher = GapRefetcher(
+            self.store,
+            self._fetch_window,
+            state_file=self.download_dir / "smartmeter_gaps.json"
+        )
         
     def login(self):
         """
@@ -56,6 +92,15 @@ class SmartMeterDownloader:
         Returns:
             bool: True wenn Login erfolgreich, sonst False
         """
+        if self.browser_login:
+            return self.login_via_browser()
+        
+        # Anmeldeformular per HTTP wie im Browser; nur wenn die Seite keines
+        # enthält (per JavaScript gerendert), die bekannten API-Endpunkte probieren
+        result = self.login_via_form()
+        if result is not None:
+            return result
+        
         try:
             logger.info("Verbinde mit Smart Meter Portal...")
             logger.info(f"Versuche Login für Benutzer: {self.username}")
@@ -197,17 +242,13 @@ class SmartMeterDownloader:
                         if response.history:
                             logger.info(f"  Redirects: {[r.status_code for r in response.history]}")
                         
-                        # Prüfe HTML-Inhalt auf Erfolgs-Indikatoren
-                        if 'dashboard' in response.text.lower() or 'logout' in response.text.lower():
+                        # Prüfe HTML-Inhalt auf Erfolgs-Indikatoren (ein 200 mit Cookie allein
+                        # reicht nicht - das liefert auch die Login-Seite selbst)
+                        if (('dashboard' in response.text.lower() or 'logout' in response.text.lower())
+                                and not has_password_field(response.text)):
                             logger.info("✓ Login erfolgreich (Dashboard/Logout gefunden)")
                             self.logged_in = True
                             return True
-                        
-                        # Wenn Cookies gesetzt wurden, könnte Login erfolgreich sein
-                        if len(self.session.cookies) > 0 and response.status_code == 200:
-                            logger.info("✓ Login wahrscheinlich erfolgreich (Cookies erhalten)")
-                            self.logged_in = True
-                            return True
                     
                     logger.info(f"  Versuch {i} nicht erfolgreich")
                     
@@ -228,10 +269,234 @@ class SmartMeterDownloader:
             logger.error(traceback.format_exc())
             return False
     
+    def login_via_form(self):
+        """
+        Browserloser Login über das Anmeldeformular des Portals
+        
+        Ablauf wie im Browser: Login-Seite laden (mit Weiterleitungen), Formular
+        samt versteckter CSRF-/State-Felder auslesen, Zugangsdaten absenden,
+        den Weiterleitungen folgen und Sitzungs-Cookie bzw. Bearer-Token übernehmen.
+        
+        Returns:
+            bool: True/False, None wenn die Seite kein Anmeldeformular enthält
+        """
+        html_headers = {'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8'}
+        try:
+            logger.info("Lade Login-Seite...")
+            page = self.session.get(f"{self.portal_url}/", headers=html_headers, timeout=30)
+            form = find_login_form(page.text, page.url)
+            if form is None:
+                if not has_password_field(page.text) and self._token_from(page):
+                    logger.info("✓ Bereits angemeldet (Sitzung noch gültig)")
+                    self.logged_in = True
+                    return True
+                logger.info("  Kein Anmeldeformular im HTML (Seite wird per JavaScript aufgebaut)")
+                return None
+            
+            data = dict(form['fields'])
+            data[form['username_field']] = self.username
+            data[form['password_field']] = self.password
+            hidden = [name for name in form['fields'] if name != form['username_field']]
+            logger.info(f"Sende Anmeldeformular an {form['action']} (Felder: {', '.join(hidden) or 'keine'})")
+            
+            # Cookies der Login-Seite zählen nicht als Beweis für eine Anmeldung
+            cookies_before = {(c.domain, c.path, c.name): c.value for c in self.session.cookies}
+            response = self.session.request(
+                form['method'],
+                form['action'],
+                data=data if form['method'] == 'POST' else None,
+                params=data if form['method'] == 'GET' else None,
+                headers={**html_headers, 'Referer': page.url, **form['headers']},
+                timeout=30,
+                allow_redirects=True
+            )
+            if response.history:
+                logger.info(f"  Weiterleitungen: {' -> '.join(str(r.status_code) for r in response.history)}")
+            
+            if response.status_code >= 400:
+                logger.error(f"✗ Login abgelehnt: Status {response.status_code}")
+                return False
+            if has_password_field(response.text):
+                error = login_error(response.text)
+                logger.error(f"❌ Login fehlgeschlagen: {error or 'Anmeldeformular wird erneut angezeigt'}")
+                return False
+            
+            token = self._token_from(response)
+            new_cookies = [c.name for c in self.session.cookies
+                           if cookies_before.get((c.domain, c.path, c.name)) != c.value]
+            marker = is_logged_in_page(response.text)
+            if not (token or marker):
+                # z.B. Zwei-Faktor-Schritt, Zwischenseite oder Fehlerseite ohne erkannte Meldung -
+                # neue Cookies allein setzt auch eine abgelehnte Anmeldung (Tracking, CSRF)
+                logger.error(f"✗ Keine Anmeldung erkennbar (kein Token, keine angemeldete Seite"
+                             f"{', nur neue Cookies' if new_cookies else ''}) - Endadresse: {response.url}")
+                return False
+            
+            evidence = [f"neue Cookies: {', '.join(new_cookies)}"] if new_cookies else []
+            if token:
+                evidence.append("Bearer-Token")
+            if marker:
+                evidence.append("angemeldete Seite")
+            logger.info(f"✓ Login erfolgreich (HTTP-Formular, {'; '.join(evidence)})")
+            self.logged_in = True
+            return True
+            
+        except requests.RequestException as e:
+            logger.error(f"Fehler beim Formular-Login: {e}")
+            return False
+    
+    def _token_from(self, response):
+        """Übernimmt ein Bearer-Token aus Weiterleitungen oder Seite in die Sitzung"""
+        urls = [r.headers.get('Location', '') for r in response.history] + [response.url]
+        token = find_bearer_token(response.text, urls)
+        if token:
+            self.session.headers.update({
+                'Authorization': f"Bearer {token}",
+                'X-Auth-Token': token
+            })
+        return token
+    
+    def login_via_browser(self):
+        """
+        Hybrid-Login: Anmeldung im Browser, danach nur noch HTTP
+        
+        Chrome wird nur für das Login-Formular gestartet. Cookies und ein
+        eventuelles Bearer-Token aus dem localStorage werden in self.session
+        übernommen und der Browser sofort wieder geschlossen.
+        
+        Returns:
+            bool: True wenn Login erfolgreich, sonst False
+        """
+        try:
+            from smartmeter_selenium import SmartMeterSeleniumDownloader
+        except ImportError:
+            logger.error("✗ Hybrid-Login benötigt Selenium: pip install selenium")
+            return False
+        
+        logger.info("🌐 Hybrid-Login: Anmeldung im Browser, Export per HTTP")
+        browser = SmartMeterSeleniumDownloader(
+            self.username,
+            self.password,
+            headless=self.headless,
+            profile_dir=self.profile_dir,
+            base_url=self.base_url,
+            download_dir=self.download_dir
+        )
+        try:
+            if not browser.login():
+                logger.error("✗ Browser-Login fehlgeschlagen")
+                return False
+            if not browser.to_requests_session(self.session):
+                return False
+        finally:
+            browser.close()
+        
+        self.logged_in = True
+        return True
+    
+    def discover_export_api(self, days_back=7):
+        """
+        Ermittelt die echte Export-Anfrage des Portals
+        
+        Führt einen Export im Browser durch, schneidet dabei den Netzwerkverkehr
+        mit und speichert die Anfrage, die die Daten geliefert hat, als Vorlage.
+        Spätere Downloads verwenden diese Vorlage direkt per HTTP. Die Sitzung
+        des Browsers wird gleich mit übernommen.
+        
+        Args:
+            days_back: Zeitraum des Export-Durchlaufs im Browser
+            
+        Returns:
+            dict: Gespeicherte Vorlage oder None
+        """
+        try:
+            from smartmeter_selenium import SmartMeterSeleniumDownloader
+        except ImportError:
+            logger.error("✗ Export-Erkennung benötigt Selenium: pip install selenium")
+            return None
+        
+        logger.info("🔎 Ermittle Export-API über den Netzwerk-Mitschnitt des Browsers...")
+        browser = SmartMeterSeleniumDownloader(
+            self.username,
+            self.password,
+            headless=self.headless,
+            profile_dir=self.profile_dir,
+            capture_network=True,
+            base_url=self.base_url,
+            download_dir=self.download_dir
+        )
+        try:
+            if not browser.login():
+                logger.error("✗ Browser-Login fehlgeschlagen")
+                return None
+            if not browser.download_csv(days_back=days_back):
+                logger.error("✗ Export im Browser fehlgeschlagen")
+                return None
+            
+            exchanges = parse_performance_log(browser.network_log())
+            exchange = pick_export_request(exchanges)
+            if not exchange:
+                logger.warning(f"Keine Export-Anfrage unter {len(exchanges)} mitgeschnittenen Anfragen erkannt "
+                               "(Portal erzeugt die CSV evtl. im Browser)")
+                return None
+            
+            logger.info(f"✓ Export-Anfrage erkannt: {exchange['method']} {exchange['url'][:120]}")
+            template = build_template(exchange)
+            save_template(template, self.template_path)
+            
+            if browser.to_requests_session(self.session):
+                self.logged_in = True
+            return template
+        finally:
+            browser.close()
+    
+    def _download_with_template(self, start_date, end_date):
+        """
+        Lädt über die gespeicherte Export-Vorlage
+        
+        Returns:
+            bytes: CSV-Inhalt oder None wenn keine Vorlage existiert bzw. sie nicht mehr passt
+        """
+        template = load_template(self.template_path)
+        if not template:
+            return None
+        
+        missing = [h for h in template.get('auth_headers', []) if h not in {k.lower() for k in self.session.headers}]
+        if missing:
+            logger.info(f"  Sitzung ohne {', '.join(missing)} - Vorlage wird trotzdem versucht")
+        
+        try:
+            request = render_template(template, start_date, end_date)
+            logger.info(f"Probiere Export-Vorlage: {request['method']} {template['url']}")
+            response = self.session.request(timeout=30, **request)
+        except Exception as e:
+            logger.warning(f"  Export-Vorlage fehlgeschlagen: {str(e)[:100]}")
+            return None
+        
+        if response.status_code != 200 or not response.content:
+            logger.warning(f"  Export-Vorlage lieferte Status {response.status_code}")
+            return None
+        
+        if 'json' in response.headers.get('Content-Type', template.get('mime_type', '')).lower():
+            try:
+                frame = json_to_frame(response.json())
+            except ValueError:
+                frame = None
+            if frame is None:
+                logger.warning("  JSON-Antwort der Export-Vorlage nicht erkannt")
+                return None
+            return frame.to_csv(sep=';', decimal=',', index=False).encode('utf-8')
+        
+        logger.info("  ✓ Erfolg! Daten über Export-Vorlage erhalten")
+        return response.content
+    
     def download_csv(self, start_date=None, end_date=None, data_type='15min'):
         """
         Lädt die CSV-Datei mit Verbrauchsdaten herunter
         
+        Vom Portal werden immer 15-Minuten-Werte geholt, gröbere Auflösungen
+        werden lokal daraus abgeleitet (siehe smartmeter_data.py).
+        
         Args:
             start_date: Startdatum (datetime) - Standard: gestern
             end_date: Enddatum (datetime) - Standard: heute
@@ -258,31 +523,31 @@ class SmartMeterDownloader:
                 {
                     'from': start_date.strftime('%Y-%m-%d'),
                     'to': end_date.strftime('%Y-%m-%d'),
-                    'resolution': data_type,
+                    'resolution': '15min',
                     'format': 'csv'
                 },
                 # Variante 2: startDate/endDate
                 {
                     'startDate': start_date.strftime('%Y-%m-%d'),
                     'endDate': end_date.strftime('%Y-%m-%d'),
-                    'resolution': data_type,
+                    'resolution': '15min',
                     'format': 'csv'
                 },
                 # Variante 3: ISO-Format mit Zeitstempel
                 {
                     'from': start_date.strftime('%Y-%m-%dT00:00:00'),
                     'to': end_date.strftime('%Y-%m-%dT23:59:59'),
-                    'type': data_type
+                    'type': '15min'
                 },
                 # Variante 4: Timestamps
                 {
                     'fromTimestamp': int(start_date.timestamp() * 1000),
                     'toTimestamp': int(end_date.timestamp() * 1000),
-                    'resolution': data_type
+                    'resolution': '15min'
                 }
             ]
             
-            logger.info(f"Lade Daten von {start_date.strftime('%Y-%m-%d')} bis {end_date.strftime('%Y-%m-%d')} ({data_type})...")
+            logger.info(f"Lade Daten von {start_date.strftime('%Y-%m-%d')} bis {end_date.strftime('%Y-%m-%d')} (15min)...")
             
             # CSV herunterladen - verschiedene mögliche Endpunkte ausprobieren
             endpoints = [
@@ -296,10 +561,11 @@ class SmartMeterDownloader:
                 f"{self.base_url}/api/consumption/export"
             ]
             
+            content = self._download_with_template(start_date, end_date)
             response = None
             successful_endpoint = None
             
-            for endpoint in endpoints:
+            for endpoint in ([] if content else endpoints):
                 for params in param_variants:
                     try:
                         logger.info(f"Probiere: {endpoint}")
@@ -320,7 +586,10 @@ class SmartMeterDownloader:
                 if successful_endpoint:
                     break
             
-            if response.status_code == 200:
+            if not content and response is not None and response.status_code == 200:
+                content = response.content
+            
+            if content:
                 # Dateinamen mit Timestamp erstellen
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"smartmeter_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}_{timestamp}.csv"
@@ -328,34 +597,62 @@ class SmartMeterDownloader:
                 
                 # CSV speichern
                 with open(filepath, 'wb') as f:
-                    f.write(response.content)
+                    f.write(content)
                 
                 logger.info(f"✓ CSV erfolgreich heruntergeladen: {filepath}")
-                return str(filepath)
+                self.last_raw_file = str(filepath)
+                
+                # Gröbere Auflösungen lokal ableiten statt erneut herunterzuladen
+                try:
+                    return self.resolution_cache.export(filepath, data_type)
+                except Exception as e:
+                    logger.warning(f"Auflösung '{data_type}' konnte nicht abgeleitet werden: {e}")
+                    return str(filepath)
             else:
-                logger.error(f"✗ Download fehlgeschlagen: Status {response.status_code}")
+                status = response.status_code if response is not None else 'keine Antwort'
+                logger.error(f"✗ Download fehlgeschlagen: Status {status}")
                 return None
                 
         except Exception as e:
             logger.error(f"Fehler beim Download: {e}")
             return None
     
-    def analyze_csv(self, filepath):
+    def _fetch_window(self, start_date, end_date):
+        """Lädt ein einzelnes Zeitfenster in 15-Minuten-Auflösung (für das Nachladen von Lücken)"""
+        if self.download_csv(start_date, end_date, '15min'):
+            return self.last_raw_file
+        return None
+    
+    def check_gaps(self, start_date, end_date):
+        """
+        Sucht Lücken in der Gesamtreihe und plant das Nachladen
+        
+        Das Ende nach dem letzten Messwert wird nicht als Lücke gewertet,
+        dort sind die Daten meist einfach noch nicht verfügbar.
+        
+        Args:
+            start_date: Beginn des erwarteten Zeitraums (datetime)
+            end_date: Ende des erwarteten Zeitraums (datetime)
+            
+        Returns:
+            list: Zeitfenster [(start_date, end_date), ...] mit fehlenden Werten
+        """
+        return self.gap_refetcher.check(start_date, end_date)
+    
+    def analyze_csv(self, filepath, price_per_kwh=0.30):
         """
         Wertet die CSV-Datei aus
         
         Args:
             filepath: Pfad zur CSV-Datei
+            price_per_kwh: Strompreis für Kostenschätzung und Prognose (€/kWh)
             
         Returns:
             dict: Analyseergebnisse
         """
         try:
             # CSV einlesen - Smart Meter CSV hat oft Semikolon als Trennzeichen
-            try:
-                df = pd.read_csv(filepath, sep=';', decimal=',')
-            except:
-                df = pd.read_csv(filepath)
+            df = read_export(filepath)
             
             logger.info("\n" + "="*70)
             logger.info("SMART METER DATENAUSWERTUNG")
@@ -363,7 +660,7 @@ class SmartMeterDownloader:
             
             # Grundlegende Informationen
             logger.info(f"\n📊 Anzahl Datensätze: {len(df)}")
-            logger.info(f"📋 Spalten: {', '.join(df.columns.tolist())}")
+            logger.info(f"📋 Spalten: {', '.join(map(str, df.columns.tolist()))}")
             
             # Erste Zeilen anzeigen
             logger.info("\n📝 Erste 5 Einträge:")
@@ -371,54 +668,33 @@ class SmartMeterDownloader:
             
             results = {}
             
-            # Verbrauchsanalyse (typische Spaltennamen für Smart Meter Daten)
-            consumption_cols = [col for col in df.columns if 'verbrauch' in col.lower() or 'consumption' in col.lower() or 'wert' in col.lower()]
+            # Alle Register (Bezug, Einspeisung, Blindenergie) in einem Durchgang
+            _, columns = detect_columns(df.columns)
+            frame = registers_from_frame(df)
+            stats = aggregate_registers(frame)
+            results['registers'] = stats
             
-            if consumption_cols:
-                for col in consumption_cols:
-                    try:
-                        # Konvertiere zu numerischen Werten
-                        df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '.'), errors='coerce')
-                        
-                        total = df[col].sum()
-                        avg = df[col].mean()
-                        max_val = df[col].max()
-                        min_val = df[col].min()
-                        
-                        logger.info(f"\n⚡ {col}:")
-                        logger.info(f"  • Gesamt: {total:.2f} kWh")
-                        logger.info(f"  • Durchschnitt: {avg:.2f} kWh")
-                        logger.info(f"  • Maximum: {max_val:.2f} kWh")
-                        logger.info(f"  • Minimum: {min_val:.2f} kWh")
-                        
-                        results[col] = {
-                            'total': float(total),
-                            'average': float(avg),
-                            'max': float(max_val),
-                            'min': float(min_val)
-                        }
-                        
-                    except Exception as e:
-                        logger.warning(f"Konnte Spalte {col} nicht analysieren: {e}")
+            for register, values in stats.items():
+                col = columns.get(register, REGISTER_LABELS.get(register, register))
+                unit = 'kvarh' if register.startswith('reactive') else 'kWh'
+                logger.info(f"\n⚡ {col}:")
+                logger.info(f"  • Gesamt: {values['total']:.2f} {unit}")
+                logger.info(f"  • Durchschnitt: {values['average']:.2f} {unit}")
+                logger.info(f"  • Maximum: {values['max']:.2f} {unit}")
+                logger.info(f"  • Minimum: {values['min']:.2f} {unit}")
+                if register in columns:
+                    results[col] = values
             
             # Zeitanalyse
-            date_cols = [col for col in df.columns if 'datum' in col.lower() or 'date' in col.lower() or 'zeit' in col.lower() or 'time' in col.lower()]
-            
-            if date_cols:
-                date_col = date_cols[0]
+            if not frame.empty:
                 logger.info(f"\n📅 Zeitraum:")
-                try:
-                    df[date_col] = pd.to_datetime(df[date_col])
-                    logger.info(f"  • Von: {df[date_col].min()}")
-                    logger.info(f"  • Bis: {df[date_col].max()}")
-                    
-                    results['period'] = {
-                        'start': str(df[date_col].min()),
-                        'end': str(df[date_col].max())
-                    }
-                except:
-                    logger.info(f"  • Von: {df[date_col].iloc[0]}")
-                    logger.info(f"  • Bis: {df[date_col].iloc[-1]}")
+                logger.info(f"  • Von: {frame.index.min()}")
+                logger.info(f"  • Bis: {frame.index.max()}")
+                
+                results['period'] = {
+                    'start': str(frame.index.min()),
+                    'end': str(frame.index.max())
+                }
             
             # Fehlende Werte
             missing = df.isnull().sum()
@@ -427,13 +703,58 @@ class SmartMeterDownloader:
                 for col, count in missing[missing > 0].items():
                     logger.info(f"  • {col}: {count}")
             
-            # Kosten schätzen (ca. 0,30 €/kWh als Beispiel)
-            if consumption_cols and results:
-                price_per_kwh = 0.30
-                first_col = consumption_cols[0]
-                estimated_cost = results[first_col]['total'] * price_per_kwh
+            # Fehlende 15-Minuten-Intervalle (nur bei Rohdaten sinnvoll)
+            if len(frame) > 1 and frame.index.to_series().diff().median() == pd.Timedelta(minutes=15):
+                gaps = find_gaps(frame)
+                windows = coalesce_windows(gaps)
+                if gaps:
+                    logger.info(f"\n🕳️  Lücken: {count_missing(gaps)} fehlende Intervalle in {len(windows)} Zeitfenster(n)")
+                results['gaps'] = {
+                    'missing_intervals': count_missing(gaps),
+                    'ranges': [[str(start), str(end)] for start, end in gaps],
+                    'windows': [[str(start), str(end)] for start, end in windows]
+                }
+                
+                # Monatliche Leistungsspitzen (kWh je 15 Minuten x 4 = kW)
+                if 'consumption' in frame:
+                    tracker = PeakDemandTracker()
+                    tracker.update(frame['consumption'])
+                    peaks = tracker.to_dict()
+                    if peaks:
+                        logger.info("\n📈 Leistungsspitzen (15 Minuten):")
+                        for month, top in peaks.items():
+                            logger.info(f"  • {month}: " + ", ".join(f"{p['kw']:.2f} kW ({p['timestamp']})" for p in top))
+                    results['peaks'] = peaks
+            
+            # Kosten schätzen (nur Bezug)
+            if 'consumption' in stats:
+                estimated_cost = stats['consumption']['total'] * price_per_kwh
                 logger.info(f"\n💰 Geschätzte Kosten (bei {price_per_kwh}€/kWh): {estimated_cost:.2f} €")
                 results['estimated_cost'] = float(estimated_cost)
+                
+                # Prognose bis Monats- und Jahresende aus den Tagessummen
+                try:
+                    daily = frame['consumption'].resample('D').sum(min_count=1).dropna()
+                    daily.index = daily.index.date
+                    today = datetime.now().date()
+                    forecaster = ConsumptionForecaster()
+                    forecaster.update(daily, today)
+                    forecast = forecaster.forecast(
+                        today,
+                        price_per_kwh=price_per_kwh,
+                        partial_today=float(daily.get(today, 0.0))
+                    )
+                    
+                    logger.info("\n🔮 Prognose:")
+                    for label, key in [("Monatsende", 'month'), ("Jahresende", 'year')]:
+                        fc = forecast[key]
+                        logger.info(f"  • {label}: {fc['projected']:.2f} kWh "
+                                    f"({fc['lower']:.2f} - {fc['upper']:.2f}), "
+                                    f"ca. {fc['cost']:.2f} €")
+                    
+                    results['forecast'] = forecast
+                except Exception as e:
+                    logger.warning(f"Prognose nicht möglich: {e}")
             
             logger.info("\n" + "="*70 + "\n")
             
@@ -443,13 +764,14 @@ class SmartMeterDownloader:
             logger.error(f"Fehler bei der Auswertung: {e}")
             return {}
     
-    def run_once(self, days_back=7, data_type='15min'):
+    def run_once(self, days_back=7, data_type='15min', price_per_kwh=0.30):
         """
         Führt einen kompletten Download- und Auswertungszyklus durch
         
         Args:
             days_back: Anzahl der Tage zurück zum Herunterladen
             data_type: Datentyp ('15min', 'hourly', 'daily', 'monthly')
+            price_per_kwh: Strompreis für Kostenschätzung und Prognose (€/kWh)
         """
         logger.info("\n" + "="*70)
         logger.info(f"🚀 Starte Download-Zyklus: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}")
@@ -471,8 +793,16 @@ class SmartMeterDownloader:
             logger.error("Download fehlgeschlagen - Abbruch")
             return False
         
+        # In die Gesamtreihe übernehmen und Lücken gezielt nachladen
+        try:
+            self.store.merge(self.last_raw_file)
+            self.check_gaps(start_date, end_date)
+            self.gap_refetcher.run_due()
+        except Exception as e:
+            logger.warning(f"Lückenprüfung fehlgeschlagen: {e}")
+        
         # CSV auswerten
-        results = self.analyze_csv(filepath)
+        results = self.analyze_csv(filepath, price_per_kwh=price_per_kwh)
         
         # Ergebnisse auch als JSON speichern
         if results:
@@ -530,6 +860,9 @@ def main():
         password=PASSWORD
     )
     
+    # Einmalig: echte Export-Anfrage im Browser ermitteln (benötigt Selenium)
+    # downloader.discover_export_api()
+    
     # Einmaliger Download (zum Testen)
     downloader.run_once(days_back=DAYS_BACK, data_type=DATA_TYPE)
     
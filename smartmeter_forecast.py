@@ -0,0 +1,237 @@
+"""
+Smart Meter Netz Burgenland - Verbrauchsprognose
+Saisonal-naive Prognose mit Wochentagsprofil für Monats- und Jahresende
+"""
+
+import calendar
+import math
+from datetime import date, datetime, timedelta
+
+
+class _RunningStats:
+    """Laufender Mittelwert und Varianz (Welford), Werte können auch entfernt werden"""
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        if self.n <= 1:
+            self.n = 0
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        old_mean = self.mean
+        self.n -= 1
+        self.mean = (old_mean * (self.n + 1) - x) / self.n
+        self.m2 = max(self.m2 - (x - old_mean) * (x - self.mean), 0.0)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+
+def _as_date(value):
+    """Wandelt date/datetime/Timestamp/ISO-String in ein date um"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if hasattr(value, "date"):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+class ConsumptionForecaster:
+    """
+    Inkrementelle Verbrauchsprognose auf Basis von Tagessummen
+
+    Die Prognose für einen Tag ist eine Mischung aus dem saisonal-naiven Wert
+    (letzter bekannter Tag mit gleichem Wochentag) und dem mittleren Verbrauch
+    dieses Wochentags. Die Streuung der 1-Tages-Prognosefehler liefert das
+    Konfidenzband. Neue Tage werden beim Aktualisieren nur nachgetragen, es
+    wird nie die ganze Historie neu ausgewertet.
+    """
+
+    def __init__(self, blend=0.5, z=1.645, max_history_days=400):
+        """
+        Initialisiert die Prognose
+
+        Args:
+            blend: Gewicht des saisonal-naiven Werts (0..1), Rest geht an das Wochentagsprofil
+            z: z-Wert für das Konfidenzband (1.645 = 90 %)
+            max_history_days: Ältere Tage werden verworfen
+        """
+        self.blend = blend
+        self.z = z
+        self.max_history_days = max_history_days
+        self._daily = {}
+        self._residuals = {}
+        self._weekday = [_RunningStats() for _ in range(7)]
+        self._overall = _RunningStats()
+        self._resid = _RunningStats()
+
+    @property
+    def days_fitted(self):
+        return len(self._daily)
+
+    def update(self, daily, today=None):
+        """
+        Übernimmt neue oder geänderte Tagessummen
+
+        Args:
+            daily: Mapping oder pandas Series {Datum: kWh}
+            today: Heutiges Datum - der laufende Tag ist unvollständig und wird ignoriert
+
+        Returns:
+            int: Anzahl neu übernommener oder korrigierter Tage
+        """
+        today = _as_date(today) if today else date.today()
+        changed = 0
+
+        for day, value in sorted((_as_date(d), v) for d, v in daily.items()):
+            if day >= today or value is None:
+                continue
+            value = float(value)
+            if math.isnan(value):
+                continue
+
+            old = self._daily.get(day)
+            if old is not None:
+                if abs(old - value) < 1e-9:
+                    continue
+                self._forget(day)
+
+            self._commit(day, value)
+            changed += 1
+
+        self._prune(today)
+        return changed
+
+    def predict_day(self, day):
+        """Prognostizierter Verbrauch (kWh) für einen einzelnen Tag"""
+        day = _as_date(day)
+        weekday = self._weekday[day.weekday()]
+        if weekday.n:
+            profile = weekday.mean
+        elif self._overall.n:
+            profile = self._overall.mean
+        else:
+            return 0.0
+
+        naive = self._seasonal_naive(day)
+        if naive is None:
+            return profile
+        return self.blend * naive + (1.0 - self.blend) * profile
+
+    def forecast(self, today=None, price_per_kwh=None, partial_today=0.0):
+        """
+        Prognostiziert Verbrauch (und Kosten) bis Monats- und Jahresende
+
+        Args:
+            today: Bezugsdatum (Standard: heute)
+            price_per_kwh: Strompreis für die Kostenprognose (optional)
+            partial_today: Bereits gemessener Verbrauch des laufenden Tages
+
+        Returns:
+            dict: {'month': {...}, 'year': {...}} mit projected/lower/upper
+        """
+        today = _as_date(today) if today else date.today()
+        month_end = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+
+        return {
+            "month": self._project(today.replace(day=1), month_end, today, partial_today, price_per_kwh),
+            "year": self._project(date(today.year, 1, 1), date(today.year, 12, 31), today, partial_today, price_per_kwh),
+        }
+
+    def _seasonal_naive(self, day):
+        # Letzter bekannter Tag mit gleichem Wochentag (max. 8 Wochen zurück)
+        for weeks in range(1, 9):
+            value = self._daily.get(day - timedelta(weeks=weeks))
+            if value is not None:
+                return value
+        return None
+
+    def _commit(self, day, value):
+        if self._overall.n:
+            residual = value - self.predict_day(day)
+            self._residuals[day] = residual
+            self._resid.add(residual)
+        self._daily[day] = value
+        self._weekday[day.weekday()].add(value)
+        self._overall.add(value)
+
+    def _forget(self, day):
+        value = self._daily.pop(day)
+        self._weekday[day.weekday()].remove(value)
+        self._overall.remove(value)
+        residual = self._residuals.pop(day, None)
+        if residual is not None:
+            self._resid.remove(residual)
+
+    def _prune(self, today):
+        cutoff = today - timedelta(days=self.max_history_days)
+        for day in [d for d in self._daily if d < cutoff]:
+            self._forget(day)
+
+    def _residual_variance(self):
+        if self._resid.n > 1:
+            return self._resid.variance
+        return self._overall.variance
+
+    def _project(self, start, end, today, partial_today, price_per_kwh):
+        actual = 0.0
+        expected = 0.0
+        observed = 0
+        predicted = 0
+        unobserved = 0
+
+        # Tage vor dem ersten Messwert sind unbekannt, nicht vorhersagbar
+        day = start
+        if self._daily:
+            first = min(min(self._daily), today)
+            if first > start:
+                unobserved = (min(first, end + timedelta(days=1)) - start).days
+                day = first
+        while day <= end:
+            value = self._daily.get(day)
+            if value is not None:
+                actual += value
+                observed += 1
+            elif day == today:
+                actual += partial_today
+                expected += max(self.predict_day(day) - partial_today, 0.0)
+                predicted += 1
+            else:
+                expected += self.predict_day(day)
+                predicted += 1
+            day += timedelta(days=1)
+
+        projected = actual + expected
+        band = self.z * math.sqrt(predicted * self._residual_variance())
+
+        result = {
+            "projected": round(projected, 2),
+            "lower": round(max(projected - band, actual), 2),
+            "upper": round(projected + band, 2),
+            "actual": round(actual, 2),
+            "days_observed": observed,
+            "days_predicted": predicted,
+            "days_unobserved": unobserved,
+        }
+
+        if price_per_kwh is not None:
+            result["cost"] = round(result["projected"] * price_per_kwh, 2)
+            result["cost_lower"] = round(result["lower"] * price_per_kwh, 2)
+            result["cost_upper"] = round(result["upper"] * price_per_kwh, 2)
+
+        return result
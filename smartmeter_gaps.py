@@ -0,0 +1,265 @@
+"""
+Smart Meter Netz Burgenland - Lückenerkennung
+Findet fehlende 15-Minuten-Intervalle und lädt gezielt nur diese Zeitfenster nach
+"""
+
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import json
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+# Relativ in Home Assistant, absolut in den Skripten und im Worker-Prozess
+if __package__:
+    from .smartmeter_data import TIMEZONE
+else:
+    from smartmeter_data import TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = pd.Timedelta(minutes=15)
+
+
+def find_gaps(series, start=None, end=None, interval=INTERVAL):
+    """
+    Ermittelt fehlende Intervalle über Differenzen des Zeitindex
+
+    Zeilen ohne Messwert zählen als fehlend. Die Differenzen werden auf
+    absoluter Zeit gebildet, die Zeitumstellung erzeugt daher keine Lücken.
+
+    Args:
+        series: Zeitreihe mit Europe/Vienna-Index (z.B. aus load_registers())
+        start: Erstes erwartetes Intervall (optional, sonst erster Messwert)
+        end: Letztes erwartetes Intervall (optional, sonst letzter Messwert)
+        interval: Länge eines Intervalls
+
+    Returns:
+        list: [(erstes_fehlendes, letztes_fehlendes), ...] als Timestamps
+    """
+    index = series.dropna(how='all').index.unique().sort_values()
+    step = interval.value
+
+    if start is not None:
+        start = pd.Timestamp(start)
+        start = start.tz_localize(TIMEZONE) if start.tzinfo is None else start
+        index = index[index >= start]
+    if end is not None:
+        end = pd.Timestamp(end)
+        end = end.tz_localize(TIMEZONE) if end.tzinfo is None else end
+        index = index[index <= end]
+
+    points = index.as_unit('ns').asi8
+    if start is not None:
+        points = np.concatenate([[start.value - step], points])
+    if end is not None:
+        points = np.concatenate([points, [end.value + step]])
+    if len(points) < 2:
+        return []
+
+    diffs = np.diff(points)
+    holes = diffs > step
+    gap_starts = pd.to_datetime(points[:-1][holes] + step, utc=True).tz_convert(TIMEZONE)
+    gap_ends = pd.to_datetime(points[1:][holes] - step, utc=True).tz_convert(TIMEZONE)
+    return list(zip(gap_starts, gap_ends))
+
+
+def count_missing(gaps, interval=INTERVAL):
+    """Anzahl fehlender Intervalle in einer Lückenliste"""
+    return int(sum((end - start) // interval + 1 for start, end in gaps))
+
+
+def coalesce_windows(gaps, merge_days=1):
+    """
+    Fasst Lücken zu möglichst wenigen Download-Zeitfenstern (ganze Tage) zusammen
+
+    Args:
+        gaps: Ergebnis von find_gaps()
+        merge_days: Fenster mit höchstens so vielen Tagen Abstand werden vereinigt
+
+    Returns:
+        list: [(start_date, end_date), ...] jeweils inklusive
+    """
+    windows = []
+    for gap_start, gap_end in sorted(gaps):
+        first, last = gap_start.date(), gap_end.date()
+        if windows and (first - windows[-1][1]).days <= merge_days:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], last))
+        else:
+            windows.append((first, last))
+    return windows
+
+
+def window_bounds(window):
+    """Erstes und letztes 15-Minuten-Intervall eines Tagesfensters"""
+    start, end = window
+    first = pd.Timestamp(start).tz_localize(TIMEZONE)
+    last = pd.Timestamp(end + timedelta(days=1)).tz_localize(TIMEZONE) - INTERVAL
+    return first, last
+
+
+class GapRefetcher:
+    """
+    Lädt Lückenfenster gezielt nach, mit exponentiellem Backoff
+
+    Fenster, die nach dem Nachladen immer noch Lücken haben (z.B. weil der
+    Zähler die Daten noch nicht geliefert hat), werden später erneut versucht.
+    Der Zustand wird als JSON gespeichert und überlebt Neustarts.
+    """
+
+    def __init__(self, store, fetch, state_file=None, base_delay=900, max_delay=86400, max_attempts=8):
+        """
+        Args:
+            store: SeriesStore mit der Gesamtreihe
+            fetch: Funktion fetch(start_date, end_date) -> Pfad zur 15-Minuten-CSV oder None
+            state_file: JSON-Datei für den Zustand (optional)
+            base_delay: Wartezeit nach dem ersten Fehlversuch (Sekunden)
+            max_delay: Maximale Wartezeit zwischen zwei Versuchen (Sekunden)
+            max_attempts: Danach wird ein Fenster aufgegeben
+        """
+        self.store = store
+        self.fetch = fetch
+        self.state_file = Path(state_file) if state_file else None
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self._windows = {}
+        self._load()
+
+    @property
+    def pending(self):
+        return sorted(key for key, state in self._windows.items() if not state.get('given_up'))
+
+    def check(self, start_date, end_date):
+        """
+        Sucht Lücken in der Gesamtreihe und plant das Nachladen
+
+        Das Ende nach dem letzten Messwert wird nicht als Lücke gewertet,
+        dort sind die Daten meist einfach noch nicht verfügbar.
+
+        Args:
+            start_date: Beginn des erwarteten Zeitraums (datetime)
+            end_date: Ende des erwarteten Zeitraums (datetime)
+
+        Returns:
+            list: Zeitfenster [(start_date, end_date), ...] mit fehlenden Werten
+        """
+        series = self.store.series.dropna(how='all')
+        if series.empty:
+            return []
+
+        first, _ = window_bounds((start_date.date(), start_date.date()))
+        _, last = window_bounds((end_date.date(), end_date.date()))
+        checked_last = min(last, series.index[-1])
+        gaps = find_gaps(series, first, checked_last)
+        windows = coalesce_windows(gaps)
+
+        if windows:
+            logger.info(f"🕳️  {count_missing(gaps)} fehlende 15-Minuten-Werte in {len(windows)} Zeitfenster(n):")
+            for window_start, window_end in windows:
+                logger.info(f"  • {window_start} bis {window_end}")
+
+        # Nur Fenster im geprüften Zeitraum abgleichen, den Rest nicht verwerfen
+        self.schedule(windows, checked=(first.date(), checked_last.date()))
+        return windows
+
+    def schedule(self, windows, checked=None):
+        """
+        Übernimmt die aktuell offenen Lückenfenster
+
+        Bekannte Fenster behalten ihren Backoff-Zustand (auch aufgegebene Fenster
+        bleiben aufgegeben). Als erledigt gelten nur Fenster, die ganz im geprüften
+        Zeitraum liegen und dort nicht mehr vorkommen - Fenster außerhalb (kürzerer
+        days_back, rollierender Zeitraum) bleiben unverändert.
+
+        Args:
+            windows: Offene Fenster [(start_date, end_date), ...]
+            checked: Geprüfter Zeitraum (start_date, end_date), None = alle Fenster abgleichen
+        """
+        now = time.time()
+        keys = {(start.isoformat(), end.isoformat()) for start, end in windows}
+        if checked is None:
+            kept = {}
+        else:
+            lower, upper = checked[0].isoformat(), checked[1].isoformat()
+            kept = {
+                key: state for key, state in self._windows.items()
+                if not (lower <= key[0] and key[1] <= upper)
+            }
+        kept.update({
+            key: self._windows.get(key, {'attempts': 0, 'next_try': now})
+            for key in keys
+        })
+        self._windows = kept
+        self._save()
+
+    def run_due(self, now=None):
+        """
+        Lädt alle fälligen Fenster nach
+
+        Returns:
+            int: Anzahl vollständig geschlossener Fenster
+        """
+        now = now or time.time()
+        resolved = 0
+
+        for key in sorted(self._windows):
+            state = self._windows[key]
+            if state.get('given_up') or state['next_try'] > now:
+                continue
+
+            window = (date.fromisoformat(key[0]), date.fromisoformat(key[1]))
+            logger.info(f"🩹 Lade Lücke nach: {key[0]} bis {key[1]} (Versuch {state['attempts'] + 1})")
+
+            remaining = None
+            try:
+                filepath = self.fetch(datetime.combine(window[0], datetime.min.time()),
+                                      datetime.combine(window[1], datetime.min.time()))
+                if filepath:
+                    self.store.merge(filepath)
+                    first, last = window_bounds(window)
+                    # Wie check_gaps: nach dem letzten Messwert ist noch nichts veröffentlicht
+                    series = self.store.series.dropna(how='all')
+                    if not series.empty:
+                        last = min(last, series.index[-1])
+                    remaining = find_gaps(series, first, last)
+            except Exception as e:
+                logger.warning(f"  Nachladen fehlgeschlagen: {e}")
+
+            if remaining == []:
+                logger.info("  ✓ Lücke geschlossen")
+                del self._windows[key]
+                resolved += 1
+                continue
+
+            state['attempts'] += 1
+            if state['attempts'] >= self.max_attempts:
+                logger.warning(f"  ✗ Lücke nach {state['attempts']} Versuchen aufgegeben")
+                state['given_up'] = True
+                continue
+
+            delay = min(self.base_delay * 2 ** (state['attempts'] - 1), self.max_delay)
+            state['next_try'] = now + delay
+            logger.info(f"  Noch offen, nächster Versuch in {delay / 60:.0f} Minuten")
+
+        self._save()
+        return resolved
+
+    def _load(self):
+        if not self.state_file or not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._windows = {tuple(item['window']): item['state'] for item in data}
+        except Exception as e:
+            logger.warning(f"Lücken-Zustand konnte nicht geladen werden: {e}")
+
+    def _save(self):
+        if not self.state_file:
+            return
+        data = [{'window': list(key), 'state': state} for key, state in sorted(self._windows.items())]
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
@@ -28,14 +28,26 @@ try:
 except ImportError:
     SmartMeterSeleniumDownloader = None
 
+try:
+    from smartmeter_backends import SmartMeterAutoDownloader
+except ImportError:
+    SmartMeterAutoDownloader = None
+
+try:
+    from smartmeter_data import ResolutionCache
+except ImportError:
+    ResolutionCache = None
+
 
 class DownloadThread(QThread):
     """Thread für den Download, damit die GUI nicht einfriert"""
     
     log_signal = pyqtSignal(str)
+    file_signal = pyqtSignal(str)
     finished_signal = pyqtSignal(bool)
     
-    def __init__(self, username, password, days_back, data_type, use_selenium=True, headless=True):
+    def __init__(self, username, password, days_back, data_type, use_selenium=True, headless=True, price_per_kwh=0.30,
+                 browser_login=False, auto=False):
         super().__init__()
         self.username = username
         self.password = password
@@ -43,6 +55,21 @@ class DownloadThread(QThread):
         self.data_type = data_type
         self.use_selenium = use_selenium
         self.headless = headless
+        self.price_per_kwh = price_per_kwh
+        self.browser_login = browser_login
+        self.auto = auto
+    
+    def _analyze(self, csv_file):
+        """Wertet die 15-Minuten-CSV in der gewählten Auflösung aus"""
+        try:
+            from smartmeter_downloader import SmartMeterDownloader
+            temp_downloader = SmartMeterDownloader("", "")
+            # Gewählte Auflösung lokal aus den 15-Minuten-Werten ableiten
+            analysis_file = temp_downloader.resolution_cache.export(csv_file, self.data_type)
+            temp_downloader.analyze_csv(analysis_file, price_per_kwh=self.price_per_kwh)
+            self.log_signal.emit("✅ Analyse abgeschlossen")
+        except Exception as e:
+            self.log_signal.emit(f"⚠️ Analyse fehlgeschlagen: {str(e)}")
         
     def run(self):
         """Führt den Download aus"""
@@ -64,7 +91,37 @@ class DownloadThread(QThread):
             logger.addHandler(handler)
             logger.setLevel(logging.INFO)
             
-            if self.use_selenium:
+            if self.auto:
+                # Schnellstes funktionierendes Verfahren nach bisherigen Messungen
+                self.log_signal.emit("⚡ Automatische Auswahl des Download-Verfahrens")
+                downloader = SmartMeterAutoDownloader(self.username, self.password, headless=self.headless)
+                
+                for name in ('smartmeter_backends', 'smartmeter_downloader', 'smartmeter_selenium',
+                             'smartmeter_playwright'):
+                    module_logger = logging.getLogger(name)
+                    module_logger.handlers.clear()
+                    module_logger.addHandler(handler)
+                    module_logger.setLevel(logging.INFO)
+                
+                try:
+                    csv_file = downloader.download_csv(days_back=self.days_back)
+                    for name, stats in downloader.report().items():
+                        p50 = f"{stats['p50']:.1f} s" if stats['p50'] is not None else "-"
+                        p95 = f"{stats['p95']:.1f} s" if stats['p95'] is not None else "-"
+                        self.log_signal.emit(f"📊 {name}: {stats['success_rate']:.0%} erfolgreich, "
+                                             f"p50 {p50}, p95 {p95} ({stats['attempts']} Versuche)")
+                finally:
+                    downloader.close()
+                
+                if csv_file:
+                    self.log_signal.emit(f"✅ CSV heruntergeladen: {csv_file}")
+                    self.file_signal.emit(csv_file)
+                    self._analyze(csv_file)
+                    self.finished_signal.emit(True)
+                else:
+                    self.log_signal.emit("❌ Kein Download-Verfahren war erfolgreich")
+                    self.finished_signal.emit(False)
+            elif self.use_selenium:
                 # Selenium-Download (funktioniert!)
                 self.log_signal.emit("🌐 Verwende Selenium-Methode (Browser-basiert)")
                 if self.headless:
@@ -89,15 +146,10 @@ class DownloadThread(QThread):
                     
                     if csv_file:
                         self.log_signal.emit(f"✅ CSV heruntergeladen: {csv_file}")
+                        self.file_signal.emit(csv_file)
                         
                         # Analysiere die CSV
-                        try:
-                            from smartmeter_downloader import SmartMeterDownloader
-                            temp_downloader = SmartMeterDownloader("", "")
-                            results = temp_downloader.analyze_csv(csv_file)
-                            self.log_signal.emit("✅ Analyse abgeschlossen")
-                        except Exception as e:
-                            self.log_signal.emit(f"⚠️ Analyse fehlgeschlagen: {str(e)}")
+                        self._analyze(csv_file)
                         
                         downloader.close()
                         self.finished_signal.emit(True)
@@ -110,20 +162,35 @@ class DownloadThread(QThread):
                     downloader.close()
                     self.finished_signal.emit(False)
             else:
-                # API-Download (experimentell)
-                self.log_signal.emit("🔌 Verwende API-Methode (experimentell)")
+                # API-Download (experimentell), optional mit Login im Browser
+                if self.browser_login:
+                    self.log_signal.emit("🔀 Verwende Hybrid-Methode (Browser-Login, Export per API)")
+                else:
+                    self.log_signal.emit("🔌 Verwende API-Methode (experimentell)")
                 
                 # Downloader erstellen
-                downloader = SmartMeterDownloader(self.username, self.password)
+                downloader = SmartMeterDownloader(
+                    self.username,
+                    self.password,
+                    browser_login=self.browser_login,
+                    headless=self.headless
+                )
                 
-                # Logger auch für den Downloader setzen
-                downloader_logger = logging.getLogger('smartmeter_downloader')
-                downloader_logger.handlers.clear()
-                downloader_logger.addHandler(handler)
-                downloader_logger.setLevel(logging.INFO)
+                # Logger auch für den Downloader (und den Browser-Login) setzen
+                for name in ('smartmeter_downloader', 'smartmeter_selenium'):
+                    module_logger = logging.getLogger(name)
+                    module_logger.handlers.clear()
+                    module_logger.addHandler(handler)
+                    module_logger.setLevel(logging.INFO)
                 
                 # Download durchführen
-                success = downloader.run_once(days_back=self.days_back, data_type=self.data_type)
+                success = downloader.run_once(
+                    days_back=self.days_back,
+                    data_type=self.data_type,
+                    price_per_kwh=self.price_per_kwh
+                )
+                if downloader.last_raw_file:
+                    self.file_signal.emit(downloader.last_raw_file)
                 self.finished_signal.emit(success)
             
         except Exception as e:
@@ -138,6 +205,8 @@ class SmartMeterGUI(QMainWindow):
         super().__init__()
         self.config_file = Path("config.json")
         self.download_thread = None
+        self.last_csv_file = None
+        self.resolution_cache = ResolutionCache() if ResolutionCache else None
         self.init_ui()
         self.load_config()
         
@@ -218,12 +287,17 @@ class SmartMeterGUI(QMainWindow):
         self.data_type_combo = QComboBox()
         self.data_type_combo.addItems(["15min", "hourly", "daily", "monthly"])
         self.data_type_combo.setCurrentText("15min")
+        self.data_type_combo.setToolTip("Wird lokal aus den 15-Minuten-Werten berechnet - kein neuer Download nötig")
+        self.data_type_combo.currentTextChanged.connect(self.switch_resolution)
         download_layout.addWidget(self.data_type_combo, 1, 1)
         
         download_layout.addWidget(QLabel("Download-Methode:"), 2, 0)
         self.method_combo = QComboBox()
-        self.method_combo.addItems(["Selenium (Browser)", "API (schneller, experimentell)"])
+        self.method_combo.addItems(["Automatisch (schnellstes Verfahren)", "Selenium (Browser)",
+                                    "Hybrid (Browser-Login + API)", "API (schneller, experimentell)"])
         self.method_combo.setCurrentIndex(0)
+        self.method_combo.setToolTip("Automatisch: misst Dauer und Erfolgsquote je Verfahren und nimmt das "
+                                     "schnellste, bei Fehlern das nächste")
         download_layout.addWidget(self.method_combo, 2, 1)
         
         self.headless_cb = QCheckBox("Browser im Hintergrund ausführen (headless)")
@@ -449,7 +523,7 @@ class SmartMeterGUI(QMainWindow):
             self.password_input.setText(config.get("password", ""))
             self.days_back_spinbox.setValue(config.get("days_back", 7))
             self.data_type_combo.setCurrentText(config.get("data_type", "15min"))
-            self.method_combo.setCurrentText(config.get("download_method", "Selenium (Browser)"))
+            self.method_combo.setCurrentText(config.get("download_method", "Automatisch (schnellstes Verfahren)"))
             self.headless_cb.setChecked(config.get("headless", True))
             self.price_spinbox.setValue(config.get("price_per_kwh", 0.30))
             self.periodic_enabled_cb.setChecked(config.get("periodic_enabled", False))
@@ -477,7 +551,44 @@ class SmartMeterGUI(QMainWindow):
         
         method = self.method_combo.currentText()
         
-        if "Selenium" in method:
+        if "Automatisch" in method:
+            if SmartMeterAutoDownloader is None:
+                QMessageBox.critical(
+                    self,
+                    "Fehler",
+                    "Die automatische Auswahl konnte nicht geladen werden!"
+                )
+                return
+            
+            self.log_output.append("🔍 Teste Verbindung mit dem schnellsten Verfahren...\n")
+            downloader = SmartMeterAutoDownloader(username, password, headless=self.headless_cb.isChecked())
+            try:
+                if downloader.login():
+                    self.log_output.append(f"✅ Verbindung erfolgreich ({downloader.last_backend})!\n")
+                    QMessageBox.information(
+                        self,
+                        "Erfolg",
+                        "Verbindung zum Smart Meter Portal erfolgreich!\n"
+                        "Du kannst jetzt Daten herunterladen."
+                    )
+                else:
+                    self.log_output.append("❌ Verbindung fehlgeschlagen!\n")
+                    QMessageBox.warning(
+                        self,
+                        "Verbindungsfehler",
+                        "Login fehlgeschlagen!\n"
+                        "Bitte überprüfe deine Zugangsdaten."
+                    )
+            except Exception as e:
+                self.log_output.append(f"❌ Fehler: {str(e)}\n")
+                QMessageBox.critical(
+                    self,
+                    "Fehler",
+                    f"Fehler beim Verbindungstest:\n{str(e)}"
+                )
+            finally:
+                downloader.close()
+        elif "Selenium" in method:
             # Test mit Selenium (funktioniert!)
             if SmartMeterSeleniumDownloader is None:
                 QMessageBox.critical(
@@ -548,8 +659,23 @@ class SmartMeterGUI(QMainWindow):
                 return
             
             try:
+                browser_login = "Hybrid" in method
+                if browser_login and SmartMeterSeleniumDownloader is None:
+                    QMessageBox.critical(
+                        self,
+                        "Fehler",
+                        "Selenium ist nicht installiert!\n"
+                        "Installiere es mit: pip install selenium"
+                    )
+                    return
+                
                 self.log_output.append("🔍 Teste Verbindung mit API...\n")
-                downloader = SmartMeterDownloader(username, password)
+                downloader = SmartMeterDownloader(
+                    username,
+                    password,
+                    browser_login=browser_login,
+                    headless=self.headless_cb.isChecked()
+                )
                 
                 if downloader.login():
                     self.log_output.append("✅ Verbindung erfolgreich!\n")
@@ -588,9 +714,19 @@ class SmartMeterGUI(QMainWindow):
             return
         
         method = self.method_combo.currentText()
+        auto = "Automatisch" in method
         use_selenium = "Selenium" in method
+        browser_login = "Hybrid" in method
+        
+        if auto and SmartMeterAutoDownloader is None:
+            QMessageBox.critical(
+                self,
+                "Fehler",
+                "Die automatische Auswahl konnte nicht geladen werden!"
+            )
+            return
         
-        if use_selenium and SmartMeterSeleniumDownloader is None:
+        if (use_selenium or browser_login) and SmartMeterSeleniumDownloader is None:
             QMessageBox.critical(
                 self,
                 "Fehler",
@@ -599,7 +735,7 @@ class SmartMeterGUI(QMainWindow):
             )
             return
         
-        if not use_selenium and SmartMeterDownloader is None:
+        if not (use_selenium or auto) and SmartMeterDownloader is None:
             QMessageBox.critical(
                 self,
                 "Fehler",
@@ -629,12 +765,34 @@ class SmartMeterGUI(QMainWindow):
             self.days_back_spinbox.value(),
             self.data_type_combo.currentText(),
             use_selenium=use_selenium,
-            headless=self.headless_cb.isChecked()
+            headless=self.headless_cb.isChecked(),
+            price_per_kwh=self.price_spinbox.value(),
+            browser_login=browser_login,
+            auto=auto
         )
         self.download_thread.log_signal.connect(self.append_log)
+        self.download_thread.file_signal.connect(self.set_last_csv_file)
         self.download_thread.finished_signal.connect(self.download_finished)
         self.download_thread.start()
     
+    def set_last_csv_file(self, path):
+        """Merkt sich die zuletzt heruntergeladene 15-Minuten-CSV"""
+        self.last_csv_file = path
+    
+    def switch_resolution(self, data_type):
+        """Leitet die gewählte Auflösung offline aus der letzten 15-Minuten-CSV ab"""
+        if not self.last_csv_file or self.resolution_cache is None:
+            return
+        
+        try:
+            series = self.resolution_cache.get(self.last_csv_file, data_type)
+            path = self.resolution_cache.export(self.last_csv_file, data_type)
+            totals = ", ".join(f"{register}: {total:.2f}" for register, total in series.sum().items())
+            self.append_log(f"🔁 Auflösung '{data_type}' lokal abgeleitet: {len(series)} Werte ({totals}) → {path}")
+            self.append_log(series.tail(5).to_string())
+        except Exception as e:
+            self.append_log(f"⚠️ Auflösung '{data_type}' konnte nicht abgeleitet werden: {str(e)}")
+    
     def append_log(self, text):
         """Fügt Text zum Log hinzu"""
         self.log_output.append(text)
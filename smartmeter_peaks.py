@@ -0,0 +1,84 @@
+"""
+Smart Meter Netz Burgenland - Leistungsspitzen
+Verfolgt die höchsten 15-Minuten-Leistungswerte (kW) pro Monat
+"""
+
+import heapq
+
+import pandas as pd
+
+# 15-Minuten-Energie (kWh) -> mittlere Leistung im Intervall (kW)
+KWH_TO_KW = 4.0
+
+
+class PeakDemandTracker:
+    """
+    Top-N Leistungsspitzen pro Monat, inkrementell aktualisiert
+
+    Pro Monat wird ein Min-Heap mit den N höchsten Werten gehalten. Für jeden
+    Monat, den ein Update berührt, werden die gemerkten Spitzen mit den neuen
+    Kandidaten zusammengeführt. Kommt ein Zeitstempel erneut (Download mit
+    Überlappung, nachgeladene Lücke, korrigierter Wert), gilt der neue Wert.
+    """
+
+    def __init__(self, top_n=3, max_months=13):
+        """
+        Args:
+            top_n: Anzahl gemerkter Spitzen pro Monat
+            max_months: Ältere Monate werden verworfen
+        """
+        self.top_n = top_n
+        self.max_months = max_months
+        self._heaps = {}
+
+    def update(self, consumption):
+        """
+        Übernimmt neue 15-Minuten-Werte
+
+        Args:
+            consumption: Series mit kWh je 15-Minuten-Intervall (Europe/Vienna-Index)
+
+        Returns:
+            int: Anzahl verarbeiteter Intervalle
+        """
+        values = consumption.dropna()
+        if values.empty:
+            return 0
+
+        kw = values * KWH_TO_KW
+        months = kw.index.strftime('%Y-%m')
+
+        for month, group in kw.groupby(months, sort=False):
+            # Alle gemerkten Einträge plus die neuen Werte, erst danach auf top_n kürzen;
+            # neu gelieferte Werte ersetzen Einträge mit gleichem Zeitstempel
+            merged = {stamp: value for value, stamp in self._heaps.get(month, [])}
+            merged.update((timestamp.isoformat(), float(value)) for timestamp, value in group.items())
+            heap = heapq.nlargest(self.top_n, ((value, stamp) for stamp, value in merged.items()))
+            heapq.heapify(heap)
+            self._heaps[month] = heap
+
+        for month in sorted(self._heaps)[:-self.max_months]:
+            del self._heaps[month]
+
+        return len(values)
+
+    def peaks(self, month):
+        """
+        Spitzen eines Monats, höchste zuerst
+
+        Args:
+            month: 'YYYY-MM', date oder Timestamp
+
+        Returns:
+            list: [{'kw': ..., 'timestamp': ...}, ...]
+        """
+        if not isinstance(month, str):
+            month = pd.Timestamp(month).strftime('%Y-%m')
+        return [
+            {'kw': round(kw, 3), 'timestamp': timestamp}
+            for kw, timestamp in sorted(self._heaps.get(month, []), reverse=True)
+        ]
+
+    def to_dict(self):
+        """Alle Monate mit ihren Spitzen, höchste zuerst"""
+        return {month: self.peaks(month) for month in sorted(self._heaps)}
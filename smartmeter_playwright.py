@@ -0,0 +1,357 @@
+"""
+Smart Meter Netz Burgenland - Playwright-Downloader
+Alternative zu smartmeter_selenium.py für mehrere Accounts: ein gemeinsamer
+Chromium-Prozess, je Account ein eigener, isolierter Browser-Kontext (eigene
+Cookies und eigener Storage, nur einige MB statt eines weiteren Browsers).
+Gleiche Schnittstelle wie SmartMeterSeleniumDownloader: login(), download_csv(), close().
+
+Installation:
+    pip install playwright
+    playwright install chromium
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import logging
+import re
+import tempfile
+import threading
+import time
+
+try:
+    from playwright.sync_api import Error as PlaywrightError
+    from playwright.sync_api import TimeoutError as PlaywrightTimeout
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+    PlaywrightError = PlaywrightTimeout = Exception
+
+from smartmeter_data import fit_to_range
+from smartmeter_selenium import SmartMeterSeleniumDownloader, account_name, archive_file
+
+logger = logging.getLogger(__name__)
+
+# Playwright wartet selbst, bis ein Element sichtbar und klickbar ist - ein
+# Selektor je Schritt genügt, Alternativen stehen als CSS-Liste darin.
+USERNAME_SELECTOR = ("input[type='email'], input[name='username' i], input[name='email' i], "
+                     "input[id*='username' i], input[placeholder*='Benutzer' i]")
+PASSWORD_SELECTOR = "input[type='password']"
+LOGIN_BUTTON_SELECTOR = ("button[type='submit'], input[type='submit'], "
+                         "button:has-text('Anmelden'), button:has-text('Login')")
+LOGIN_ERROR_SELECTOR = "[role='alert'], mat-error, div[class*='error' i], div[class*='alert' i]"
+EXPORT_SELECTOR = (".btn-export, button:has-text('Export'), button:has-text('Download'), "
+                   "[aria-label='Export'], [aria-label='Download']")
+SAVE_SELECTOR = "button:has-text('Speichern'), [role='dialog'] :text-is('Speichern')"
+
+# Schriften und Medien werden nicht geladen (Bilder sind per Startargument aus)
+BLOCKED_RESOURCES = re.compile(r"\.(woff2?|ttf|otf|mp4|webm|mp3)(\?|$)", re.IGNORECASE)
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class SharedBrowser:
+    """
+    Ein Chromium-Prozess für alle Accounts eines Threads
+
+    Der Prozess startet mit dem ersten Kontext und endet mit dem letzten.
+    Die Sync-API von Playwright ist an den Thread gebunden, der sie gestartet
+    hat - shared_browser() liefert deshalb je Thread eine eigene Instanz.
+    """
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._contexts = 0
+
+    def new_context(self, **options):
+        """Neuer isolierter Kontext, startet den Browser bei Bedarf"""
+        if sync_playwright is None:
+            raise RuntimeError("Playwright nicht installiert: pip install playwright && playwright install chromium")
+        if self._browser is None:
+            started = time.monotonic()
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(
+                headless=self.headless,
+                args=SmartMeterSeleniumDownloader.LEAN_ARGUMENTS
+            )
+            logger.info(f"✓ Chromium gestartet ({time.monotonic() - started:.2f} s)")
+        context = self._browser.new_context(**options)
+        self._contexts += 1
+        return context
+
+    def release(self, context):
+        """Schließt einen Kontext; mit dem letzten Kontext endet auch der Browser"""
+        try:
+            context.close()
+        except PlaywrightError:
+            pass
+        self._contexts -= 1
+        if self._contexts <= 0:
+            self.close()
+
+    @property
+    def contexts(self):
+        return self._contexts
+
+    def close(self):
+        if self._browser:
+            try:
+                self._browser.close()
+            except PlaywrightError:
+                pass
+            self._browser = None
+        if self._playwright:
+            self._playwright.stop()
+            self._playwright = None
+        self._contexts = 0
+
+
+def shared_browser(headless=True):
+    """Gemeinsamer Browser des aktuellen Threads"""
+    key = (threading.get_ident(), headless)
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = SharedBrowser(headless)
+        return _shared[key]
+
+
+class SmartMeterPlaywrightDownloader:
+    """Klasse zum Herunterladen der CSV-Daten über einen Playwright-Kontext"""
+
+    def __init__(self, username, password, headless=True, timeouts=None, download_dir="downloads",
+                 base_url=None, browser=None, state_dir=None):
+        """
+        Initialisiert den Downloader
+
+        Args:
+            username: Benutzername (E-Mail)
+            password: Passwort
+            headless: Browser im Hintergrund ausführen (für den gemeinsamen Browser)
+            timeouts: Optionale Wartezeiten je Schritt (wie SmartMeterSeleniumDownloader.DEFAULT_TIMEOUTS)
+            download_dir: Archiv-Ordner für die CSV-Dateien
+            base_url: Anderer Server statt des Portals (z.B. smartmeter_standin.py)
+            browser: Eigener SharedBrowser (None = gemeinsamer Browser des Threads)
+            state_dir: Ordner für gespeicherte Sitzungen (Cookies/Storage je Account),
+                       damit der Login Neustarts überlebt (None = nicht speichern)
+        """
+        self.username = username
+        self.password = password
+        self.timeouts = {**SmartMeterSeleniumDownloader.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.base_url = (base_url or SmartMeterSeleniumDownloader.DEFAULT_BASE_URL).rstrip('/')
+        self.portal_url = f"{self.base_url}/enview/enView.Portal/"
+        self.download_dir = Path(download_dir)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        self.browser = browser or shared_browser(headless)
+        self.state_path = None
+        if state_dir:
+            self.state_path = Path(state_dir) / f"{account_name(username)}.json"
+        self.context = None
+        self.page = None
+        self.logged_in = False
+        self.step_times = {}
+        self.last_range = None
+
+    def _start(self):
+        """Eigenen Kontext im gemeinsamen Browser anlegen"""
+        options = {'accept_downloads': True, 'viewport': {'width': 1280, 'height': 800}}
+        if self.state_path and self.state_path.exists():
+            options['storage_state'] = str(self.state_path)
+            logger.info(f"♻️ Gespeicherte Sitzung: {self.state_path}")
+        self.context = self.browser.new_context(**options)
+        self.context.route(BLOCKED_RESOURCES, lambda route: route.abort())
+        self.page = self.context.new_page()
+
+    def _wait(self, step, selector):
+        """Wartet bis selector sichtbar ist und misst die Dauer des Schritts"""
+        started = time.monotonic()
+        try:
+            return self.page.wait_for_selector(selector, timeout=self.timeouts[step] * 1000)
+        except PlaywrightTimeout:
+            logger.warning(f"⏱️ Timeout nach {self.timeouts[step]} s bei Schritt '{step}'")
+            return None
+        finally:
+            self.step_times[step] = time.monotonic() - started
+            logger.info(f"  ⏱️ {step}: {self.step_times[step]:.2f} s")
+
+    def is_healthy(self):
+        """True wenn der Kontext noch eine offene Seite hat"""
+        return self.page is not None and not self.page.is_closed()
+
+    def ensure_session(self):
+        """Stellt einen angemeldeten Kontext sicher (Login nur bei Bedarf)"""
+        if not self.is_healthy():
+            self.close()
+        if not self.logged_in:
+            return self.login()
+        return True
+
+    def login(self):
+        """
+        Meldet sich auf dem Smart Meter Portal an
+
+        Returns:
+            bool: True wenn Login erfolgreich, sonst False
+        """
+        try:
+            if not self.is_healthy():
+                self._start()
+
+            logger.info("Öffne Smart Meter Portal...")
+            self.page.goto(self.portal_url, wait_until="domcontentloaded")
+
+            dashboard = ", ".join(SmartMeterSeleniumDownloader.DASHBOARD_SELECTORS)
+            if not self._wait('login_form', f"{USERNAME_SELECTOR}, {dashboard}"):
+                logger.error("✗ Weder Login-Formular noch Dashboard gefunden")
+                return False
+            if not self.page.is_visible(PASSWORD_SELECTOR):
+                logger.info("✓ Bereits angemeldet (gespeicherte Sitzung) - Login übersprungen")
+                self.logged_in = True
+                return True
+
+            logger.info("Gebe Zugangsdaten ein...")
+            self.page.fill(USERNAME_SELECTOR, self.username)
+            self.page.fill(PASSWORD_SELECTOR, self.password)
+            self.page.click(LOGIN_BUTTON_SELECTOR)
+
+            logger.info("Warte auf Login-Bestätigung...")
+            self._wait('login_result', f"{dashboard}, {LOGIN_ERROR_SELECTOR}")
+            error = self.page.query_selector(LOGIN_ERROR_SELECTOR)
+            if error and error.is_visible() and error.inner_text().strip():
+                logger.error(f"❌ Fehlermeldung gefunden: {error.inner_text().strip()}")
+                return False
+            if self.page.is_visible(PASSWORD_SELECTOR):
+                logger.error("✗ Login fehlgeschlagen")
+                return False
+
+            logger.info("✓ Login erfolgreich")
+            self.logged_in = True
+            if self.state_path:
+                self.state_path.parent.mkdir(parents=True, exist_ok=True)
+                self.context.storage_state(path=str(self.state_path))
+            return True
+
+        except PlaywrightError as e:
+            logger.error(f"Fehler beim Login: {e}")
+            return False
+
+    def _select_range(self, start, end):
+        """Zeitraum in den Datumsfeldern einstellen (gleiches Skript wie im Selenium-Downloader)"""
+        script = f"(args) => (function () {{ {SmartMeterSeleniumDownloader._RANGE_SCRIPT} }}).apply(null, args)"
+        result = self.page.evaluate(script, [f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"])
+        if not result:
+            logger.warning("⚠️ Keine Datumsfelder gefunden - Export enthält den Zeitraum der Seite")
+            return None
+        mode, shown_from, shown_to = result
+        source = "bereits eingestellt" if mode == 'preset' else "im Datumsfeld gesetzt"
+        logger.info(f"📅 Zeitraum {shown_from} - {shown_to} {source}")
+        return mode
+
+    def download_csv(self, days_back=7, start_date=None, end_date=None):
+        """
+        Exportiert den Zeitraum über die Chart-Seite und speichert die CSV im Archiv
+
+        Args:
+            days_back: Anzahl Tage zurück (wenn start_date fehlt)
+            start_date: Startdatum (date/datetime) - Standard: end_date - days_back
+            end_date: Enddatum (date/datetime) - Standard: heute
+
+        Returns:
+            str: Pfad zur heruntergeladenen Datei oder None
+        """
+        if end_date is None:
+            end_date = datetime.now()
+        if start_date is None:
+            start_date = end_date - timedelta(days=days_back)
+        self.last_range = None
+        if not self.ensure_session():
+            return None
+
+        chart_url = f"{self.portal_url}{SmartMeterSeleniumDownloader.CHART_ROUTE}"
+        try:
+            logger.info(f"Navigiere zu Verbrauchsdaten ({start_date:%d.%m.%Y} - {end_date:%d.%m.%Y})...")
+            self.page.goto(chart_url, wait_until="domcontentloaded")
+            if not self._wait('chart_page', f"{EXPORT_SELECTOR}, {PASSWORD_SELECTOR}"):
+                return None
+            if self.page.is_visible(PASSWORD_SELECTOR):
+                logger.info("🔑 Sitzung abgelaufen - melde neu an...")
+                self.logged_in = False
+                if not self.login():
+                    return None
+                self.page.goto(chart_url, wait_until="domcontentloaded")
+                if not self._wait('chart_page', EXPORT_SELECTOR):
+                    return None
+
+            self._select_range(start_date, end_date)
+            self.page.click(EXPORT_SELECTOR)
+            logger.info("✓ Export-Button geklickt, warte auf Auswahlfenster...")
+
+            started = time.monotonic()
+            with self.page.expect_download(timeout=self.timeouts['download'] * 1000) as download_info:
+                self.page.click(SAVE_SELECTOR, timeout=self.timeouts['export_dialog'] * 1000)
+            download = download_info.value
+
+            # Erst vollständig in einen eigenen Ordner, dann atomar ins Archiv
+            with tempfile.TemporaryDirectory(dir=self.download_dir, prefix=".run_") as run_dir:
+                finished = Path(run_dir) / (download.suggested_filename or "export.csv")
+                download.save_as(finished)
+                finished = archive_file(finished, self.download_dir)
+            self.step_times['download'] = time.monotonic() - started
+            logger.info(f"  ⏱️ download: {self.step_times['download']:.2f} s")
+            logger.info(f"✓ Neue CSV heruntergeladen: {finished.name}")
+
+            self.last_range = fit_to_range(finished, start_date, end_date)
+            return str(finished)
+
+        except PlaywrightTimeout as e:
+            logger.error(f"⏱️ Export abgebrochen: {str(e).splitlines()[0]}")
+            return None
+        except PlaywrightError as e:
+            logger.error(f"Fehler beim Download: {e}")
+            return None
+
+    def close(self):
+        """Schließt den eigenen Kontext (der Browser läuft für andere Accounts weiter)"""
+        if self.context:
+            if self.state_path and self.logged_in:
+                try:
+                    self.context.storage_state(path=str(self.state_path))
+                except PlaywrightError:
+                    pass
+            self.browser.release(self.context)
+            logger.info("Browser-Kontext geschlossen")
+        self.context = None
+        self.page = None
+        self.logged_in = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    """Hauptfunktion: mehrere Accounts in einem gemeinsamen Browser"""
+    ACCOUNTS = [
+        ("deine.email@example.com", "dein_passwort"),
+        ("zweite.email@example.com", "zweites_passwort"),
+    ]
+
+    # Alle Kontexte offen halten, sonst startet der Browser je Account neu
+    downloaders = [SmartMeterPlaywrightDownloader(u, p) for u, p in ACCOUNTS]
+    try:
+        for downloader in downloaders:
+            csv_file = downloader.download_csv(days_back=7)
+            if csv_file:
+                print(f"\n✓ {downloader.username}: {csv_file}")
+            else:
+                print(f"\n✗ {downloader.username}: Download fehlgeschlagen")
+    finally:
+        for downloader in downloaders:
+            downloader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,13 +9,48 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, StaleElementReferenceException, SessionNotCreatedException
+)
 import time
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlsplit
 import logging
 import json
+import ctypes
+import ctypes.util
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import hashlib
+import select
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+
+if __package__:
+    from .smartmeter_data import fit_to_range
+else:
+    from smartmeter_data import fit_to_range
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
 # Logging konfigurieren
 logging.basicConfig(
@@ -25,10 +60,762 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def account_name(username):
+    """
+    Dateiname für Profil bzw. Sitzung eines Accounts
+    
+    Lesbarer Teil plus kurzer Hash des Benutzernamens: 'a@x.com' und 'a_x.com'
+    ergeben sonst denselben Namen. Groß-/Kleinschreibung zählt nicht (E-Mail).
+    """
+    username = username.strip().lower()
+    digest = hashlib.sha1(username.encode('utf-8')).hexdigest()[:8]
+    return f"{re.sub(r'[^A-Za-z0-9._-]', '_', username)}-{digest}"
+
+
+def archive_file(path, directory):
+    """
+    Verschiebt eine fertige Datei atomar in den Archiv-Ordner
+    
+    Gibt es den Namen dort schon, wird ein Zeitstempel (und ggf. Zähler)
+    angehängt. os.link schlägt fehl statt zu überschreiben, so können sich
+    parallele Läufe nicht gegenseitig Dateien ersetzen.
+    
+    Returns:
+        Path: Pfad im Archiv
+    """
+    path = Path(path)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    candidates = [path.name] + [
+        f"{path.stem}_{stamp}{'_' + str(n) if n else ''}{path.suffix}" for n in range(100)
+    ]
+    for name in candidates:
+        target = Path(directory) / name
+        try:
+            os.link(path, target)
+        except FileExistsError:
+            continue
+        except OSError:
+            # Dateisystem ohne Hardlinks
+            if target.exists():
+                continue
+            os.replace(path, target)
+            return target
+        path.unlink()
+        return target
+    raise FileExistsError(f"Kein freier Dateiname für {path.name} im Archiv")
+
+
+class ProfileLock:
+    """
+    Exklusive Sperre auf ein Chrome-Profilverzeichnis
+    
+    Die Sperre hängt am offenen Dateihandle und verschwindet auch dann,
+    wenn der Prozess abstürzt - es bleiben keine veralteten Sperren zurück.
+    """
+    
+    def __init__(self, profile_dir):
+        # Nicht with_suffix: "a_x.com" und "a_x.net" bekämen sonst dieselbe Sperre
+        profile_dir = Path(profile_dir)
+        self.path = profile_dir.with_name(profile_dir.name + ".lock")
+        self._handle = None
+    
+    def acquire(self):
+        """
+        Returns:
+            bool: True wenn die Sperre gehalten wird, False wenn ein anderer Lauf das Profil nutzt
+        """
+        if self._handle:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(self.path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._handle = handle
+        return True
+    
+    def release(self):
+        if not self._handle:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            else:
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        self._handle.close()
+        self._handle = None
+
+
+class DownloadWatcher:
+    """
+    Erkennt eine fertig heruntergeladene Datei im Download-Ordner
+    
+    Unter Linux meldet inotify das Umbenennen .crdownload -> .csv sofort,
+    sonst wird der Ordner im kurzen Abstand abgefragt. In beiden Fällen muss
+    die Dateigröße kurz stabil bleiben. Der Watcher wird vor dem Klick auf
+    Speichern gestartet; Dateien, die es davor schon gab, zählen nur wenn
+    sie danach neu geschrieben werden.
+    """
+    
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    _EVENT = struct.Struct("iIII")
+    
+    def __init__(self, directory, suffix=".csv", poll=0.1, settle=0.05):
+        """
+        Args:
+            directory: Zu überwachender Ordner
+            suffix: Endung der erwarteten Datei
+            poll: Prüfintervall ohne inotify (Sekunden)
+            settle: Abstand der beiden Größenmessungen (Sekunden)
+        """
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self.poll = poll
+        self.settle = settle
+        self._fd = None
+        self._snapshot = {}
+    
+    def _scan(self):
+        files = {}
+        for path in self.directory.glob(f"*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+    
+    def start(self):
+        """Merkt sich den aktuellen Stand und aktiviert inotify, falls verfügbar"""
+        self._snapshot = self._scan()
+        self._fd = self._inotify_watch()
+        return self
+    
+    def _inotify_watch(self):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+            if fd < 0:
+                return None
+            wd = libc.inotify_add_watch(fd, str(self.directory.absolute()).encode(),
+                                        self.IN_MOVED_TO | self.IN_CLOSE_WRITE)
+            if wd < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+    
+    def _read_events(self):
+        """Namen der fertig geschriebenen oder umbenannten Dateien seit dem letzten Aufruf"""
+        names = []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + self._EVENT.size <= len(data):
+            _, _, _, length = self._EVENT.unpack_from(data, offset)
+            name = data[offset + self._EVENT.size:offset + self._EVENT.size + length].rstrip(b"\0")
+            names.append(os.fsdecode(name))
+            offset += self._EVENT.size + length
+        return names
+    
+    def _completed(self, candidates):
+        """Erste Datei mit stabiler Größe > 0, die sich seit start() geändert hat"""
+        for path in candidates:
+            if path.suffix != self.suffix:
+                continue
+            try:
+                first = path.stat()
+                time.sleep(self.settle)
+                second = path.stat()
+            except FileNotFoundError:
+                continue
+            stamp = (second.st_mtime_ns, second.st_size)
+            if second.st_size > 0 and first.st_size == second.st_size and self._snapshot.get(path) != stamp:
+                return path
+        return None
+    
+    def wait(self, timeout):
+        """
+        Wartet auf die fertige Datei
+        
+        Returns:
+            Path oder None bei Timeout
+        """
+        deadline = time.monotonic() + timeout
+        poller = None
+        if self._fd is not None:
+            poller = select.poll()
+            poller.register(self._fd, select.POLLIN)
+        
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            
+            if poller:
+                # Bis zum nächsten Ereignis blockieren, spätestens aber nach 1 s neu prüfen
+                if poller.poll(min(remaining, 1.0) * 1000):
+                    names = self._read_events()
+                    found = self._completed([self.directory / name for name in names])
+                    if found:
+                        return found
+                    continue
+            else:
+                time.sleep(min(self.poll, remaining))
+            
+            # Abfrage als Rückfallebene (und falls ein Ereignis verpasst wurde)
+            changed = [path for path, stamp in self._scan().items() if self._snapshot.get(path) != stamp]
+            found = self._completed(sorted(changed, key=lambda p: p.stat().st_mtime_ns, reverse=True))
+            if found:
+                return found
+    
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class DriverCache:
+    """
+    Merkt sich die von Selenium Manager aufgelösten Pfade von ChromeDriver und Chrome
+    
+    Ohne Cache löst Selenium Manager bei jedem Browserstart neu auf (Prozessstart,
+    ggf. Netzwerkzugriff) - auf kleinen ARM-Rechnern mehrere Sekunden. Neu
+    aufgelöst wird nur, wenn die Dateien fehlen oder die Versionen nicht
+    mehr zusammenpassen.
+    """
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self._entry = None
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entry = json.load(f)
+            except Exception as e:
+                logger.warning(f"Treiber-Cache konnte nicht geladen werden: {e}")
+    
+    def get(self):
+        """Gespeicherte Pfade, sofern die Dateien noch existieren, sonst None"""
+        entry = self._entry
+        if not entry or not Path(entry.get('driver_path', '')).is_file():
+            return None
+        if entry.get('browser_path') and not Path(entry['browser_path']).is_file():
+            return None
+        return entry
+    
+    def store(self, driver_path, browser_path, driver_version, browser_version):
+        entry = {
+            'driver_path': driver_path,
+            'browser_path': browser_path or '',
+            'driver_version': driver_version,
+            'browser_version': browser_version,
+            'resolved_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        if self._entry and all(self._entry.get(k) == v for k, v in entry.items() if k != 'resolved_at'):
+            return
+        self._entry = entry
+        try:
+            # Atomar schreiben, der Cache wird von allen Accounts geteilt
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Treiber-Cache konnte nicht gespeichert werden: {e}")
+    
+    def invalidate(self):
+        self._entry = None
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _proc_stat(pid):
+    """Felder aus /proc/<pid>/stat ab dem Zustand (Feld 3) oder None"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Der Prozessname in Klammern kann Leerzeichen enthalten
+    return stat.rsplit(")", 1)[1].split()
+
+
+def _boot_time():
+    """Systemstart in Sekunden seit 1970 (btime aus /proc/stat) oder None"""
+    try:
+        with open("/proc/stat") as f:
+            for line in f:
+                if line.startswith("btime "):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def process_started(pid):
+    """
+    Startzeitpunkt eines laufenden Prozesses (Sekunden seit 1970) oder None
+    
+    Zusammen mit der PID eindeutig - eine wiederverwendete PID hat eine andere
+    Startzeit. Zombies zählen als beendet. psutil und /proc liefern dieselbe
+    Einheit, gerundet auf 1/100 s, damit driver_pids.json mit beiden vergleichbar bleibt.
+    """
+    if psutil:
+        try:
+            process = psutil.Process(pid)
+            if process.status() == psutil.STATUS_ZOMBIE:
+                return None
+            return round(process.create_time(), 2)
+        except psutil.Error:
+            return None
+    fields = _proc_stat(pid)
+    boot = _boot_time()
+    if fields is None or fields[0] == 'Z' or boot is None:
+        return None
+    # starttime (Feld 22) zählt Ticks seit Systemstart
+    return round(boot + int(fields[19]) / os.sysconf('SC_CLK_TCK'), 2)
+
+
+def process_tree(pid):
+    """PID und alle Nachfahren eines Prozesses"""
+    if psutil:
+        try:
+            return [pid] + [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+    if not os.path.isdir("/proc"):
+        return [pid]
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            fields = _proc_stat(entry)
+            if fields:
+                parents.setdefault(int(fields[1]), []).append(int(entry))
+    found, todo = [], [pid]
+    while todo:
+        current = todo.pop()
+        found.append(current)
+        todo.extend(parents.get(current, []))
+    return found
+
+
+def process_rss(pid):
+    """Resident Set Size eines Prozesses in Bytes (0 wenn unbekannt)"""
+    if psutil:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss(pid):
+    """Summe der RSS (Bytes) eines Prozesses und aller seiner Nachfahren"""
+    return sum(process_rss(p) for p in process_tree(pid))
+
+
+def kill_tree(pid, grace=3.0):
+    """
+    Beendet einen Prozess samt Nachfahren: erst SIGTERM, nach grace Sekunden SIGKILL
+    
+    Eigene Kindprozesse werden danach eingesammelt, damit keine Zombies bleiben.
+    """
+    if psutil:
+        try:
+            root = psutil.Process(pid)
+            processes = root.children(recursive=True) + [root]
+        except psutil.Error:
+            return
+        for process in processes:
+            try:
+                process.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(processes, timeout=grace)
+        for process in alive:
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+        psutil.wait_procs(alive, timeout=grace)
+        return
+    if sys.platform == "win32":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(pid)], capture_output=True)
+        return
+    
+    pids = process_tree(pid)
+    for target in pids:
+        try:
+            os.kill(target, signal.SIGTERM)
+        except OSError:
+            pass
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline and any(process_started(p) is not None for p in pids):
+        for target in pids:
+            _reap(target)
+        time.sleep(0.1)
+    for target in pids:
+        if process_started(target) is not None:
+            try:
+                os.kill(target, signal.SIGKILL)
+            except OSError:
+                pass
+        _reap(target)
+
+
+def _reap(pid):
+    """Sammelt einen beendeten eigenen Kindprozess ein (sonst bleibt ein Zombie)"""
+    try:
+        os.waitpid(pid, os.WNOHANG)
+    except (ChildProcessError, OSError, AttributeError):
+        pass
+
+
+class DriverWatchdog:
+    """
+    Überwacht die gestarteten ChromeDriver- und Chrome-Prozesse
+    
+    PIDs stehen mit Startzeit und besitzendem Prozess in einer Datei. Ist der
+    Besitzer (z.B. Home Assistant) abgestürzt, beendet cleanup_orphans() die
+    übrig gebliebenen Browser beim nächsten Start. Während run() werden
+    Laufzeit und Speicher (RSS aller Browser-Prozesse) überwacht; bei
+    Überschreitung wird der Prozessbaum beendet.
+    """
+    
+    MB = 1024 * 1024
+    # Warnung "keine Prozessliste" nur einmal je Prozess
+    _untracked_warned = False
+    
+    def __init__(self, path, max_run_seconds=None, max_rss_mb=None, interval=1.0):
+        """
+        Args:
+            path: Datei mit den gestarteten Prozessen (von allen Accounts geteilt)
+            max_run_seconds: Höchstdauer eines Laufs (None = unbegrenzt)
+            max_rss_mb: Höchster Speicherverbrauch aller Browser-Prozesse (None = unbegrenzt)
+            interval: Messintervall in Sekunden
+        """
+        self.path = Path(path)
+        self.max_run_seconds = max_run_seconds
+        self.max_rss_mb = max_rss_mb
+        self.interval = interval
+        self.last_usage = None
+        self._tracked = {}   # pid -> Startzeit
+        self._lock = threading.Lock()
+        self._owner = (os.getpid(), process_started(os.getpid()))
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+    
+    def _save(self, entries):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Prozessliste konnte nicht gespeichert werden: {e}")
+    
+    def track_driver(self, driver):
+        """Merkt sich ChromeDriver und die von ihm gestarteten Chrome-Prozesse"""
+        try:
+            pid = driver.service.process.pid
+        except AttributeError:
+            return
+        pids = {p: process_started(p) for p in process_tree(pid)}
+        pids = {p: started for p, started in pids.items() if started is not None}
+        if not pids:
+            # Ohne psutil und /proc (z.B. Windows, macOS) ist keine Prozessliste verfügbar
+            if not DriverWatchdog._untracked_warned:
+                DriverWatchdog._untracked_warned = True
+                logger.warning("⚠️ Browser-Prozesse können nicht verfolgt werden (psutil fehlt) - "
+                               "Laufzeit-/Speichergrenze und Aufräumen sind inaktiv. pip install psutil")
+            return
+        with self._lock:
+            self._tracked.update(pids)
+            entries = [e for e in self._load() if e['pid'] not in pids]
+            entries += [{'pid': p, 'started': started, 'owner': self._owner[0], 'owner_started': self._owner[1]}
+                        for p, started in pids.items()]
+            self._save(entries)
+    
+    def _alive(self):
+        """Noch laufende eigene Prozesse (PID und Startzeit stimmen überein)"""
+        with self._lock:
+            tracked = dict(self._tracked)
+        return [pid for pid, started in tracked.items() if process_started(pid) == started]
+    
+    def kill_all(self):
+        """Beendet alle eigenen Browser-Prozesse"""
+        for pid in self._alive():
+            kill_tree(pid)
+    
+    def release(self):
+        """Nach driver.quit(): Reste beenden und aus der Prozessliste austragen"""
+        leftovers = self._alive()
+        if leftovers:
+            logger.warning(f"🧹 {len(leftovers)} Browser-Prozess(e) nach dem Beenden noch aktiv - beende sie")
+            for pid in leftovers:
+                kill_tree(pid)
+        with self._lock:
+            mine = set(self._tracked)
+            self._tracked.clear()
+            self._save([e for e in self._load() if e['pid'] not in mine])
+    
+    def cleanup_orphans(self):
+        """
+        Beendet Browser-Prozesse, deren Besitzer nicht mehr läuft
+        
+        Returns:
+            int: Anzahl beendeter Prozessbäume
+        """
+        killed = 0
+        with self._lock:
+            keep = []
+            for entry in self._load():
+                if process_started(entry['pid']) != entry['started']:
+                    continue  # längst beendet (oder PID neu vergeben)
+                if process_started(entry['owner']) == entry['owner_started']:
+                    keep.append(entry)
+                    continue
+                kill_tree(entry['pid'])
+                killed += 1
+            self._save(keep)
+        if killed:
+            logger.warning(f"🧹 {killed} verwaiste Browser-Prozess(e) eines früheren Laufs beendet")
+        return killed
+    
+    @contextmanager
+    def run(self, name="run"):
+        """
+        Überwacht einen Lauf (z.B. Login + Download) und meldet den Verbrauch
+        
+        Yields:
+            dict: {'name', 'seconds', 'peak_rss_mb', 'processes', 'killed'} -
+                  wird am Ende des Laufs ausgefüllt, steht danach auch in last_usage
+        """
+        usage = {'name': name, 'seconds': 0.0, 'peak_rss_mb': 0.0, 'processes': 0, 'killed': None}
+        started = time.monotonic()
+        stop = threading.Event()
+        
+        def monitor():
+            while not stop.wait(self.interval):
+                pids = set()
+                for pid in self._alive():
+                    pids.update(process_tree(pid))
+                rss = sum(process_rss(p) for p in pids)
+                usage['peak_rss_mb'] = max(usage['peak_rss_mb'], rss / self.MB)
+                usage['processes'] = max(usage['processes'], len(pids))
+                
+                reason = None
+                elapsed = time.monotonic() - started
+                if self.max_run_seconds and elapsed > self.max_run_seconds:
+                    reason = f"Laufzeit über {self.max_run_seconds} s"
+                elif self.max_rss_mb and rss > self.max_rss_mb * self.MB:
+                    reason = f"Speicher {rss / self.MB:.0f} MB über {self.max_rss_mb} MB"
+                if reason:
+                    logger.error(f"🛑 Watchdog: {reason} - beende Browser")
+                    usage['killed'] = reason
+                    self.kill_all()
+                    return
+        
+        thread = threading.Thread(target=monitor, name=f"watchdog-{name}", daemon=True)
+        thread.start()
+        try:
+            yield usage
+        finally:
+            stop.set()
+            thread.join()
+            usage['seconds'] = time.monotonic() - started
+            self.last_usage = usage
+            logger.info(f"📊 Lauf '{name}': {usage['seconds']:.1f} s, max. {usage['peak_rss_mb']:.0f} MB RSS, "
+                        f"{usage['processes']} Prozesse"
+                        f"{' - abgebrochen: ' + usage['killed'] if usage['killed'] else ''}")
+
+
+class SelectorStats:
+    """
+    Treffer-Statistik der Selektoren je Portal und Schritt
+    
+    Selektoren, die zuletzt gegriffen haben, werden zuerst probiert. Schlägt
+    ein bewährter Selektor DEMOTE_AFTER-mal in Folge fehl (Portal geändert),
+    fällt er auf seinen ursprünglichen Platz in der Liste zurück.
+    """
+    
+    DEMOTE_AFTER = 3
+    
+    def __init__(self, path, site):
+        """
+        Args:
+            path: JSON-Datei für die Statistik
+            site: Host des Portals (Statistiken sind je Portal getrennt)
+        """
+        self.path = Path(path)
+        self.site = site
+        self._data = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except Exception as e:
+                logger.warning(f"Selektor-Statistik konnte nicht geladen werden: {e}")
+    
+    def _stats(self, step):
+        return self._data.setdefault(self.site, {}).setdefault(step, {})
+    
+    def _proven(self, entry):
+        return bool(entry and entry['hits'] and entry['streak'] < self.DEMOTE_AFTER)
+    
+    def rank(self, step, selectors):
+        """
+        Sortiert die Selektoren eines Schritts: bewährte zuerst (nach Trefferquote), dann der Rest in Originalreihenfolge
+        """
+        stats = self._stats(step)
+        
+        def key(item):
+            position, selector = item
+            entry = stats.get(selector)
+            if not self._proven(entry):
+                return (1, 0.0, position)
+            return (0, -entry['hits'] / (entry['hits'] + entry['misses']), position)
+        
+        return [selector for _, selector in sorted(enumerate(selectors), key=key)]
+    
+    def record(self, step, selectors, winner):
+        """
+        Verbucht das Ergebnis einer Suche
+        
+        Bewährte Selektoren, die vor dem Gewinner probiert wurden, zählen als
+        Fehlschlag. winner=None heißt: kein Selektor hat gegriffen.
+        """
+        stats = self._stats(step)
+        for selector in self.rank(step, selectors):
+            if selector == winner:
+                break
+            entry = stats.get(selector)
+            if self._proven(entry):
+                entry['misses'] += 1
+                entry['streak'] += 1
+                if entry['streak'] == self.DEMOTE_AFTER:
+                    logger.info(f"  Selektor für '{step}' zurückgestuft (greift nicht mehr): {selector}")
+        
+        if winner:
+            entry = stats.setdefault(winner, {'hits': 0, 'misses': 0, 'streak': 0})
+            entry['hits'] += 1
+            entry['streak'] = 0
+            entry['last_hit'] = datetime.now().isoformat(timespec='seconds')
+        self.save()
+    
+    def save(self):
+        try:
+            # Atomar schreiben, GUI und Home Assistant teilen sich die Datei
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Selektor-Statistik konnte nicht gespeichert werden: {e}")
+
+
 class SmartMeterSeleniumDownloader:
     """Browser-basierter Downloader für Smart Meter Daten"""
     
-    def __init__(self, username, password, headless=False):
+    # Maximale Wartezeit je Schritt in Sekunden - gewartet wird nur so lange,
+    # bis die jeweilige Bedingung erfüllt ist
+    DEFAULT_TIMEOUTS = {
+        'login_form': 15,     # Login-Formular erscheint
+        'login_result': 20,   # URL-Wechsel, Dashboard oder Fehlermeldung nach dem Absenden
+        'chart_page': 20,     # Export-Button auf der Chart-Seite klickbar
+        'export_dialog': 10,  # Speichern-Button im Export-Dialog klickbar
+        'download': 60,       # CSV-Datei vollständig geschrieben
+    }
+    
+    SCREENSHOT_POLICIES = ('off', 'on_failure', 'always')
+    
+    DEFAULT_BASE_URL = "https://smartmeter.netzburgenland.at"
+    
+    # Chart-Seite mit dem Export-Button (relativ zu portal_url)
+    CHART_ROUTE = "#/consumption/values/chart/month"
+    
+    # Schlankes Startprofil für Headless-Läufe: keine Bilder, Erweiterungen,
+    # Hintergrund-Dienste; Seiten gelten schon nach dem DOM als geladen
+    LEAN_ARGUMENTS = [
+        "--window-size=1280,800",
+        "--blink-settings=imagesEnabled=false",
+        "--disable-extensions",
+        "--disable-background-networking",
+        "--disable-sync",
+        "--disable-default-apps",
+        "--disable-component-update",
+        "--disable-features=Translate,MediaRouter,OptimizationHints",
+        "--no-first-run",
+        "--mute-audio",
+    ]
+    LEAN_PREFS = {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    }
+    # Schriften und Medien per CDP blockiert (kein Chrome-Schalter dafür)
+    LEAN_BLOCKED_URLS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm", "*.mp3"]
+    # Analyse- und Tracking-Dienste Dritter (block_hosts=True)
+    DEFAULT_BLOCKED_HOSTS = [
+        "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+        "hotjar.com", "matomo.cloud", "facebook.net", "clarity.ms",
+    ]
+    
+    # Elemente, die nur nach erfolgreichem Login sichtbar sind
+    DASHBOARD_SELECTORS = [
+        "a[href*='logout' i]",
+        "div[class*='dashboard' i]",
+        "div[class*='consumption' i]"
+    ]
+    
+    def __init__(self, username, password, headless=False, timeouts=None, max_driver_age=None,
+                 profile_dir=None, capture_network=False, download_dir="downloads",
+                 screenshots="on_failure", snapshot_format="png", max_screenshots=20,
+                 lean=False, block_hosts=None, base_url=None, max_run_seconds=None, max_rss_mb=None):
         """
         Initialisiert den Downloader
         
@@ -36,14 +823,86 @@ class SmartMeterSeleniumDownloader:
             username: Benutzername (E-Mail)
             password: Passwort
             headless: Browser im Hintergrund ausführen (True) oder sichtbar (False)
+            timeouts: Optionale Wartezeiten je Schritt (überschreibt DEFAULT_TIMEOUTS)
+            max_driver_age: Browser nach so vielen Sekunden neu starten (None = nie)
+            profile_dir: Ordner für dauerhafte Chrome-Profile (je Account ein Unterordner),
+                         damit die Portal-Sitzung Neustarts überlebt (None = Wegwerf-Profil)
+            capture_network: Netzwerk-Anfragen mitschneiden (für die Export-API-Erkennung)
+            download_dir: Archiv-Ordner für die CSV-Dateien. Jeder Download landet zuerst
+                          in einem eigenen Unterordner und wird danach atomar verschoben.
+            screenshots: Debug-Aufnahmen 'off', 'on_failure' (nur bei Fehlern) oder 'always'
+            snapshot_format: 'png' (Screenshot) oder 'html' (DOM-Snapshot, deutlich billiger)
+            max_screenshots: Nur die neuesten Aufnahmen in download_dir/debug/ werden behalten
+            lean: Schlankes Startprofil (LEAN_ARGUMENTS, page_load_strategy 'eager')
+            block_hosts: Anfragen an diese Hosts blockieren (True = DEFAULT_BLOCKED_HOSTS)
+            base_url: Anderer Server statt des Portals, z.B. der lokale Nachbau
+                      aus smartmeter_standin.py (None = DEFAULT_BASE_URL)
+            max_run_seconds: Watchdog - Höchstdauer eines Laufs in watchdog.run() (None = unbegrenzt)
+            max_rss_mb: Watchdog - Speichergrenze aller Browser-Prozesse in MB (None = unbegrenzt)
         """
         self.username = username
         self.password = password
         self.headless = headless
         self.driver = None
-        self.download_dir = Path("downloads")
-        self.download_dir.mkdir(exist_ok=True)
+        self.base_url = (base_url or self.DEFAULT_BASE_URL).rstrip('/')
+        self.portal_url = f"{self.base_url}/enview/enView.Portal/"
+        self.download_dir = Path(download_dir)
+        self.download_dir.mkdir(parents=True, exist_ok=True)
+        self.driver_cache = DriverCache(self.download_dir / "driver_cache.json")
+        # Verfolgt die gestarteten Browser-Prozesse, räumt Reste früherer Abstürze auf
+        self.watchdog = DriverWatchdog(self.download_dir / "driver_pids.json", max_run_seconds, max_rss_mb)
+        self.watchdog.cleanup_orphans()
+        self._service = None
+        # Zuletzt erfolgreiche Selektoren je Schritt werden zuerst probiert
+        self.selector_stats = SelectorStats(
+            self.download_dir / "selector_stats.json",
+            urlsplit(self.portal_url).netloc
+        )
+        if screenshots not in self.SCREENSHOT_POLICIES:
+            raise ValueError(f"Unbekannte Screenshot-Einstellung: {screenshots}")
+        self.screenshots = screenshots
+        self.snapshot_format = snapshot_format
+        self.max_screenshots = max_screenshots
+        self.lean = lean
+        self.block_hosts = self.DEFAULT_BLOCKED_HOSTS if block_hosts is True else list(block_hosts or [])
+        self.debug_dir = self.download_dir / "debug"
+        self._snapshot_writer = None
+        self._snapshot_seq = 0
+        self.timeouts = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.step_times = {}
+        self.last_resolution = None
+        self.last_range = None
+        self.max_driver_age = max_driver_age
+        self.driver_started_at = None
+        self.logged_in = False
+        self.capture_network = capture_network
+        self.profile_path = None
+        self._profile_lock = None
+        if profile_dir:
+            self.profile_path = Path(profile_dir) / account_name(username)
+            self._profile_lock = ProfileLock(self.profile_path)
+        
+    def _use_profile(self, chrome_options):
+        """Hängt das dauerhafte Profil an, sofern es nicht von einem anderen Lauf benutzt wird"""
+        if not self.profile_path:
+            return
+        if not self._profile_lock.acquire():
+            logger.warning(f"⚠️ Profil {self.profile_path} wird gerade verwendet - starte mit leerem Profil")
+            return
         
+        self.profile_path.mkdir(parents=True, exist_ok=True)
+        # Chromes eigene Sperre bleibt nach Abstürzen liegen - wir halten jetzt die echte Sperre
+        for stale in ("SingletonLock", "SingletonCookie", "SingletonSocket"):
+            try:
+                (self.profile_path / stale).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.debug(f"{stale} konnte nicht entfernt werden: {e}")
+        
+        chrome_options.add_argument(f"--user-data-dir={self.profile_path.absolute()}")
+        logger.info(f"Verwende dauerhaftes Browser-Profil: {self.profile_path}")
+    
     def _setup_driver(self):
         """Richtet den Chrome WebDriver ein"""
         logger.info("Richte Browser ein...")
@@ -55,7 +914,6 @@ class SmartMeterSeleniumDownloader:
         
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--window-size=1920,1080")
         
         # Download-Einstellungen
         prefs = {
@@ -64,19 +922,396 @@ class SmartMeterSeleniumDownloader:
             "download.directory_upgrade": True,
             "safebrowsing.enabled": True
         }
+        
+        if self.lean:
+            for argument in self.LEAN_ARGUMENTS:
+                chrome_options.add_argument(argument)
+            prefs.update(self.LEAN_PREFS)
+            chrome_options.page_load_strategy = 'eager'
+        else:
+            chrome_options.add_argument("--window-size=1920,1080")
+        
         chrome_options.add_experimental_option("prefs", prefs)
+        self._use_profile(chrome_options)
+        
+        if self.capture_network:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+            chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
         
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
+            started = time.monotonic()
+            cached = self._prepare_service(chrome_options)
+            try:
+                self.driver = webdriver.Chrome(service=self._service, options=chrome_options)
+            except SessionNotCreatedException as e:
+                if not cached:
+                    raise
+                # Chrome wurde aktualisiert und passt nicht mehr zum gemerkten Treiber
+                logger.info(f"Gemerkter ChromeDriver passt nicht mehr ({str(e)[:80]}) - löse neu auf")
+                self.driver_cache.invalidate()
+                chrome_options.binary_location = ""
+                self._prepare_service(chrome_options)
+                self.driver = webdriver.Chrome(service=self._service, options=chrome_options)
+            self._remember_driver(chrome_options)
+            self.watchdog.track_driver(self.driver)
+            self.step_times['startup'] = time.monotonic() - started
+            logger.info(f"  ⏱️ startup: {self.step_times['startup']:.2f} s"
+                        f"{' (Treiber aus Cache)' if cached else ''}")
             self.driver.set_page_load_timeout(30)
+            self._block_requests()
+            self.driver_started_at = time.monotonic()
+            self.logged_in = False
             logger.info("✓ Browser gestartet")
             return True
         except Exception as e:
+            if self._profile_lock:
+                self._profile_lock.release()
             logger.error(f"✗ Fehler beim Starten des Browsers: {e}")
             logger.error("Stelle sicher, dass Chrome und ChromeDriver installiert sind:")
             logger.error("  macOS: brew install chromedriver")
             return False
     
+    def _prepare_service(self, chrome_options):
+        """
+        Legt den Service mit fest eingetragenem ChromeDriver an (ohne Selenium Manager beim Start)
+        
+        Returns:
+            bool: True wenn die Pfade aus dem Cache stammen
+        """
+        entry = self.driver_cache.get()
+        if entry:
+            driver_path, browser_path = entry['driver_path'], entry['browser_path']
+        else:
+            driver_path = browser_path = None
+            try:
+                from selenium.webdriver.common.driver_finder import DriverFinder
+                finder = DriverFinder(Service(), chrome_options)
+                driver_path = finder.get_driver_path()
+                browser_path = finder.get_browser_path()
+            except Exception as e:
+                logger.debug(f"Treiber konnte nicht vorab aufgelöst werden: {e}")
+        
+        if browser_path:
+            chrome_options.binary_location = browser_path
+        # Service-Objekt über Browser-Neustarts hinweg weiterverwenden
+        if self._service is None or self._service.path != driver_path or not driver_path:
+            self._service = Service(executable_path=driver_path) if driver_path else Service()
+        return entry is not None
+    
+    def _remember_driver(self, chrome_options):
+        """Speichert Pfade und Versionen nach einem erfolgreichen Start"""
+        caps = self.driver.capabilities
+        browser_version = caps.get('browserVersion', '')
+        driver_version = caps.get('chrome', {}).get('chromedriverVersion', '').split(' ')[0]
+        if browser_version.split('.')[0] != driver_version.split('.')[0]:
+            # Läuft noch, beim nächsten Start aber neu auflösen
+            logger.warning(f"ChromeDriver {driver_version} passt nicht zu Chrome {browser_version}")
+            self.driver_cache.invalidate()
+            return
+        self.driver_cache.store(self.driver.service.path, chrome_options.binary_location,
+                                driver_version, browser_version)
+    
+    def _block_requests(self):
+        """Blockiert Schriften/Medien (lean) und Tracking-Hosts per CDP, bevor die erste Seite lädt"""
+        patterns = list(self.LEAN_BLOCKED_URLS) if self.lean else []
+        patterns += [f"*{host}*" for host in self.block_hosts]
+        if not patterns:
+            return
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+            logger.info(f"  {len(patterns)} URL-Muster blockiert")
+        except Exception as e:
+            logger.warning(f"Anfragen konnten nicht blockiert werden: {str(e)[:100]}")
+    
+    # Prüft alle Selektoren in einem einzigen Aufruf im Browser: erstes sichtbares,
+    # aktives Element in Prioritätsreihenfolge plus Diagnose je Selektor
+    _RESOLVE_SCRIPT = """
+        const selectors = arguments[0];
+        const visible = (el) => {
+            if (!el.getClientRects().length) return false;
+            const style = window.getComputedStyle(el);
+            return style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+        };
+        const diagnostics = [];
+        for (let i = 0; i < selectors.length; i++) {
+            const selector = selectors[i];
+            let elements = [];
+            try {
+                if (selector.startsWith('//')) {
+                    const result = document.evaluate(selector, document, null,
+                        XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+                    for (let j = 0; j < result.snapshotLength; j++) elements.push(result.snapshotItem(j));
+                } else {
+                    elements = Array.from(document.querySelectorAll(selector));
+                }
+            } catch (e) {
+                diagnostics.push({selector: selector, error: 'invalid'});
+                continue;
+            }
+            let shown = 0;
+            for (const el of elements) {
+                if (!visible(el)) continue;
+                shown++;
+                if (el.disabled) continue;
+                const text = (el.innerText || el.getAttribute('aria-label') || el.getAttribute('title') || '').trim();
+                diagnostics.push({selector: selector, matched: elements.length, visible: shown});
+                return {index: i, element: el, text: text.slice(0, 80), diagnostics: diagnostics};
+            }
+            diagnostics.push({selector: selector, matched: elements.length, visible: shown});
+        }
+        return {index: -1, element: null, text: '', diagnostics: diagnostics};
+    """
+    
+    def _find_visible(self, selectors):
+        """
+        Sucht das erste sichtbare und aktive Element aus einer Selektor-Liste
+        
+        Alle Selektoren werden in einem einzigen execute_script-Aufruf im Browser
+        ausgewertet statt mit einem WebDriver-Roundtrip je Selektor und Element.
+        Text und Diagnose (Treffer/sichtbar/ungültig je Selektor) des letzten
+        Aufrufs stehen in self.last_resolution.
+        
+        Args:
+            selectors: CSS-Selektoren oder XPath-Ausdrücke (beginnend mit //)
+            
+        Returns:
+            tuple: (index, selector, element) oder None
+        """
+        try:
+            result = self.driver.execute_script(self._RESOLVE_SCRIPT, list(selectors))
+        except Exception as e:
+            logger.debug(f"Selektor-Auflösung fehlgeschlagen: {str(e)[:100]}")
+            return None
+        
+        self.last_resolution = result
+        if not result or result['element'] is None:
+            return None
+        i = result['index']
+        return i + 1, selectors[i], result['element']
+    
+    def _log_resolution(self):
+        """Protokolliert die Diagnose der letzten Selektor-Suche (Treffer je Selektor)"""
+        if not self.last_resolution:
+            return
+        for entry in self.last_resolution['diagnostics']:
+            if entry.get('error'):
+                logger.info(f"  {entry['selector'][:70]}: ungültiger Selektor")
+            elif entry.get('matched'):
+                logger.info(f"  {entry['selector'][:70]}: {entry['matched']} Treffer, {entry['visible']} sichtbar")
+    
+    def _wait_until(self, step, condition, poll=0.25):
+        """
+        Wartet bis condition(driver) einen wahren Wert liefert
+        
+        Args:
+            step: Name des Schritts (bestimmt das Timeout aus self.timeouts)
+            condition: Funktion driver -> Ergebnis oder False
+            poll: Prüfintervall in Sekunden
+            
+        Returns:
+            Ergebnis der Bedingung oder None bei Timeout
+        """
+        started = time.monotonic()
+        try:
+            return WebDriverWait(
+                self.driver,
+                self.timeouts[step],
+                poll_frequency=poll,
+                ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+            ).until(condition)
+        except TimeoutException:
+            logger.warning(f"⏱️ Timeout nach {self.timeouts[step]} s bei Schritt '{step}'")
+            return None
+        finally:
+            self.step_times[step] = time.monotonic() - started
+            logger.info(f"  ⏱️ {step}: {self.step_times[step]:.2f} s")
+    
+    def _wait_for_any(self, step, selectors):
+        """Wartet bis eines der Elemente sichtbar und klickbar ist"""
+        return self._wait_until(step, lambda d: self._find_visible(selectors) or False)
+    
+    def _login_form_visible(self):
+        """True wenn ein sichtbares Passwortfeld auf der Seite ist (= nicht angemeldet)"""
+        return self._find_visible(["input[type='password']"]) is not None
+    
+    def is_healthy(self):
+        """
+        Prüft ob der Browser noch reagiert
+        
+        Returns:
+            bool: True wenn der Tab antwortet
+        """
+        if not self.driver:
+            return False
+        try:
+            self.driver.execute_script("return document.readyState")
+            return True
+        except Exception as e:
+            logger.warning(f"Browser reagiert nicht mehr: {str(e)[:100]}")
+            return False
+    
+    def ensure_session(self):
+        """
+        Stellt einen laufenden, angemeldeten Browser sicher
+        
+        Ein vorhandener Browser wird weiterverwendet, solange er reagiert,
+        angemeldet ist und max_driver_age nicht überschritten hat. Sonst wird
+        er neu gestartet bzw. neu angemeldet.
+        
+        Returns:
+            bool: True wenn eine angemeldete Sitzung bereitsteht
+        """
+        if self.driver and self.max_driver_age and time.monotonic() - self.driver_started_at > self.max_driver_age:
+            logger.info("♻️ Browser hat maximales Alter erreicht - starte neu")
+            self.close()
+        
+        if self.driver and not self.is_healthy():
+            self.close()
+        
+        if self.driver and self.logged_in:
+            try:
+                if not self._login_form_visible():
+                    logger.info("✓ Bestehende Browser-Sitzung wird weiterverwendet")
+                    return True
+            except Exception:
+                pass
+            logger.info("🔑 Sitzung abgelaufen - melde neu an...")
+            self.logged_in = False
+        
+        return self.login()
+    
+    # Liest localStorage und sessionStorage in einem Aufruf aus
+    _STORAGE_SCRIPT = """
+        const out = {};
+        for (const store of [window.localStorage, window.sessionStorage]) {
+            for (let i = 0; i < store.length; i++) {
+                const key = store.key(i);
+                out[key] = store.getItem(key);
+            }
+        }
+        return out;
+    """
+    
+    @staticmethod
+    def _find_bearer_token(storage):
+        """
+        Sucht ein Bearer-Token in den Web-Storage-Einträgen des Portals
+        
+        Einträge können das Token direkt oder als JSON-Objekt
+        (z.B. {"access_token": ...}) enthalten. JWTs werden auch unter
+        unbekannten Schlüsseln erkannt.
+        """
+        jwt = re.compile(r'^[\w-]+\.[\w-]+\.[\w-]+$')
+        token_fields = ('access_token', 'accessToken', 'token', 'authToken', 'id_token')
+        
+        candidates = []
+        for key, value in storage.items():
+            if not value:
+                continue
+            try:
+                parsed = json.loads(value)
+            except (TypeError, ValueError):
+                parsed = value
+            embedded = isinstance(parsed, dict)
+            if embedded:
+                parsed = next((parsed[f] for f in token_fields if isinstance(parsed.get(f), str)), None)
+            if not isinstance(parsed, str):
+                continue
+            
+            name = key.lower()
+            if embedded or 'token' in name or 'auth' in name or jwt.match(parsed):
+                # 'access' im Schlüssel vor allem anderen, Refresh-Tokens zuletzt
+                rank = 0 if 'access' in name else 2 if 'refresh' in name else 1
+                candidates.append((rank, parsed))
+        
+        return min(candidates)[1] if candidates else None
+    
+    def export_session(self):
+        """
+        Liest die angemeldete Sitzung aus dem Browser aus
+        
+        Returns:
+            dict: {'cookies': [...], 'token': Bearer-Token oder None, 'user_agent': ...}
+                  oder None wenn kein Browser läuft
+        """
+        if not self.driver:
+            return None
+        try:
+            storage = self.driver.execute_script(self._STORAGE_SCRIPT) or {}
+        except Exception as e:
+            logger.debug(f"Web-Storage nicht lesbar: {e}")
+            storage = {}
+        return {
+            'cookies': self.driver.get_cookies(),
+            'token': self._find_bearer_token(storage),
+            'user_agent': self.driver.execute_script("return navigator.userAgent"),
+        }
+    
+    def to_requests_session(self, session=None):
+        """
+        Überträgt Cookies und Token der Browser-Sitzung in eine requests.Session
+        
+        Danach kann der Browser sofort geschlossen werden, der Export läuft
+        über einfache HTTP-Anfragen (siehe SmartMeterDownloader.login_via_browser).
+        
+        Args:
+            session: Vorhandene Session (optional, sonst wird eine neue erzeugt)
+            
+        Returns:
+            requests.Session oder None wenn keine Sitzung vorhanden ist
+        """
+        import requests
+        
+        state = self.export_session()
+        if not state:
+            return None
+        
+        session = session or requests.Session()
+        for cookie in state['cookies']:
+            session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/'),
+                secure=cookie.get('secure', False)
+            )
+        # Manche Portale binden die Sitzung an den User-Agent
+        if state['user_agent']:
+            session.headers['User-Agent'] = state['user_agent']
+        if state['token']:
+            session.headers.update({
+                'Authorization': f"Bearer {state['token']}",
+                'X-Auth-Token': state['token']
+            })
+        
+        logger.info(f"✓ Sitzung übertragen: {len(state['cookies'])} Cookie(s)"
+                    f"{', Bearer-Token' if state['token'] else ''}")
+        return session
+    
+    def network_log(self):
+        """
+        Liefert die seit dem letzten Aufruf mitgeschnittenen DevTools-Ereignisse
+        
+        Returns:
+            list: Einträge von driver.get_log('performance') (leer ohne capture_network)
+        """
+        if not self.driver or not self.capture_network:
+            return []
+        try:
+            return self.driver.get_log("performance")
+        except Exception as e:
+            logger.warning(f"Netzwerk-Mitschnitt nicht verfügbar: {str(e)[:100]}")
+            return []
+    
+    def _click(self, element):
+        """Scrollt zum Element und klickt es (Fallback: JavaScript-Klick)"""
+        self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
+        try:
+            element.click()
+        except Exception:
+            self.driver.execute_script("arguments[0].click();", element)
+    
     def login(self):
         """
         Meldet sich auf dem Smart Meter Portal an
@@ -90,10 +1325,7 @@ class SmartMeterSeleniumDownloader:
                     return False
             
             logger.info("Öffne Smart Meter Portal...")
-            self.driver.get("https://smartmeter.netzburgenland.at/enview/enView.Portal/")
-            
-            # Warte bis Seite geladen ist
-            time.sleep(3)
+            self.driver.get(self.portal_url)
             
             logger.info("Suche Login-Formular...")
             
@@ -116,48 +1348,58 @@ class SmartMeterSeleniumDownloader:
                 "input[placeholder*='Passwort' i]"
             ]
             
+            username_selectors = self.selector_stats.rank('username', username_selectors)
+            password_selectors = self.selector_stats.rank('password', password_selectors)
+            
             username_field = None
             password_field = None
             
-            # Versuche Username-Feld zu finden
-            for selector in username_selectors:
-                try:
-                    username_field = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    logger.info(f"  ✓ Username-Feld gefunden: {selector}")
-                    break
-                except:
-                    continue
+            def form_or_dashboard(driver):
+                # Login-Formular - oder direkt das Dashboard, wenn die Sitzung aus dem Profil noch gilt
+                found = self._find_visible(username_selectors)
+                if found:
+                    return found
+                if (driver.find_elements(By.CSS_SELECTOR, ", ".join(self.DASHBOARD_SELECTORS))
+                        and not self._login_form_visible()):
+                    return 'dashboard'
+                return False
+            
+            # Warte bis eines der Username-Felder erscheint (alle Selektoren pro Durchlauf)
+            found = self._wait_until('login_form', form_or_dashboard)
+            if found == 'dashboard':
+                logger.info("✓ Bereits angemeldet (Sitzung aus dem Browser-Profil) - Login übersprungen")
+                self.logged_in = True
+                return True
+            if found:
+                _, selector, username_field = found
+                logger.info(f"  ✓ Username-Feld gefunden: {selector}")
+            self.selector_stats.record('username', username_selectors, found and found[1])
             
             if not username_field:
                 logger.error("✗ Username-Feld nicht gefunden")
-                self._save_debug_screenshot("login_page")
+                self._log_resolution()
+                self._save_debug_screenshot("login_page", failure=True)
                 return False
             
             # Versuche Password-Feld zu finden
-            for selector in password_selectors:
-                try:
-                    password_field = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    logger.info(f"  ✓ Password-Feld gefunden: {selector}")
-                    break
-                except:
-                    continue
+            found = self._find_visible(password_selectors)
+            if found:
+                _, selector, password_field = found
+                logger.info(f"  ✓ Password-Feld gefunden: {selector}")
+            self.selector_stats.record('password', password_selectors, found and found[1])
             
             if not password_field:
                 logger.error("✗ Password-Feld nicht gefunden")
-                self._save_debug_screenshot("login_page")
+                self._save_debug_screenshot("login_page", failure=True)
                 return False
             
             # Gib Zugangsdaten ein
             logger.info("Gebe Zugangsdaten ein...")
             username_field.clear()
             username_field.send_keys(self.username)
-            time.sleep(0.5)
             
             password_field.clear()
             password_field.send_keys(self.password)
-            time.sleep(0.5)
             
             # Suche und klicke Login-Button
             login_button_selectors = [
@@ -170,14 +1412,16 @@ class SmartMeterSeleniumDownloader:
                 "a[class*='login' i]"
             ]
             
+            login_button_selectors = self.selector_stats.rank('login_button', login_button_selectors)
+            
             login_button = None
-            for selector in login_button_selectors:
-                try:
-                    login_button = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    logger.info(f"  ✓ Login-Button gefunden: {selector}")
-                    break
-                except:
-                    continue
+            found = self._find_visible(login_button_selectors)
+            if found:
+                _, selector, login_button = found
+                logger.info(f"  ✓ Login-Button gefunden: {selector}")
+            self.selector_stats.record('login_button', login_button_selectors, found and found[1])
+            
+            login_url = self.driver.current_url
             
             if not login_button:
                 # Versuche Enter zu drücken
@@ -188,26 +1432,36 @@ class SmartMeterSeleniumDownloader:
                 logger.info("Klicke Login-Button...")
                 login_button.click()
             
+            error_indicators = [
+                "//div[contains(@class, 'error')]",
+                "//span[contains(@class, 'error')]",
+                "//div[contains(@class, 'alert')]",
+                "//p[contains(@class, 'error')]",
+                "//*[contains(text(), 'ungültig')]",
+                "//*[contains(text(), 'falsch')]",
+                "//*[contains(text(), 'incorrect')]",
+                "//*[contains(text(), 'invalid')]",
+                "//mat-error",
+                "//div[@role='alert']"
+            ]
+            def login_settled(driver):
+                # URL-Wechsel, Dashboard-Element oder sichtbare Fehlermeldung
+                if driver.current_url != login_url:
+                    return 'url'
+                if driver.find_elements(By.CSS_SELECTOR, ", ".join(self.DASHBOARD_SELECTORS)):
+                    return 'dashboard'
+                for error in driver.find_elements(By.XPATH, " | ".join(error_indicators)):
+                    if error.is_displayed() and error.text.strip():
+                        return 'error'
+                return False
+            
             # Warte auf erfolgreichen Login
             logger.info("Warte auf Login-Bestätigung...")
-            time.sleep(5)
+            self._wait_until('login_result', login_settled)
             
             # Prüfe auf Fehlermeldungen ZUERST
             error_found = False
             try:
-                error_indicators = [
-                    "//div[contains(@class, 'error')]",
-                    "//span[contains(@class, 'error')]",
-                    "//div[contains(@class, 'alert')]",
-                    "//p[contains(@class, 'error')]",
-                    "//*[contains(text(), 'ungültig')]",
-                    "//*[contains(text(), 'falsch')]",
-                    "//*[contains(text(), 'incorrect')]",
-                    "//*[contains(text(), 'invalid')]",
-                    "//mat-error",
-                    "//div[@role='alert']"
-                ]
-                
                 for xpath in error_indicators:
                     try:
                         errors = self.driver.find_elements(By.XPATH, xpath)
@@ -221,7 +1475,7 @@ class SmartMeterSeleniumDownloader:
                 pass
             
             if error_found:
-                self._save_debug_screenshot("login_error_message")
+                self._save_debug_screenshot("login_error_message", failure=True)
                 logger.error("✗ Login mit Fehlermeldung abgelehnt")
                 logger.info("Mögliche Gründe:")
                 logger.info("  - Falsche Zugangsdaten")
@@ -236,6 +1490,7 @@ class SmartMeterSeleniumDownloader:
             # Verschiedene Erfolgskriterien
             if 'login' not in current_url.lower():
                 logger.info("✓ Login erfolgreich (nicht mehr auf Login-Seite)")
+                self.logged_in = True
                 return True
             
             # Suche nach Logout-Button oder Dashboard-Elementen
@@ -252,6 +1507,7 @@ class SmartMeterSeleniumDownloader:
                     try:
                         element = self.driver.find_element(By.CSS_SELECTOR, selector)
                         logger.info(f"✓ Login erfolgreich (Dashboard-Element gefunden: {selector})")
+                        self.logged_in = True
                         return True
                     except:
                         continue
@@ -278,290 +1534,550 @@ class SmartMeterSeleniumDownloader:
                 pass
             
             logger.error("✗ Login fehlgeschlagen")
-            self._save_debug_screenshot("login_failed")
+            self._save_debug_screenshot("login_failed", failure=True)
             return False
             
         except Exception as e:
             logger.error(f"Fehler beim Login: {e}")
             import traceback
             logger.error(traceback.format_exc())
-            self._save_debug_screenshot("login_exception")
+            self._save_debug_screenshot("login_exception", failure=True)
             return False
     
-    def _save_debug_screenshot(self, name):
-        """Speichert einen Screenshot für Debugging"""
+    def _browser_context_id(self):
+        """browserContextId des aktuellen Tabs oder None"""
         try:
-            screenshot_path = self.download_dir / f"debug_{name}_{int(time.time())}.png"
-            self.driver.save_screenshot(str(screenshot_path))
-            logger.info(f"Screenshot gespeichert: {screenshot_path}")
-        except:
-            pass
+            info = self.driver.execute_cdp_cmd("Target.getTargetInfo", {})
+            return info['targetInfo'].get('browserContextId')
+        except Exception as e:
+            logger.debug(f"Browser-Kontext nicht ermittelbar: {str(e)[:80]}")
+            return None
+    
+    def _set_download_dir(self, path, context=None):
+        """Leitet Downloads nach path um - browserweit oder nur für einen Browser-Kontext"""
+        params = {
+            "behavior": "allow",
+            "downloadPath": str(Path(path).absolute()),
+            "eventsEnabled": False
+        }
+        if context:
+            params["browserContextId"] = context
+        self.driver.execute_cdp_cmd("Browser.setDownloadBehavior", params)
     
-    def download_csv(self, days_back=7):
+    def _new_run_dir(self, context=None):
         """
-        Navigiert zur Download-Seite und lädt CSV herunter
+        Legt einen eigenen Download-Ordner für diesen Lauf an und leitet Chrome dorthin um
+        
+        Der Ordner liegt unter download_dir/.runs/, also auf demselben Dateisystem
+        wie das Archiv - das spätere Verschieben ist damit atomar.
         
         Args:
-            days_back: Anzahl Tage zurück
+            context: browserContextId, um nur die Tabs dieses Kontexts umzuleiten
+                     (None = alle Tabs)
+        
+        Returns:
+            Path: Lauf-Ordner oder None, wenn Chrome nicht umgeleitet werden konnte
+        """
+        runs = self.download_dir / ".runs"
+        runs.mkdir(parents=True, exist_ok=True)
+        run_dir = Path(tempfile.mkdtemp(prefix="run_", dir=runs))
+        try:
+            self._set_download_dir(run_dir, context)
+            return run_dir
+        except Exception as e:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            # Nicht auf einem alten (evtl. gelöschten) Lauf-Ordner stehen bleiben
+            try:
+                self._set_download_dir(self.download_dir, context)
+            except Exception as reset_error:
+                raise Exception(f"Download-Ordner lässt sich nicht setzen: {str(reset_error)[:80]}") from e
+            logger.warning(f"Eigener Download-Ordner nicht möglich ({str(e)[:80]}) - verwende {self.download_dir}")
+            return None
+    
+    def _chart_url(self):
+        """Adresse der Chart-Seite (der Zeitraum wird per _select_range eingestellt)"""
+        return f"{self.portal_url}{self.CHART_ROUTE}"
+    
+    def _archive(self, path):
+        """Verschiebt eine fertige Datei atomar ins Archiv (siehe archive_file)"""
+        return archive_file(path, self.download_dir)
+    
+    def _save_debug_screenshot(self, name, failure=False):
+        """
+        Speichert je nach Einstellung einen Screenshot oder DOM-Snapshot für Debugging
+        
+        Im Browser wird nur der Inhalt abgeholt, Dekodieren und Schreiben laufen
+        im Hintergrund. Es bleiben höchstens max_screenshots Dateien liegen.
+        
+        Args:
+            name: Bezeichnung des Zustands (Teil des Dateinamens)
+            failure: True wenn die Aufnahme einen Fehler dokumentiert
+        """
+        if self.screenshots == 'off' or (self.screenshots == 'on_failure' and not failure):
+            return
+        try:
+            if self.snapshot_format == 'html':
+                content = self.driver.page_source
+            else:
+                content = self.driver.get_screenshot_as_base64()
+        except Exception:
+            return
+        
+        # Zeitstempel + laufende Nummer: Dateinamen sortieren in Aufnahme-Reihenfolge
+        self._snapshot_seq += 1
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        path = self.debug_dir / f"debug_{stamp}_{self._snapshot_seq:04d}_{name}.{self.snapshot_format}"
+        if self._snapshot_writer is None:
+            self._snapshot_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+        self._snapshot_writer.submit(self._write_snapshot, path, content)
+    
+    def _write_snapshot(self, path, content):
+        """Schreibt eine Aufnahme und löscht die ältesten über max_screenshots (läuft im Hintergrund)"""
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.suffix == '.png':
+                path.write_bytes(base64.b64decode(content))
+            else:
+                path.write_text(content, encoding='utf-8')
+            logger.info(f"Screenshot gespeichert: {path}")
             
+            snapshots = sorted(path.parent.glob("debug_*"))
+            for old in snapshots[:max(len(snapshots) - self.max_screenshots, 0)]:
+                old.unlink(missing_ok=True)
+        except Exception as e:
+            logger.debug(f"Screenshot konnte nicht gespeichert werden: {e}")
+    
+    # Setzt Von/Bis in den Datumsfeldern der Chart-Seite. Die Werte werden über den
+    # nativen Setter geschrieben und input/change ausgelöst, damit Angular sie übernimmt.
+    _RANGE_SCRIPT = """
+        const [start, end] = arguments;
+        const selector = [
+            "input[type='date']", "input[matstartdate]", "input[matenddate]",
+            "mat-date-range-input input", "input[formcontrolname*='from' i]",
+            "input[formcontrolname*='start' i]", "input[formcontrolname*='until' i]",
+            "input[formcontrolname*='end' i]", "input[formcontrolname$='to' i]",
+            "input[placeholder*='TT.MM' i]", "input[placeholder*='dd.mm' i]"
+        ].join(', ');
+        const inputs = Array.from(document.querySelectorAll(selector))
+            .filter(el => !el.disabled && el.getClientRects().length > 0);
+        if (inputs.length < 2) {
+            return null;
+        }
+        const [from, to] = inputs;
+        const format = (el, iso) => el.type === 'date' ? iso : iso.split('-').reverse().join('.');
+        const wanted = [format(from, start), format(to, end)];
+        if (from.value === wanted[0] && to.value === wanted[1]) {
+            return ['preset', from.value, to.value];
+        }
+        const setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+        [[from, wanted[0]], [to, wanted[1]]].forEach(([el, value]) => {
+            el.focus();
+            setter.call(el, value);
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            el.dispatchEvent(new KeyboardEvent('keydown', {key: 'Enter', bubbles: true}));
+            el.blur();
+        });
+        return ['picker', from.value, to.value];
+    """
+    
+    def _select_range(self, start, end):
+        """
+        Stellt den Zeitraum auf der Chart-Seite ein
+        
+        Die Datumsfelder werden direkt ausgefüllt, außer sie zeigen den Zeitraum bereits.
+        
         Returns:
-            str: Pfad zur heruntergeladenen Datei oder None
+            str: 'preset', 'picker' oder None wenn keine Datumsfelder gefunden wurden
         """
         try:
-            logger.info("Navigiere zu Verbrauchsdaten...")
+            result = self.driver.execute_script(self._RANGE_SCRIPT, f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}")
+        except Exception as e:
+            logger.warning(f"Zeitraum konnte nicht eingestellt werden: {str(e)[:80]}")
+            return None
+        if not result:
+            logger.warning("⚠️ Keine Datumsfelder gefunden - Export enthält den Zeitraum der Seite")
+            return None
+        mode, shown_from, shown_to = result
+        source = "bereits eingestellt" if mode == 'preset' else "im Datumsfeld gesetzt"
+        logger.info(f"📅 Zeitraum {shown_from} - {shown_to} {source}")
+        return mode
+    
+    def _fit_range(self, filepath, start, end):
+        """Gleicht den Export mit dem angeforderten Zeitraum ab (siehe fit_to_range), Ergebnis in self.last_range"""
+        self.last_range = fit_to_range(filepath, start, end)
+        return self.last_range
+    
+    def _export_from_chart(self, chart_url, period=None):
+        """
+        Klickt auf der geladenen Chart-Seite Export und im Dialog Speichern
+        
+        Args:
+            chart_url: Adresse der Chart-Seite (für die erneute Navigation nach einem Re-Login)
+            period: (start, end) - wird vor dem Export in den Datumsfeldern eingestellt
             
-            # Navigiere direkt zur Chart-Seite mit dem Export-Button
-            chart_url = "https://smartmeter.netzburgenland.at/enview/enView.Portal/#/consumption/values/chart/month"
-            logger.info(f"Navigiere zu: {chart_url}")
-            self.driver.get(chart_url)
+        Returns:
+            bool: True wenn Export und Speichern geklickt wurden, sonst False
+                  (dann kommt keine Datei - der Aufrufer wartet nicht darauf)
+        """
+        # Erweiterte Suche nach Export/Download-Buttons mit XPath und CSS
+        download_selectors = [
+            # WICHTIG: Der spezifische Export-Button des Portals
+            ".btn-export",
+            "button.btn-export",
+            "[class*='btn-export']",
+            "//button[contains(@class, 'btn-export')]",
+            "//*[contains(@class, 'btn-export')]",
             
-            # Warte auf Seiten-Inhalte
-            time.sleep(5)
+            # Text-basierte XPath (sehr zuverlässig)
+            "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'export')]",
+            "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'download')]",
+            "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'export')]",
+            "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'download')]",
+            "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'csv')]",
+            "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'csv')]",
+            "//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'export')]/..",
+            "//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'download')]/..",
             
-            # Screenshot nach Navigation
-            self._save_debug_screenshot("chart_page_loaded")
+            # Aria-labels und Titles
+            "//button[@aria-label='Export']",
+            "//button[@aria-label='Download']",
+            "//button[@title='Export']",
+            "//button[@title='Download']",
+            "//*[@aria-label='Export']",
+            "//*[@aria-label='Download']",
             
-            # Screenshot der aktuellen Seite
-            self._save_debug_screenshot("current_page")
+            # Material Design Icons
+            "//mat-icon[contains(text(), 'download')]/..",
+            "//mat-icon[contains(text(), 'file_download')]/..",
+            "//mat-icon[contains(text(), 'cloud_download')]/..",
+            "//mat-icon[contains(text(), 'save_alt')]/..",
+            "//i[contains(@class, 'download')]/..",
             
-            # Zähle Dateien vor dem Download
-            existing_files = set(self.download_dir.glob("*.csv"))
-            logger.info(f"Aktuell {len(existing_files)} CSV-Dateien im Download-Ordner")
+            # CSS Selektoren
+            "button[class*='export' i]",
+            "button[class*='download' i]",
+            "a[class*='export' i]",
+            "a[class*='download' i]",
+            "button[id*='export' i]",
+            "button[id*='download' i]",
             
-            # Erweiterte Suche nach Export/Download-Buttons mit XPath und CSS
-            download_selectors = [
-                # WICHTIG: Der spezifische Export-Button des Portals
-                ".btn-export",
-                "button.btn-export",
-                "[class*='btn-export']",
-                "//button[contains(@class, 'btn-export')]",
-                "//*[contains(@class, 'btn-export')]",
-                
-                # Text-basierte XPath (sehr zuverlässig)
-                "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'export')]",
-                "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'download')]",
-                "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'export')]",
-                "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'download')]",
-                "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'csv')]",
-                "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'csv')]",
-                "//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'export')]/..",
-                "//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'download')]/..",
-                
-                # Aria-labels und Titles
-                "//button[@aria-label='Export']",
-                "//button[@aria-label='Download']",
-                "//button[@title='Export']",
-                "//button[@title='Download']",
-                "//*[@aria-label='Export']",
-                "//*[@aria-label='Download']",
-                
-                # Material Design Icons
-                "//mat-icon[contains(text(), 'download')]/..",
-                "//mat-icon[contains(text(), 'file_download')]/..",
-                "//mat-icon[contains(text(), 'cloud_download')]/..",
-                "//mat-icon[contains(text(), 'save_alt')]/..",
-                "//i[contains(@class, 'download')]/..",
-                
-                # CSS Selektoren
-                "button[class*='export' i]",
-                "button[class*='download' i]",
-                "a[class*='export' i]",
-                "a[class*='download' i]",
-                "button[id*='export' i]",
-                "button[id*='download' i]",
-                
-                # Spezifische Angular/Material Buttons
-                "mat-button:has-text('Export')",
-                "mat-raised-button:has-text('Export')",
-                "mat-flat-button:has-text('Export')",
-                "button[mat-button]:has-text('Export')",
-                "button[mat-raised-button]:has-text('Export')"
-            ]
+            # Spezifische Angular/Material Buttons
+            "mat-button:has-text('Export')",
+            "mat-raised-button:has-text('Export')",
+            "mat-flat-button:has-text('Export')",
+            "button[mat-button]:has-text('Export')",
+            "button[mat-raised-button]:has-text('Export')"
+        ]
+        
+        download_selectors = self.selector_stats.rank('download', download_selectors)
+        logger.info(f"Suche Download-Button mit {len(download_selectors)} verschiedenen Selektoren...")
+        
+        def chart_ready(driver):
+            # Export-Button klickbar - oder Login-Formular, wenn die Sitzung abgelaufen ist
+            found = self._find_visible(download_selectors)
+            if found:
+                return found
+            if self._login_form_visible():
+                return 'login'
+            return False
+        
+        # Warte bis der Export-Button sichtbar und klickbar ist
+        download_clicked = False
+        found = self._wait_until('chart_page', chart_ready)
+        
+        if found == 'login':
+            logger.info("🔑 Sitzung abgelaufen - melde neu an...")
+            self.logged_in = False
+            if not self.login():
+                return False
+            self.driver.get(chart_url)
+            found = self._wait_for_any('chart_page', download_selectors)
+        self.selector_stats.record('download', download_selectors, found and found[1])
+        
+        # Zeitraum einstellen; nach dem Ausfüllen wird die Seite neu gezeichnet
+        if found and period and self._select_range(*period) == 'picker':
+            found = self._wait_for_any('chart_page', download_selectors)
+        
+        # Screenshot nach Navigation
+        self._save_debug_screenshot("chart_page_loaded")
+        
+        if found:
+            i, selector, element = found
+            element_text = self.last_resolution['text']
+            logger.info(f"✓ Download-Element gefunden (#{i}): {selector}")
+            logger.info(f"  Text: '{element_text}'")
             
-            logger.info(f"Suche Download-Button mit {len(download_selectors)} verschiedenen Selektoren...")
+            self._click(element)
+            download_clicked = True
+            logger.info("✓ Download-Button geklickt!")
+        
+        if not download_clicked:
+            logger.warning("⚠️ Kein Download-Button gefunden")
+            self._log_resolution()
+            logger.info("Speichere Screenshot für manuelle Analyse...")
+            self._save_debug_screenshot("no_download_button_found", failure=True)
             
-            download_clicked = False
-            for i, selector in enumerate(download_selectors, 1):
-                try:
-                    if selector.startswith("//"):
-                        elements = self.driver.find_elements(By.XPATH, selector)
-                    else:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    
-                    for element in elements:
-                        try:
-                            if element.is_displayed() and element.is_enabled():
-                                element_text = element.text or element.get_attribute('aria-label') or element.get_attribute('title') or ''
-                                logger.info(f"✓ Download-Element gefunden (#{i}): {selector}")
-                                logger.info(f"  Text: '{element_text}'")
-                                
-                                # Scrolle zum Element
-                                self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                                time.sleep(0.5)
-                                
-                                # Versuche zu klicken
-                                try:
-                                    element.click()
-                                except:
-                                    # Fallback: JavaScript Click
-                                    self.driver.execute_script("arguments[0].click();", element)
-                                
-                                download_clicked = True
-                                logger.info("✓ Download-Button geklickt!")
-                                time.sleep(3)
-                                break
-                        except Exception as e:
-                            continue
-                    
-                    if download_clicked:
-                        break
-                        
-                except Exception as e:
-                    continue
+            # Zeige alle sichtbaren Buttons für Debugging
+            try:
+                all_buttons = self.driver.find_elements(By.TAG_NAME, "button")
+                visible_buttons = [btn for btn in all_buttons if btn.is_displayed()]
+                logger.info(f"Gefundene Buttons auf der Seite: {len(visible_buttons)}")
+                for idx, btn in enumerate(visible_buttons[:10], 1):  # Erste 10 Buttons
+                    btn_text = btn.text or btn.get_attribute('aria-label') or btn.get_attribute('class') or 'kein Text'
+                    logger.info(f"  Button {idx}: {btn_text[:50]}")
+            except:
+                pass
             
-            if not download_clicked:
-                logger.warning("⚠️ Kein Download-Button gefunden")
-                logger.info("Speichere Screenshot für manuelle Analyse...")
-                self._save_debug_screenshot("no_download_button_found")
-                
-                # Zeige alle sichtbaren Buttons für Debugging
-                try:
-                    all_buttons = self.driver.find_elements(By.TAG_NAME, "button")
-                    visible_buttons = [btn for btn in all_buttons if btn.is_displayed()]
-                    logger.info(f"Gefundene Buttons auf der Seite: {len(visible_buttons)}")
-                    for idx, btn in enumerate(visible_buttons[:10], 1):  # Erste 10 Buttons
-                        btn_text = btn.text or btn.get_attribute('aria-label') or btn.get_attribute('class') or 'kein Text'
-                        logger.info(f"  Button {idx}: {btn_text[:50]}")
-                except:
-                    pass
-                
-                return None
+            return False
+        
+        # Export-Button wurde geklickt - jetzt auf Auswahlfenster warten
+        logger.info("✓ Export-Button geklickt, warte auf Auswahlfenster...")
+        
+        # Suche nach dem "Speichern" Button im Dialog
+        save_button_selectors = [
+            # Span mit "Speichern" Text
+            "//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]/..",
+            "//span[text()='Speichern']/..",
+            "//span[text()='speichern']/..",
+            "//button[.//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]]",
+            "//button[.//span[text()='Speichern']]",
+            "//button[.//span[text()='speichern']]",
             
-            # Export-Button wurde geklickt - jetzt auf Auswahlfenster warten
-            logger.info("✓ Export-Button geklickt, warte auf Auswahlfenster...")
-            time.sleep(3)
-            
-            self._save_debug_screenshot("after_export_click")
-            
-            # Suche nach dem "Speichern" Button im Dialog
-            save_button_selectors = [
-                # Span mit "Speichern" Text
-                "//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]/..",
-                "//span[text()='Speichern']/..",
-                "//span[text()='speichern']/..",
-                "//button[.//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]]",
-                "//button[.//span[text()='Speichern']]",
-                "//button[.//span[text()='speichern']]",
-                
-                # Direkter Button mit Speichern
-                "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]",
-                "//button[text()='Speichern']",
-                
-                # Im Dialog-Container
-                "//mat-dialog-actions//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]/..",
-                "//mat-dialog-container//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]/..",
-                "//*[@role='dialog']//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]/..",
-                
-                # CSS Selektoren
-                "button span:contains('Speichern')",
-                "button span:contains('speichern')"
-            ]
+            # Direkter Button mit Speichern
+            "//button[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]",
+            "//button[text()='Speichern']",
             
-            button_clicked = False
-            for i, selector in enumerate(save_button_selectors, 1):
-                try:
-                    if selector.startswith("//"):
-                        elements = self.driver.find_elements(By.XPATH, selector)
-                    else:
-                        elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    
-                    # Nimm den ersten sichtbaren und enabled Button
-                    for element in elements:
-                        try:
-                            if element.is_displayed() and element.is_enabled():
-                                element_text = element.text or element.get_attribute('aria-label') or element.get_attribute('class') or ''
-                                logger.info(f"✓ Speichern-Button gefunden (#{i}): {selector}")
-                                logger.info(f"  Text: '{element_text}'")
-                                
-                                # Scrolle zum Element
-                                self.driver.execute_script("arguments[0].scrollIntoView(true);", element)
-                                time.sleep(0.5)
-                                
-                                # Klicke auf Button
-                                try:
-                                    element.click()
-                                except:
-                                    self.driver.execute_script("arguments[0].click();", element)
-                                
-                                button_clicked = True
-                                logger.info("✓ Speichern-Button geklickt!")
-                                time.sleep(3)
-                                break
-                        except Exception as e:
-                            continue
-                    
-                    if button_clicked:
-                        break
-                        
-                except Exception as e:
-                    continue
+            # Im Dialog-Container
+            "//mat-dialog-actions//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]/..",
+            "//mat-dialog-container//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]/..",
+            "//*[@role='dialog']//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'speichern')]/..",
             
-            if button_clicked:
-                logger.info("✓ Download gestartet, warte auf Datei...")
-                time.sleep(10)
-            else:
-                logger.warning("⚠️ Speichern-Button nicht gefunden")
-                self._save_debug_screenshot("no_save_button_found")
-                time.sleep(5)
+            # CSS Selektoren
+            "button span:contains('Speichern')",
+            "button span:contains('speichern')"
+        ]
+        
+        # Warte bis der Dialog mit dem Speichern-Button erscheint
+        save_button_selectors = self.selector_stats.rank('save_button', save_button_selectors)
+        button_clicked = False
+        found = self._wait_for_any('export_dialog', save_button_selectors)
+        self.selector_stats.record('save_button', save_button_selectors, found and found[1])
+        self._save_debug_screenshot("after_export_click")
+        if found:
+            i, selector, element = found
+            element_text = self.last_resolution['text']
+            logger.info(f"✓ Speichern-Button gefunden (#{i}): {selector}")
+            logger.info(f"  Text: '{element_text}'")
             
-            # Suche neueste CSV-Datei
-            new_files = set(self.download_dir.glob("*.csv")) - existing_files
+            self._click(element)
+            button_clicked = True
+            logger.info("✓ Speichern-Button geklickt!")
+        
+        if button_clicked:
+            logger.info("✓ Download gestartet, warte auf Datei...")
+        else:
+            logger.warning("⚠️ Speichern-Button nicht gefunden")
+            self._log_resolution()
+            self._save_debug_screenshot("no_save_button_found", failure=True)
+        return button_clicked
+    
+    def download_csv(self, days_back=7, start_date=None, end_date=None):
+        """
+        Navigiert zur Download-Seite und lädt CSV herunter
+        
+        Der Zeitraum wird per URL-Parameter bzw. in den Datumsfeldern der Seite
+        eingestellt. Werte außerhalb werden aus der Datei entfernt, Lücken am
+        Anfang oder Ende gemeldet (siehe last_range).
+        
+        Args:
+            days_back: Anzahl Tage zurück (wenn start_date fehlt)
+            start_date: Startdatum (date/datetime) - Standard: end_date - days_back
+            end_date: Enddatum (date/datetime) - Standard: heute
             
-            if new_files:
-                newest_file = max(new_files, key=lambda p: p.stat().st_mtime)
-                logger.info(f"✓ Neue CSV heruntergeladen: {newest_file.name}")
-                return str(newest_file)
-            else:
-                # Prüfe ob es neue Dateien gibt (auch wenn sie vorher schon da waren)
-                all_files = list(self.download_dir.glob("*.csv"))
-                if all_files:
-                    newest_file = max(all_files, key=lambda p: p.stat().st_mtime)
-                    # Prüfe ob Datei in den letzten 5 Minuten geändert wurde
-                    if time.time() - newest_file.stat().st_mtime < 300:
-                        logger.info(f"✓ CSV-Datei gefunden: {newest_file.name}")
-                        return str(newest_file)
-                
-                # Warte noch etwas länger und versuche nochmal
-                logger.info("Warte weitere 10 Sekunden auf Download...")
-                time.sleep(10)
-                
-                # Nochmal prüfen
-                new_files = set(self.download_dir.glob("*.csv")) - existing_files
-                if new_files:
-                    newest_file = max(new_files, key=lambda p: p.stat().st_mtime)
-                    logger.info(f"✓ Neue CSV heruntergeladen: {newest_file.name}")
-                    return str(newest_file)
-                
-                logger.error("✗ Keine neue CSV-Datei gefunden")
-                logger.info("Mögliche Gründe:")
-                logger.info("  - Download-Button nicht gefunden")
-                logger.info("  - Keine Daten für den gewählten Zeitraum")
-                logger.info("  - Portal-Struktur hat sich geändert")
-                logger.info("Überprüfe den downloads/ Ordner und das debug-Screenshot")
+        Returns:
+            str: Pfad zur heruntergeladenen Datei oder None
+        """
+        watcher = None
+        run_dir = None
+        if end_date is None:
+            end_date = datetime.now()
+        if start_date is None:
+            start_date = end_date - timedelta(days=days_back)
+        period = (start_date, end_date)
+        self.last_range = None
+        try:
+            logger.info(f"Navigiere zu Verbrauchsdaten ({start_date:%d.%m.%Y} - {end_date:%d.%m.%Y})...")
+            
+            # Navigiere direkt zur Chart-Seite mit dem Export-Button
+            chart_url = self._chart_url()
+            logger.info(f"Navigiere zu: {chart_url}")
+            self.driver.get(chart_url)
+            
+            # Eigener Download-Ordner für diesen Lauf, ab jetzt beobachten
+            run_dir = self._new_run_dir()
+            watcher = DownloadWatcher(run_dir or self.download_dir).start()
+            
+            if not self._export_from_chart(chart_url, period):
                 return None
-                
+            
+            # Warte bis eine neue CSV vollständig geschrieben ist
+            started = time.monotonic()
+            finished = watcher.wait(self.timeouts['download'])
+            self.step_times['download'] = time.monotonic() - started
+            logger.info(f"  ⏱️ download: {self.step_times['download']:.2f} s")
+            if finished:
+                if run_dir:
+                    finished = self._archive(finished)
+                logger.info(f"✓ Neue CSV heruntergeladen: {finished.name}")
+                self._fit_range(finished, *period)
+                return str(finished)
+            
+            logger.warning(f"⏱️ Timeout nach {self.timeouts['download']} s bei Schritt 'download'")
+            self._save_debug_screenshot("download_timeout", failure=True)
+            logger.error("✗ Keine neue CSV-Datei gefunden")
+            logger.info("Mögliche Gründe:")
+            logger.info("  - Download-Button nicht gefunden")
+            logger.info("  - Keine Daten für den gewählten Zeitraum")
+            logger.info("  - Portal-Struktur hat sich geändert")
+            logger.info(f"Überprüfe die Aufnahmen in {self.debug_dir}")
+            return None
+            
         except Exception as e:
             logger.error(f"Fehler beim Download: {e}")
             import traceback
             logger.error(traceback.format_exc())
             return None
+        finally:
+            if watcher:
+                watcher.close()
+            if run_dir:
+                shutil.rmtree(run_dir, ignore_errors=True)
+    
+    def download_periods(self, periods, max_tabs=4):
+        """
+        Exportiert mehrere Zeiträume in eigenen Tabs derselben Browser-Sitzung
+        
+        Für Nachlade-Läufe: ein Login und ein Chrome-Prozess für alle Zeiträume.
+        Die Tabs eines Durchgangs laden parallel, Export und Speichern werden
+        nacheinander geklickt, die Downloads laufen dann gleichzeitig in je
+        einen eigenen Ordner.
+        
+        Args:
+            periods: [(start, end), ...] als date/datetime
+            max_tabs: Höchstens so viele Tabs gleichzeitig
+            
+        Returns:
+            dict: {(start, end): Pfad zur CSV oder None}
+        """
+        results = {period: None for period in periods}
+        if not periods or not self.ensure_session():
+            return results
+        
+        main_tab = self.driver.current_window_handle
+        for offset in range(0, len(periods), max_tabs):
+            batch = periods[offset:offset + max_tabs]
+            logger.info(f"🗂️ Exportiere {len(batch)} Zeiträume in eigenen Tabs...")
+            results.update(self._export_tabs(batch, main_tab))
+        
+        done = sum(1 for path in results.values() if path)
+        logger.info(f"✓ {done}/{len(periods)} Zeiträume exportiert")
+        return results
+    
+    def _export_tabs(self, batch, main_tab):
+        """Ein Durchgang von download_periods(): Tabs öffnen, exportieren, auf alle Dateien warten"""
+        tabs = []
+        results = {}
+        # Der Download-Ordner gilt je Browser-Kontext: nur ein Tab pro Kontext bekommt einen eigenen
+        contexts = set()
+        try:
+            # 1. Alle Tabs öffnen und Navigation anstoßen - die Seiten laden parallel
+            for period in batch:
+                self.driver.switch_to.new_window('tab')
+                tab = {'period': period, 'handle': self.driver.current_window_handle,
+                       'url': self._chart_url(), 'exported': False, 'watcher': None,
+                       'run_dir': None}
+                context = self._browser_context_id()
+                if context and context not in contexts:
+                    contexts.add(context)
+                    tab['run_dir'] = self._new_run_dir(context)
+                if tab['run_dir']:
+                    tab['watcher'] = DownloadWatcher(tab['run_dir']).start()
+                self.driver.execute_script("window.location.href = arguments[0];", tab['url'])
+                tabs.append(tab)
+            
+            # 2. Nacheinander Export klicken, die Downloads laufen im Hintergrund weiter
+            for tab in tabs:
+                self.driver.switch_to.window(tab['handle'])
+                logger.info(f"  Tab {tab['period'][0]:%d.%m.%Y} - {tab['period'][1]:%d.%m.%Y}")
+                if tab['watcher'] is None:
+                    # Kein eigener Ordner je Tab möglich: laufende Downloads abwarten,
+                    # dann diesen Tab vollständig abschließen
+                    for other in tabs:
+                        if other['exported'] and other['period'] not in results:
+                            results[other['period']] = self._collect(other, self.timeouts['download'])
+                    tab['run_dir'] = self._new_run_dir()
+                    tab['watcher'] = DownloadWatcher(tab['run_dir'] or self.download_dir).start()
+                    tab['exported'] = self._export_from_chart(tab['url'], tab['period'])
+                    if tab['exported']:
+                        results[tab['period']] = self._collect(tab, self.timeouts['download'])
+                    continue
+                tab['exported'] = self._export_from_chart(tab['url'], tab['period'])
+            
+            # 3. Auf alle noch offenen Downloads warten (gemeinsame Frist)
+            deadline = time.monotonic() + self.timeouts['download']
+            for tab in tabs:
+                if tab['exported'] and tab['period'] not in results:
+                    results[tab['period']] = self._collect(tab, max(deadline - time.monotonic(), 0.5))
+        except Exception as e:
+            logger.error(f"Fehler beim Export in Tabs: {e}")
+        finally:
+            for tab in tabs:
+                if tab['watcher']:
+                    tab['watcher'].close()
+                if tab['run_dir']:
+                    shutil.rmtree(tab['run_dir'], ignore_errors=True)
+                try:
+                    self.driver.switch_to.window(tab['handle'])
+                    self.driver.close()
+                except Exception:
+                    pass
+            try:
+                self.driver.switch_to.window(main_tab)
+            except Exception:
+                pass
+        return results
+    
+    def _collect(self, tab, timeout):
+        """Wartet auf die Datei eines Tabs und verschiebt sie ins Archiv"""
+        finished = tab['watcher'].wait(timeout)
+        if not finished:
+            logger.warning(f"  ✗ Keine Datei für {tab['period'][0]:%d.%m.%Y} - {tab['period'][1]:%d.%m.%Y}")
+            return None
+        if tab['run_dir']:
+            finished = self._archive(finished)
+        logger.info(f"  ✓ {finished.name}")
+        self._fit_range(finished, *tab['period'])
+        return str(finished)
     
     def close(self):
         """Schließt den Browser"""
         if self.driver:
             logger.info("Schließe Browser...")
-            self.driver.quit()
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.warning(f"Browser ließ sich nicht sauber beenden: {str(e)[:100]}")
             self.driver = None
+            self.driver_started_at = None
+        # Auch nach Absturz oder fehlgeschlagenem quit() keine Prozesse zurücklassen
+        self.watchdog.release()
+        if self._profile_lock:
+            self._profile_lock.release()
+        if self._snapshot_writer:
+            self._snapshot_writer.shutdown(wait=True)
+            self._snapshot_writer = None
+        self.logged_in = False
     
     def __enter__(self):
         return self
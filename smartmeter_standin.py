@@ -0,0 +1,435 @@
+"""
+Smart Meter Netz Burgenland - Lokaler Portal-Nachbau
+Bildet Login-Seite, Dashboard, Chart-Seite, Export-Dialog und CSV-Download des
+enView-Portals nach, damit der Browser- und der HTTP-Ablauf ohne das echte Portal
+getestet und gemessen werden können. Antwortzeiten und Fehler sind einstellbar.
+
+Aufruf:
+    python smartmeter_standin.py --port 8765 --latency 0.2 --fail-rate 0.05
+
+Danach z.B.:
+    SmartMeterSeleniumDownloader("demo@example.org", "demo", base_url="http://127.0.0.1:8765")
+"""
+
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+import argparse
+import html
+import logging
+import math
+import random
+import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PORTAL_PATH = "/enview/enView.Portal"
+EXPORT_PATH = f"{PORTAL_PATH}/api/MeteringData/Export"
+SESSION_COOKIE = "ENVIEW_SESSION"
+
+# Schritte, für die Fehler gezielt eingeschaltet werden können (--fail)
+PHASES = ('page', 'login', 'callback', 'export')
+
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html lang="de">
+<head><meta charset="utf-8"><title>enView Portal - Anmeldung</title></head>
+<body>
+  <h1>Smart Meter Portal</h1>
+  {error}
+  <form method="post" action="{action}">
+    <input type="hidden" name="csrf_token" value="{csrf}">
+    <input type="hidden" name="state" value="{state}">
+    <label>Benutzername <input type="email" name="username" id="username" placeholder="E-Mail"></label>
+    <label>Passwort <input type="password" name="password" id="password" placeholder="Passwort"></label>
+    <button type="submit" class="btn-login">Anmelden</button>
+  </form>
+</body>
+</html>
+"""
+
+APP_PAGE = """<!DOCTYPE html>
+<html lang="de">
+<head><meta charset="utf-8"><title>enView Portal</title>
+<style>
+  mat-dialog-container {{ display: block; border: 1px solid #999; padding: 1em; }}
+</style>
+</head>
+<body>
+  <nav><a href="logout">Abmelden</a></nav>
+  <div class="dashboard" id="app"></div>
+  <script>
+    localStorage.setItem('enview.auth', JSON.stringify({{access_token: '{token}'}}));
+    const renderDelay = {render_delay};
+    const app = document.getElementById('app');
+
+    function isoDate(d) {{ return d.toISOString().slice(0, 10); }}
+
+    function route() {{
+      const hash = location.hash || '#/';
+      app.innerHTML = '';
+      if (!hash.startsWith('#/consumption/values/chart')) {{
+        app.innerHTML = '<div class="consumption-overview"><h2>Übersicht</h2>' +
+          '<a href="#/consumption/values/chart/month">Verbrauch</a></div>';
+        return;
+      }}
+      const query = new URLSearchParams(hash.split('?')[1] || '');
+      const today = new Date();
+      const first = new Date(Date.UTC(today.getFullYear(), today.getMonth(), 1));
+      const from = query.get('from') || isoDate(first);
+      const to = query.get('to') || isoDate(today);
+      app.innerHTML = '<p class="loading">Lade Diagramm...</p>';
+      setTimeout(() => {{
+        app.innerHTML =
+          '<div class="consumption-chart">' +
+          '<input type="date" formcontrolname="from" value="' + from + '">' +
+          '<input type="date" formcontrolname="to" value="' + to + '">' +
+          '<button class="btn-export">Export</button></div>';
+        app.querySelector('.btn-export').addEventListener('click', openDialog);
+      }}, renderDelay);
+    }}
+
+    function openDialog() {{
+      const [from, to] = Array.from(app.querySelectorAll('input[type=date]')).map(el => el.value);
+      const dialog = document.createElement('mat-dialog-container');
+      dialog.setAttribute('role', 'dialog');
+      dialog.innerHTML = '<p>Export als CSV</p><button class="btn-save"><span>Speichern</span></button>';
+      document.body.appendChild(dialog);
+      dialog.querySelector('button').addEventListener('click', () => {{
+        dialog.remove();
+        window.location.href = 'api/MeteringData/Export?' + new URLSearchParams({{from, to}});
+      }});
+    }}
+
+    window.addEventListener('hashchange', route);
+    route();
+  </script>
+</body>
+</html>
+"""
+
+
+def consumption_csv(start, end, until=None):
+    """
+    Erzeugt eine CSV im Format des Portals (Semikolon, Dezimalkomma, deutsches Datum)
+
+    Die Werte sind reproduzierbar (Tagesgang + Grundlast), Intervalle nach
+    `until` fehlen wie beim Portal, das mit Verzögerung veröffentlicht.
+    """
+    lines = ["Datum;Verbrauch (kWh)"]
+    moment = datetime.combine(start, datetime.min.time())
+    stop = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    if until is not None:
+        stop = min(stop, until)
+    while moment < stop:
+        hour = moment.hour + moment.minute / 60
+        value = 0.05 + 0.1 * max(0.0, math.sin((hour - 6) / 24 * 2 * math.pi)) + (moment.day % 7) * 0.004
+        lines.append(f"{moment:%d.%m.%Y %H:%M};" + f"{value:.3f}".replace('.', ','))
+        moment += timedelta(minutes=15)
+    return "\n".join(lines) + "\n"
+
+
+class PortalStandin:
+    """
+    Lokaler Nachbau des enView-Portals für Tests und Benchmarks
+
+    Login läuft wie bei einem Formular-Login mit CSRF- und State-Token:
+    POST auf das Formular -> Weiterleitung auf /auth/callback -> Sitzungs-Cookie
+    -> Weiterleitung aufs Dashboard. Das Dashboard legt zusätzlich ein
+    Bearer-Token im localStorage ab; der Export akzeptiert Cookie oder Token.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, username="demo@example.org", password="demo",
+                 latency=0.0, jitter=0.0, fail_rate=0.0, fail=(), session_ttl=None,
+                 render_delay=0.3, full_months=False, seed=None):
+        """
+        Args:
+            host, port: Adresse des Servers (port=0 wählt einen freien Port)
+            username, password: Gültige Zugangsdaten
+            latency: Zusätzliche Antwortzeit je Anfrage in Sekunden
+            jitter: Zufällige Abweichung der Antwortzeit (+/- Sekunden)
+            fail_rate: Anteil der Anfragen, die mit 503 beantwortet werden
+            fail: Schritte aus PHASES, die immer mit 503 beantwortet werden
+            session_ttl: Sitzungen laufen nach so vielen Sekunden ab (None = nie)
+            render_delay: Verzögerung bis die Chart-Seite den Export-Button zeigt
+            full_months: Export liefert immer ganze Monate (wie ein Portal, das den
+                         Zeitraum ignoriert) statt genau den angefragten Zeitraum
+            seed: Startwert für die Fehler-Zufallszahlen (reproduzierbare Läufe)
+        """
+        unknown = set(fail) - set(PHASES)
+        if unknown:
+            raise ValueError(f"Unbekannte Schritte für fail: {sorted(unknown)}")
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.fail = set(fail)
+        self.session_ttl = session_ttl
+        self.render_delay = render_delay
+        self.full_months = full_months
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pending = {}    # csrf_token -> state
+        self._codes = {}      # code -> state
+        self._sessions = {}   # session_id -> (token, erstellt)
+        self.requests = {phase: 0 for phase in PHASES}
+        self.failures = {phase: 0 for phase in PHASES}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Startet den Server in einem Hintergrund-Thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 Portal-Nachbau läuft auf {self.base_url}{PORTAL_PATH}/")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Zustand ---------------------------------------------------------
+
+    def _new_login(self):
+        csrf, state = secrets.token_urlsafe(16), secrets.token_urlsafe(12)
+        with self._lock:
+            self._pending[csrf] = state
+        return csrf, state
+
+    def _session_token(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry and self.session_ttl and time.monotonic() - entry[1] > self.session_ttl:
+                del self._sessions[session_id]
+                entry = None
+        return entry[0] if entry else None
+
+    def _authorized(self, cookies, authorization):
+        if self._session_token(cookies.get(SESSION_COOKIE)):
+            return True
+        if authorization.startswith("Bearer "):
+            token = authorization[7:]
+            with self._lock:
+                sessions = list(self._sessions)
+            return any(self._session_token(session_id) == token for session_id in sessions)
+        return False
+
+    def _should_fail(self, phase):
+        with self._lock:
+            self.requests[phase] += 1
+            failed = phase in self.fail or self._random.random() < self.fail_rate
+            if failed:
+                self.failures[phase] += 1
+        return failed
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                offset = self._random.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0.0, self.latency + offset))
+
+    def _export_range(self, query):
+        """Zeitraum aus from/to, ohne Angabe der laufende Monat"""
+        today = date.today()
+        try:
+            start = date.fromisoformat(query.get('from', [''])[0][:10])
+            end = date.fromisoformat(query.get('to', [''])[0][:10])
+        except ValueError:
+            start, end = today.replace(day=1), today
+        if self.full_months:
+            start = start.replace(day=1)
+            end = (end.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        return start, end
+
+    # --- HTTP ------------------------------------------------------------
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                logger.debug("standin: " + fmt % args)
+
+            def _cookies(self):
+                cookies = {}
+                for part in self.headers.get('Cookie', '').split(';'):
+                    if '=' in part:
+                        key, value = part.strip().split('=', 1)
+                        cookies[key] = value
+                return cookies
+
+            def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def _redirect(self, location, headers=None):
+                self._send(302, b"", headers={'Location': location, **(headers or {})})
+
+            def _login_page(self, error=""):
+                csrf, state = standin._new_login()
+                block = f'<div class="alert error" role="alert">{html.escape(error)}</div>' if error else ""
+                page = LOGIN_PAGE.format(action=f"{PORTAL_PATH}/login", csrf=csrf, state=state, error=block)
+                self._send(200, page)
+
+            def _phase(self, path):
+                if path == EXPORT_PATH:
+                    return 'export'
+                if path == f"{PORTAL_PATH}/login" and self.command == 'POST':
+                    return 'login'
+                if path == f"{PORTAL_PATH}/auth/callback":
+                    return 'callback'
+                return 'page'
+
+            def _handle(self):
+                parts = urlsplit(self.path)
+                path = parts.path
+                phase = self._phase(path)
+                standin._delay()
+                if standin._should_fail(phase):
+                    self._send(503, "Service Unavailable (simuliert)", "text/plain; charset=utf-8")
+                    return
+
+                cookies = self._cookies()
+                if path in ("/", PORTAL_PATH):
+                    self._redirect(f"{PORTAL_PATH}/")
+                elif path in (f"{PORTAL_PATH}/", f"{PORTAL_PATH}/login") and self.command != 'POST':
+                    token = standin._session_token(cookies.get(SESSION_COOKIE))
+                    if token:
+                        page = APP_PAGE.format(token=token, render_delay=int(standin.render_delay * 1000))
+                        self._send(200, page)
+                    else:
+                        self._login_page()
+                elif phase == 'login':
+                    self._post_login()
+                elif phase == 'callback':
+                    self._callback(parse_qs(parts.query))
+                elif path == f"{PORTAL_PATH}/logout":
+                    with standin._lock:
+                        standin._sessions.pop(cookies.get(SESSION_COOKIE), None)
+                    self._redirect(f"{PORTAL_PATH}/", {'Set-Cookie': f"{SESSION_COOKIE}=; Path=/; Max-Age=0"})
+                elif phase == 'export':
+                    self._export(cookies, parse_qs(parts.query))
+                else:
+                    self._send(404, "Not Found", "text/plain; charset=utf-8")
+
+            def _post_login(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                field = lambda name: form.get(name, [''])[0]
+
+                with standin._lock:
+                    state = standin._pending.pop(field('csrf_token'), None)
+                if state is None or state != field('state'):
+                    self._send(403, "CSRF-Token ungültig", "text/plain; charset=utf-8")
+                    return
+                if field('username') != standin.username or field('password') != standin.password:
+                    self._login_page("Benutzername oder Passwort ungültig")
+                    return
+
+                code = secrets.token_urlsafe(16)
+                with standin._lock:
+                    standin._codes[code] = state
+                self._redirect(f"{PORTAL_PATH}/auth/callback?{urlencode({'code': code, 'state': state})}")
+
+            def _callback(self, query):
+                code, state = query.get('code', [''])[0], query.get('state', [''])[0]
+                with standin._lock:
+                    expected = standin._codes.pop(code, None)
+                if expected is None or expected != state:
+                    self._send(400, "Ungültiger Anmeldecode", "text/plain; charset=utf-8")
+                    return
+                session_id, token = secrets.token_urlsafe(24), secrets.token_urlsafe(32)
+                with standin._lock:
+                    standin._sessions[session_id] = (token, time.monotonic())
+                self._redirect(f"{PORTAL_PATH}/", {
+                    'Set-Cookie': f"{SESSION_COOKIE}={session_id}; Path=/; HttpOnly; SameSite=Lax"
+                })
+
+            def _export(self, cookies, query):
+                if not standin._authorized(cookies, self.headers.get('Authorization', '')):
+                    self._send(401, '{"error": "unauthorized"}', "application/json")
+                    return
+                start, end = standin._export_range(query)
+                until = datetime.combine(date.today(), datetime.min.time())
+                body = consumption_csv(start, end, until)
+                filename = f"Verbrauch_{start:%Y%m%d}_{end:%Y%m%d}.csv"
+                self._send(200, body, "text/csv; charset=utf-8", {
+                    'Content-Disposition': f'attachment; filename="{filename}"'
+                })
+
+            def do_GET(self):
+                self._handle()
+
+            def do_HEAD(self):
+                self._handle()
+
+            def do_POST(self):
+                self._handle()
+
+        return Handler
+
+
+def main():
+    """Startet den Nachbau im Vordergrund"""
+    parser = argparse.ArgumentParser(description="Lokaler Nachbau des Smart Meter Portals")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--username", default="demo@example.org")
+    parser.add_argument("--password", default="demo")
+    parser.add_argument("--latency", type=float, default=0.0, help="Antwortzeit je Anfrage (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Zufällige Abweichung der Antwortzeit (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Anteil zufälliger 503-Antworten")
+    parser.add_argument("--fail", default="", help=f"Immer fehlschlagende Schritte, z.B. login,export ({', '.join(PHASES)})")
+    parser.add_argument("--session-ttl", type=float, default=None, help="Sitzungsdauer in Sekunden")
+    parser.add_argument("--full-months", action="store_true", help="Export liefert immer ganze Monate")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    standin = PortalStandin(
+        args.host, args.port, args.username, args.password,
+        latency=args.latency, jitter=args.jitter, fail_rate=args.fail_rate,
+        fail=[p for p in args.fail.split(',') if p], session_ttl=args.session_ttl,
+        full_months=args.full_months
+    )
+    standin.start()
+    print(f"Portal-Nachbau: {standin.base_url}{PORTAL_PATH}/  (Login: {args.username} / {args.password})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
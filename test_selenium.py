@@ -19,4 +19,4 @@ with SmartMeterSeleniumDownloader(USERNAME, PASSWORD, headless=False) as downloa
         time.sleep(10)
     else:
         print("\n❌ Login fehlgeschlagen")
-        print("Prüfe die Screenshots im downloads/ Ordner für Details")
+        print("Prüfe die Screenshots im downloads/debug/ Ordner für Details")